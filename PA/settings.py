@@ -54,6 +54,8 @@ INSTALLED_APPS = [
 
     "core",
     "payments",
+    "jobs",
+    "search",
 ]
 
 MIDDLEWARE = [
@@ -99,6 +101,9 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # The in-memory test database fails concurrent writers at once, a
+        # file makes them wait like a real database
+        "TEST": {"NAME": BASE_DIR / "test.sqlite3"},
     }
 }
 
@@ -119,9 +124,29 @@ AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.NumericPasswordValidator",
     },
+    {
+        # Built with `manage.py build_breached_passwords`, skipped if missing
+        "NAME": "core.validators.BreachedPasswordValidator",
+        "OPTIONS": {
+            "path": config(
+                "BREACHED_PASSWORDS_FILE", BASE_DIR / "breached_passwords.bin"
+            ),
+        },
+    },
 ]
 
 
+AUTHENTICATION_BACKENDS = ["core.backends.PooledModelBackend"]
+
+# Password hashing runs on a bounded pool, see core/hashing.py
+PASSWORD_HASHING = {
+    "EXECUTOR": config("PASSWORD_HASHING_EXECUTOR", "thread"),
+    "MAX_WORKERS": config("PASSWORD_HASHING_MAX_WORKERS", 4, cast=int),
+    "QUEUE_TIMEOUT": config("PASSWORD_HASHING_QUEUE_TIMEOUT", 0.5, cast=float),
+    "RETRY_AFTER": 1,
+}
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
 
@@ -156,11 +181,26 @@ INTERNAL_IPS = [
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "core.authentication.CachedJWTAuthentication",
     ),
     "COERCE_DECIMAL_TO_STRING": False,
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "NON_FIELD_ERRORS_KEY": "error",
+    # Proxies in front of the app, whose X-Forwarded-For entries are trusted.
+    # 0 keys the IP throttles on REMOTE_ADDR, a client can forge the header.
+    "NUM_PROXIES": config("NUM_PROXIES", 0, cast=int),
+    # "<throttle_scope>.<ip|email|user>", see core/throttling.py
+    "DEFAULT_THROTTLE_RATES": {
+        "login.ip": "30/min",
+        "login.email": "10/min",
+        "otp_send.ip": "20/hour",
+        "otp_send.email": "5/hour",
+        "otp_verify.ip": "30/min",
+        "otp_verify.email": "10/min",
+        "password_reset.ip": "20/hour",
+        "password_reset.email": "5/hour",
+        "password_update.user": "10/hour",
+    },
 }
 SPECTACULAR_SETTINGS = {
     "TITLE": "Personal_Assistant API",
@@ -177,13 +217,100 @@ SIMPLE_JWT = {
     "AUTH_TOKEN_CLASSES": ("rest_framework_simplejwt.tokens.AccessToken",),
 }
 
+# Opt-in claims-only tokens for ProfileView, see core/tokens.py
+CLAIMS_AUTH = {
+    "ENABLED": config("CLAIMS_AUTH_ENABLED", False, cast=bool),
+    "MAX_AGE": timedelta(minutes=15),
+}
+
+# Per-process cache of authenticated users, see core/authentication.py
+USER_CACHE = {
+    "MAXSIZE": 10_000,
+    "TTL": config("USER_CACHE_TTL", 60, cast=int),
+}
+
+# Where OTP counters live, core.otp.CacheOTPStore keeps them off the database
+# and needs a cache shared by every process
+OTP_STORE = {
+    "BACKEND": config("OTP_STORE_BACKEND", "core.otp.DatabaseOTPStore"),
+    "TTL": 300,
+}
+
+# Stored responses for requests sent with an Idempotency-Key, see core/idempotency.py
+IDEMPOTENCY = {
+    "TTL": 86400,
+    "RETRY_AFTER": 1,
+    "ALLOW_LOCAL": config("IDEMPOTENCY_ALLOW_LOCAL", False, cast=bool),
+}
+
+# Background jobs, run by `manage.py run_workers`, see jobs/queue.py
+JOBS = {
+    "MAX_ATTEMPTS": 5,
+    "RETRY_DELAY": 10,
+    "LEASE": 300,
+}
+
+# Periodic tasks, run by `manage.py run_scheduler` on one node, see jobs/scheduler.py
+SCHEDULE = {
+    "flush_expired_tokens": {
+        "task": "core.tasks.flush_expired_tokens",
+        "cron": "0 3 * * *",
+    },
+    "sweep_otps": {"task": "core.tasks.sweep_otps", "cron": "*/15 * * * *"},
+    "reconcile_wallets": {
+        "task": "payments.tasks.reconcile_wallets",
+        "cron": "30 3 * * *",
+    },
+    "compact_wallet_shards": {
+        "task": "payments.tasks.compact_wallet_shards",
+        "cron": "*/5 * * * *",
+    },
+    "process_stripe_events": {
+        "task": "payments.tasks.process_stripe_events",
+        "cron": "* * * * *",
+    },
+}
+
+# Sharded wallets, see payments/shards.py
+WALLET_SHARDS = {
+    "BALANCE_TIMEOUT": 5,
+}
+
+# Assistant search, see search/index.py and search/nearby.py
+SEARCH = {
+    "PAGE_SIZE": 20,
+    "MAX_PAGE_SIZE": 100,
+    "NEARBY_RADIUS": 10,
+    "MAX_NEARBY_RADIUS": 100,
+}
+
 
 CORS_ALLOW_ALL_ORIGINS = True
 STRIPE_PUBLISHABLE_KEY = config("STRIPE_PUBLISHABLE_KEY", "")
 STRIPE_SECRET_KEY = config("STRIPE_SECRET_KEY", "")
-EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+# The webhook endpoint's signing secret, whsec_..., see payments/webhooks.py
+STRIPE_WEBHOOK_SECRET = config("STRIPE_WEBHOOK_SECRET", "")
+STRIPE_WEBHOOK = {
+    "TOLERANCE": 300,
+    "BATCH_SIZE": 500,
+    "MAX_ATTEMPTS": 5,
+    "CURRENCY": "ngn",
+}
+# send_mail() only queues the message, `manage.py send_queued_mail` sends it
+EMAIL_BACKEND = config("EMAIL_BACKEND", "core.mail.QueuedEmailBackend")
 EMAIL_HOST = "localhost"
 EMAIL_PORT = 2525
+EMAIL_TIMEOUT = 30
+
+# Authenticated SMTP connections kept open per process, see core/smtp_pool.py
+EMAIL_POOL = {"SIZE": 4, "MAX_IDLE": 60, "CHECK_AFTER": 5}
+
+MAIL_QUEUE = {
+    "BACKEND": "core.smtp_pool.PooledEmailBackend",
+    "BATCH_SIZE": 100,
+    "MAX_ATTEMPTS": 5,
+    "RETRY_DELAY": 30,
+}
 
 
 TEST_RUNNER = "utils.test.PytestTestRunner"
@@ -28,7 +28,10 @@ from django.conf.urls.static import static
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("accounts/", include("core.urls")),
+    # Async account endpoints, non-blocking when served through PA.asgi
+    path("async/accounts/", include("core.async_urls")),
     path("payments/", include("payments.urls")),
+    path("search/", include("search.urls")),
     path("__debug__/", include("debug_toolbar.urls")), 
 ]
 
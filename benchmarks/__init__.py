@@ -0,0 +1,39 @@
+"""
+Standalone benchmarks, run from the repository root:
+
+    python -m benchmarks.<name> --help
+
+Every benchmark configures Django against a throwaway SQLite database, so
+they never touch db.sqlite3.
+"""
+import os
+import tempfile
+
+import django
+from django.conf import settings
+
+
+def setup_django(**overrides):
+    """Configure the project settings with ``overrides`` on a fresh database."""
+    from django.core.management import call_command
+
+    import PA.settings as project_settings
+
+    database = os.path.join(tempfile.mkdtemp(prefix="pa-bench-"), "bench.sqlite3")
+    options = {
+        name: getattr(project_settings, name)
+        for name in dir(project_settings)
+        if name.isupper()
+    }
+    options.update(
+        DEBUG=False,
+        DATABASES={
+            "default": {"ENGINE": "django.db.backends.sqlite3", "NAME": database}
+        },
+    )
+    # DATABASES too, to run against another database
+    options.update(overrides)
+    settings.configure(**options)
+    django.setup()
+
+    call_command("migrate", verbosity=0)
@@ -0,0 +1,195 @@
+"""
+Concurrent throughput of the forgot-password endpoint: WSGI vs ASGI.
+
+The SMTP relay is simulated by an email backend that sleeps. The WSGI run
+pushes the sync view through ``PA.wsgi`` with a fixed number of worker
+threads, mimicking gunicorn sync workers. The ASGI runs drive ``PA.asgi``
+from one event loop, with the sync view and then the async view.
+
+    python -m benchmarks.asgi_vs_wsgi --requests 200 --smtp-latency 50
+"""
+import argparse
+import asyncio
+import io
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.util import setup_testing_defaults
+
+from django.core.mail.backends.base import BaseEmailBackend
+
+from benchmarks import setup_django
+
+SMTP_LATENCY = 0.05
+
+
+class SlowEmailBackend(BaseEmailBackend):
+    """Pretends every message takes one SMTP round trip."""
+
+    def send_messages(self, email_messages):
+        time.sleep(SMTP_LATENCY)
+        return len(email_messages)
+
+
+def wsgi_request(application, path, body):
+    environ = {
+        "REQUEST_METHOD": "POST",
+        "PATH_INFO": path,
+        "CONTENT_TYPE": "application/json",
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.input": io.BytesIO(body),
+    }
+    setup_testing_defaults(environ)
+    statuses = []
+
+    def start_response(status, headers, exc_info=None):
+        statuses.append(int(status.split()[0]))
+
+    b"".join(application(environ, start_response))
+    return statuses[0]
+
+
+async def asgi_request(application, path, body):
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"host", b"localhost"),
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ],
+        "client": ("127.0.0.1", 50000),
+        "server": ("localhost", 80),
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    statuses = []
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        # Never disconnect
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    await application(scope, receive, send)
+    return statuses[0]
+
+
+def run_wsgi(application, path, body, requests, workers):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        statuses = list(
+            pool.map(lambda _: wsgi_request(application, path, body), range(requests))
+        )
+    return statuses, time.perf_counter() - start
+
+
+def run_asgi(application, path, body, requests, concurrency):
+    async def main():
+        slots = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with slots:
+                return await asgi_request(application, path, body)
+
+        return await asyncio.gather(*(one() for _ in range(requests)))
+
+    start = time.perf_counter()
+    statuses = asyncio.run(main())
+    return statuses, time.perf_counter() - start
+
+
+def report(label, statuses, elapsed):
+    ok = sum(status == 200 for status in statuses)
+    print(
+        f"{label:<22} {len(statuses):>6} requests  {ok:>6} ok  "
+        f"{elapsed:>7.2f}s  {len(statuses) / elapsed:>8.1f} req/s"
+    )
+
+
+def main():
+    global SMTP_LATENCY
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument(
+        "--wsgi-workers", type=int, default=4, help="sync workers for the WSGI run"
+    )
+    parser.add_argument(
+        "--smtp-latency", type=float, default=50, help="simulated SMTP time, in ms"
+    )
+    args = parser.parse_args()
+    SMTP_LATENCY = args.smtp_latency / 1000
+
+    import PA.settings
+
+    setup_django(
+        EMAIL_BACKEND="benchmarks.asgi_vs_wsgi.SlowEmailBackend",
+        # Every request comes from one address, measure the view not the limiter
+        REST_FRAMEWORK={**PA.settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": {}},
+    )
+
+    from django.contrib.auth import get_user_model
+
+    from PA.asgi import application as asgi_application
+    from PA.wsgi import application as wsgi_application
+
+    # The backend is imported by dotted path, so set the latency there too
+    import benchmarks.asgi_vs_wsgi
+
+    benchmarks.asgi_vs_wsgi.SMTP_LATENCY = SMTP_LATENCY
+
+    user = get_user_model().objects.create_user(
+        email="bench@example.com", password=None
+    )
+    body = json.dumps({"email": user.email}).encode()
+
+    print(
+        f"forgot-password, {args.smtp_latency:.0f}ms SMTP, "
+        f"{args.wsgi_workers} WSGI workers, ASGI concurrency {args.concurrency}"
+    )
+    report(
+        "WSGI sync view",
+        *run_wsgi(
+            wsgi_application,
+            "/accounts/forgot/password",
+            body,
+            args.requests,
+            args.wsgi_workers,
+        ),
+    )
+    report(
+        "ASGI sync view",
+        *run_asgi(
+            asgi_application,
+            "/accounts/forgot/password",
+            body,
+            args.requests,
+            args.concurrency,
+        ),
+    )
+    report(
+        "ASGI async view",
+        *run_asgi(
+            asgi_application,
+            "/async/accounts/forgot/password",
+            body,
+            args.requests,
+            args.concurrency,
+        ),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Latency of ranking every assistant against a request with the in-memory
+engine, NumPy and pure Python, against a loop over the ORM objects.
+
+    python -m benchmarks.assistant_ranking --assistants 200000
+"""
+import argparse
+import math
+import random
+import statistics
+import time
+import uuid
+
+from benchmarks import setup_django
+from benchmarks.nearby_assistants import random_point
+
+SERVICES = [
+    "Cleaning", "Cooking", "Laundry", "Babysitting", "Elderly care", "Driving",
+    "Errands", "Gardening", "Pet sitting", "Tutoring", "Ironing", "Shopping",
+]  # fmt: skip
+
+
+def make_assistants(count, batch_size=10_000):
+    from django.contrib.auth import get_user_model
+
+    from core.models import Assistant
+
+    User = get_user_model()
+    rng = random.Random(0)
+
+    for start in range(0, count, batch_size):
+        size = min(batch_size, count - start)
+        users = [
+            User(
+                id=uuid.uuid4(),
+                email=f"assistant{start + n}@example.com",
+                is_assistant=True,
+                is_verified=rng.random() < 0.8,
+            )
+            for n in range(size)
+        ]
+        User.objects.bulk_create(users)
+
+        assistants = []
+        for user in users:
+            latitude, longitude = random_point(rng)
+            assistants.append(
+                Assistant(
+                    user=user,
+                    services=rng.sample(SERVICES, rng.randint(1, 4)),
+                    experience=min(int(rng.expovariate(1 / 4)), 40),
+                    latitude=latitude,
+                    longitude=longitude,
+                )
+            )
+        Assistant.objects.bulk_create(assistants)
+
+
+def orm_loop(services, latitude, longitude, limit):
+    """The ranking one assistant object at a time."""
+    from core.geohash import distance
+    from core.models import Assistant
+    from search.index import get_option
+
+    weights = get_option("RANKING_WEIGHTS")
+    cap, scale = get_option("EXPERIENCE_CAP"), get_option("DISTANCE_SCALE")
+    wanted = {service.lower() for service in services}
+
+    scored = []
+    for assistant in Assistant.objects.select_related("user"):
+        overlap = len(wanted & {service.lower() for service in assistant.services})
+        if not overlap:
+            continue
+        score = weights["services"] * overlap / len(wanted)
+        score += weights["experience"] * min(assistant.experience, cap) / cap
+        score += weights["verified"] * assistant.user.is_verified
+        km = distance(latitude, longitude, assistant.latitude, assistant.longitude)
+        score += weights["distance"] * scale / (scale + km)
+        scored.append((-score, assistant.pk))
+    return sorted(scored)[:limit]
+
+
+def percentiles(times):
+    cuts = statistics.quantiles(times, n=100)
+    return statistics.median(times), cuts[94], cuts[98]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--assistants", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.contrib.auth import get_user_model
+
+    from core.models import Assistant
+    from search.ranking import RankingEngine, np, record_change
+
+    start = time.perf_counter()
+    make_assistants(args.assistants)
+    print(f"{args.assistants} assistants created in {time.perf_counter() - start:.1f}s")
+
+    rng = random.Random(1)
+    requests = [
+        (rng.sample(SERVICES, rng.randint(1, 3)), *random_point(rng))
+        for _ in range(args.queries)
+    ]
+
+    engines = {"python": RankingEngine(use_numpy=False)}
+    if np is not None:
+        engines = {"numpy": RankingEngine(use_numpy=True), **engines}
+    else:
+        print("NumPy is not installed, only the fallback is measured")
+
+    print(f"{'ranking':<10}{'load s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name, engine in engines.items():
+        start = time.perf_counter()
+        engine.load()
+        loaded = time.perf_counter() - start
+
+        times = []
+        # The fallback is slow, a tenth of the requests is plenty
+        for services, latitude, longitude in requests[:: 1 if name == "numpy" else 10]:
+            start = time.perf_counter()
+            engine.rank(services, latitude, longitude, args.limit)
+            times.append((time.perf_counter() - start) * 1000)
+        p50, p95, p99 = percentiles(times)
+        print(f"{name:<10}{loaded:>8.1f}{p50:>9.1f}{p95:>9.1f}{p99:>9.1f}")
+
+    start = time.perf_counter()
+    orm_loop(*requests[0], args.limit)
+    print(f"{'ORM loop':<10}{'':>8}{(time.perf_counter() - start) * 1000:>9.1f}")
+
+    # Catching up with other processes' writes: 100 changed assistants
+    changed = list(
+        Assistant.objects.order_by("?").values_list("user_id", flat=True)[:100]
+    )
+    get_user_model().objects.filter(pk__in=changed).update(is_verified=True)
+    for user_id in changed:
+        record_change(user_id)
+    for name, engine in engines.items():
+        start = time.perf_counter()
+        engine.refresh()
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{name}: 100 changes applied in {elapsed:.1f}ms")
+
+    # The engines and the loop agree
+    for services, latitude, longitude in requests[:5]:
+        expected = orm_loop(services, latitude, longitude, args.limit)
+        for engine in engines.values():
+            found = engine.rank(services, latitude, longitude, args.limit)
+            assert [pk for pk, _ in found] == [pk for _, pk in expected]
+            assert all(
+                math.isclose(score, -expected_score, rel_tol=1e-9)
+                for (_, score), (expected_score, _) in zip(found, expected)
+            )
+
+
+if __name__ == "__main__":
+    main()
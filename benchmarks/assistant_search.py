@@ -0,0 +1,132 @@
+"""
+Assistant search latency on the inverted index, against scanning the
+profiles with LIKE. A scan has to read every match to rank them.
+
+    python -m benchmarks.assistant_search --assistants 100000
+"""
+import argparse
+import itertools
+import random
+import statistics
+import time
+import uuid
+
+from benchmarks import setup_django
+
+SERVICES = [
+    "Cleaning", "Cooking", "Laundry", "Babysitting", "Elderly care", "Driving",
+    "Errands", "Gardening", "Pet sitting", "Tutoring", "Ironing", "Shopping",
+]  # fmt: skip
+# Words by how common they are, drawn with Zipf's law like real text
+VOCABULARY = (
+    "reliable punctual experienced friendly certified patient organised honest "
+    "trained careful flexible weekends evenings mornings children seniors meals "
+    "groceries homes offices apartments references nursing first aid driving "
+    "licence bilingual french yoruba igbo hausa cooking baking cleaning laundry"
+).split() + [f"word{rank}" for rank in range(5000)]
+CUMULATIVE_WEIGHTS = list(
+    itertools.accumulate(1 / rank for rank in range(1, len(VOCABULARY) + 1))
+)
+
+
+def make_assistants(count, batch_size=5000):
+    from django.contrib.auth import get_user_model
+
+    from core.models import Assistant
+
+    User = get_user_model()
+    rng = random.Random(0)
+
+    for start in range(0, count, batch_size):
+        size = min(batch_size, count - start)
+        users = [
+            User(id=uuid.uuid4(), email=f"assistant{start + n}@example.com")
+            for n in range(size)
+        ]
+        # No signals on bulk_create, so no wallets and no reindexing
+        User.objects.bulk_create(users)
+        Assistant.objects.bulk_create(
+            Assistant(
+                user=user,
+                services=rng.sample(SERVICES, rng.randint(1, 4)),
+                bio=words(rng, rng.randint(5, 40)),
+                qualifications=words(rng, rng.randint(0, 8)),
+            )
+            for user in users
+        )
+
+
+def words(rng, count):
+    return " ".join(rng.choices(VOCABULARY, cum_weights=CUMULATIVE_WEIGHTS, k=count))
+
+
+def timed(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--assistants", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.db.models import Q
+
+    from core.models import Assistant
+    from search.index import rebuild_index, search
+
+    start = time.perf_counter()
+    make_assistants(args.assistants)
+    print(f"{args.assistants} assistants created in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    rebuild_index()
+    print(f"Indexed in {time.perf_counter() - start:.1f}s")
+
+    def deep_page(query, services):
+        cursor = None
+        for _ in range(10):
+            _, cursor = search(query, services, cursor=cursor)
+
+    cases = [
+        ("service", lambda: search(services=["Cooking"])),
+        ("2 services", lambda: search(services=["Cooking", "Driving"])),
+        ("common keyword", lambda: search("reliable")),
+        ("rare keyword", lambda: search("word500")),
+        ("3 keywords", lambda: search("bilingual nursing word50")),
+        ("keyword + service", lambda: search("bilingual", ["Elderly care"])),
+        ("pages 1-10, keyword", lambda: deep_page("reliable", [])),
+        ("pages 1-10, 2 keywords", lambda: deep_page("certified nursing", [])),
+        (
+            "LIKE scan, keyword",
+            lambda: list(
+                Assistant.objects.filter(
+                    Q(bio__icontains="reliable")
+                    | Q(qualifications__icontains="reliable")
+                ).values_list("pk", "bio")
+            ),
+        ),
+        (
+            "LIKE scan, 2 keywords",
+            lambda: list(
+                Assistant.objects.filter(bio__icontains="bilingual")
+                .filter(bio__icontains="nursing")
+                .values_list("pk", "bio")
+            ),
+        ),
+    ]
+
+    print(f"{'query':<24}{'median ms':>10}")
+    for name, function in cases:
+        print(f"{name:<24}{timed(function, args.repeat):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Throughput of posting credits in bulk, a chunk per transaction, against
+one credit_wallet() call per entry.
+
+    python -m benchmarks.bulk_credits --entries 1000000 --wallets 100000
+"""
+import argparse
+import random
+import time
+import uuid
+from decimal import Decimal
+
+from benchmarks import setup_django
+
+
+def make_wallets(count, batch_size=10_000):
+    from django.contrib.auth import get_user_model
+
+    from payments.models import Wallet
+
+    User = get_user_model()
+    ids = []
+    for start in range(0, count, batch_size):
+        users = [
+            User(id=uuid.uuid4(), email=f"user{start + n}@example.com")
+            for n in range(min(batch_size, count - start))
+        ]
+        # No signals on bulk_create, so no wallets
+        User.objects.bulk_create(users)
+        Wallet.objects.bulk_create(Wallet(user=user) for user in users)
+        ids += [user.pk for user in users]
+    return ids
+
+
+def entries(users, count, prefix):
+    rng = random.Random(0)
+    for n in range(count):
+        amount = Decimal(rng.randint(100, 50_000)) / 100
+        yield rng.choice(users), amount, f"{prefix}-{n}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    parser.add_argument("--wallets", type=int, default=100_000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument(
+        "--single", type=int, default=10_000, help="Entries posted one by one"
+    )
+    args = parser.parse_args()
+
+    setup_django()
+
+    from payments.models import Transaction
+    from payments.tasks import reconcile_wallets
+    from payments.utils import credit_wallet, post_credits
+
+    start = time.perf_counter()
+    users = make_wallets(args.wallets)
+    print(f"{args.wallets} wallets created in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    for user, amount, reference in entries(users, args.single, "single"):
+        credit_wallet(user, amount, reference)
+    elapsed = time.perf_counter() - start
+    print(f"credit_wallet: {args.single} entries, {args.single / elapsed:.0f}/s")
+
+    start = time.perf_counter()
+    posted, failures = post_credits(
+        entries(users, args.entries, "bulk"), chunk_size=args.chunk_size
+    )
+    elapsed = time.perf_counter() - start
+    print(
+        f"post_credits: {posted} entries in {elapsed:.1f}s, "
+        f"{posted / elapsed:.0f}/s, {len(failures)} failed"
+    )
+
+    # Every entry is in the ledger, and the balances add up
+    assert Transaction.objects.count() == args.single + args.entries
+    print(reconcile_wallets())
+
+
+if __name__ == "__main__":
+    main()
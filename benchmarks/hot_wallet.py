@@ -0,0 +1,103 @@
+"""
+Write throughput on one wallet credited by many threads at once, on the
+wallet's row alone against the wallet split over shards.
+
+    python -m benchmarks.hot_wallet --threads 32 --shards 16
+
+SQLite lets a single writer in at a time, whatever the rows, so the
+difference shows against PostgreSQL:
+
+    python -m benchmarks.hot_wallet --database-url postgres://localhost/bench
+"""
+import argparse
+import threading
+import time
+from decimal import Decimal
+
+from benchmarks import setup_django
+
+
+def hammer(user, threads, writes, debit_every):
+    """Credit, and now and then debit, from ``threads`` threads at once."""
+    from django.db import connection
+
+    from payments.utils import InsufficientFunds, credit_wallet, debit_wallet
+
+    errors = []
+    start = threading.Barrier(threads + 1)
+
+    def work():
+        start.wait()
+        try:
+            for n in range(writes):
+                if debit_every and n % debit_every == debit_every - 1:
+                    try:
+                        debit_wallet(user, Decimal("1.00"))
+                    except InsufficientFunds:
+                        pass
+                else:
+                    credit_wallet(user, Decimal("1.00"))
+        except Exception as error:
+            errors.append(error)
+        finally:
+            connection.close()
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    start.wait()
+    began = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - began, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--writes", type=int, default=200, help="Per thread")
+    parser.add_argument("--shards", type=int, default=16)
+    parser.add_argument(
+        "--debit-every", type=int, default=10, help="Every nth write, 0 for none"
+    )
+    parser.add_argument("--database-url", help="Defaults to a SQLite file")
+    args = parser.parse_args()
+
+    overrides = {}
+    if args.database_url:
+        import dj_database_url
+
+        overrides["DATABASES"] = {"default": dj_database_url.parse(args.database_url)}
+    setup_django(**overrides)
+
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+
+    from payments.models import Wallet
+    from payments.shards import shard_wallet, wallet_balance
+    from payments.tasks import compact_wallet_shards, reconcile_wallets
+
+    User = get_user_model()
+    print(f"{connection.vendor}, {args.threads} threads x {args.writes} writes")
+    print(f"{'wallet':<12}{'writes/s':>10}{'errors':>8}")
+
+    for name, shards in [("one row", 0), (f"{args.shards} shards", args.shards)]:
+        user = User.objects.create(email=f"escrow-{shards}@example.com")
+        shard_wallet(Wallet.objects.get(user=user), shards)
+        # Room for the debits
+        hammer(user, 1, args.threads, 0)
+
+        elapsed, errors = hammer(user, args.threads, args.writes, args.debit_every)
+        writes = args.threads * args.writes
+        print(f"{name:<12}{writes / elapsed:>10.0f}{len(errors):>8}")
+        if errors:
+            print(f"  {errors[0]!r}")
+
+    compact_wallet_shards()
+    wallet = Wallet.objects.get(user__email=f"escrow-{args.shards}@example.com")
+    print(f"Sharded balance after compaction: {wallet_balance(wallet)[0]}")
+    print(reconcile_wallets())
+
+
+if __name__ == "__main__":
+    main()
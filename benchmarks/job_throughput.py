@@ -0,0 +1,77 @@
+"""
+Jobs per second through ``manage.py run_workers``, and a check that with
+several worker processes every job ran exactly once.
+
+    python -m benchmarks.job_throughput --jobs 2000 --processes 4 --threads 4
+"""
+import argparse
+import time
+
+from benchmarks import setup_django
+
+WORK = 0
+
+
+def work():
+    time.sleep(WORK)
+
+
+def main():
+    global WORK
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--jobs", type=int, default=2000)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument(
+        "--work", type=float, default=5, help="time spent in each job, in ms"
+    )
+    args = parser.parse_args()
+    WORK = args.work / 1000
+
+    setup_django()
+
+    from django.core.management import call_command
+    from django.db import connection
+    from django.db.models import Count
+
+    from jobs.models import Job
+
+    # Concurrent writers, as in production; WAL is persistent in the file
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA journal_mode=WAL")
+
+    Job.objects.bulk_create(
+        Job(name="benchmarks.job_throughput.work") for _ in range(args.jobs)
+    )
+    # Worker processes import the job by dotted path, set the work time there
+    import benchmarks.job_throughput
+
+    benchmarks.job_throughput.WORK = WORK
+
+    print(
+        f"{args.jobs} jobs of {args.work:.0f}ms, {args.processes} processes "
+        f"x {args.threads} threads"
+    )
+    start = time.perf_counter()
+    call_command(
+        "run_workers",
+        burst=True,
+        processes=args.processes,
+        threads=args.threads,
+        verbosity=0,
+    )
+    elapsed = time.perf_counter() - start
+
+    outcome = dict(
+        Job.objects.values_list("status", "attempts")
+        .annotate(count=Count("pk"))
+        .values_list("status", "count")
+    )
+    retried = Job.objects.filter(attempts__gt=1).count()
+    print(f"{elapsed:.1f}s, {args.jobs / elapsed:.0f} jobs/s")
+    print(f"statuses: {outcome}, jobs claimed more than once: {retried}")
+
+
+if __name__ == "__main__":
+    main()
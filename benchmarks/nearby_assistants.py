@@ -0,0 +1,134 @@
+"""
+Latency of the nearest verified assistants lookup on the geohash index,
+against scanning the table for the coordinates in a bounding box.
+
+    python -m benchmarks.nearby_assistants --assistants 1000000
+"""
+import argparse
+import random
+import statistics
+import time
+import uuid
+
+from benchmarks import setup_django
+
+# Most assistants live in a few cities, the rest anywhere in the country
+CITIES = [
+    ((6.5244, 3.3792), 0.40),  # Lagos
+    ((9.0765, 7.3986), 0.15),  # Abuja
+    ((7.3775, 3.9470), 0.10),  # Ibadan
+    ((4.8156, 7.0498), 0.10),  # Port Harcourt
+    ((12.0022, 8.5920), 0.05),  # Kano
+]
+COUNTRY = ((4.3, 13.9), (2.7, 14.6))
+SPREAD = 0.15  # degrees, about 17km
+
+
+def random_point(rng):
+    draw = rng.random()
+    for (latitude, longitude), share in CITIES:
+        if draw < share:
+            return rng.gauss(latitude, SPREAD), rng.gauss(longitude, SPREAD)
+        draw -= share
+    (south, north), (west, east) = COUNTRY
+    return rng.uniform(south, north), rng.uniform(west, east)
+
+
+def make_assistants(count, batch_size=10_000):
+    from django.contrib.auth import get_user_model
+
+    from core.geohash import encode
+    from core.models import Assistant
+
+    User = get_user_model()
+    rng = random.Random(0)
+
+    for start in range(0, count, batch_size):
+        size = min(batch_size, count - start)
+        users = [
+            User(
+                id=uuid.uuid4(),
+                email=f"assistant{start + n}@example.com",
+                is_assistant=True,
+                is_verified=rng.random() < 0.8,
+            )
+            for n in range(size)
+        ]
+        User.objects.bulk_create(users)
+
+        assistants = []
+        for user in users:
+            latitude, longitude = random_point(rng)
+            # bulk_create skips save(), which sets the geohash
+            assistants.append(
+                Assistant(
+                    user=user,
+                    latitude=latitude,
+                    longitude=longitude,
+                    geohash=encode(latitude, longitude),
+                )
+            )
+        Assistant.objects.bulk_create(assistants)
+
+
+def scan(latitude, longitude, radius, limit):
+    """The lookup without the geohash index."""
+    from core.geohash import bounding_box, distance
+    from core.models import Assistant
+
+    latitudes, longitudes = bounding_box(latitude, longitude, radius)
+    rows = Assistant.objects.filter(
+        latitude__range=latitudes,
+        longitude__range=longitudes,
+        user__is_verified=True,
+    ).values_list("pk", "latitude", "longitude")
+    found = (
+        (distance(latitude, longitude, row_latitude, row_longitude), pk)
+        for pk, row_latitude, row_longitude in rows
+    )
+    return sorted(row for row in found if row[0] <= radius)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--assistants", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from search.nearby import nearby
+
+    start = time.perf_counter()
+    make_assistants(args.assistants)
+    print(f"{args.assistants} assistants created in {time.perf_counter() - start:.1f}s")
+
+    rng = random.Random(1)
+    points = [random_point(rng) for _ in range(args.queries)]
+
+    print(f"{'radius km':<10}{'lookup':<14}{'p50 ms':>8}{'p95 ms':>8}{'p99 ms':>8}")
+    for radius in (2, 10, 50):
+        for name, lookup in [("geohash", nearby), ("scan", scan)]:
+            times = []
+            # The scan is slow, a tenth of the queries is plenty
+            for latitude, longitude in points[:: 1 if name == "geohash" else 10]:
+                start = time.perf_counter()
+                lookup(latitude, longitude, radius, args.limit)
+                times.append((time.perf_counter() - start) * 1000)
+
+            percentiles = statistics.quantiles(times, n=100)
+            print(
+                f"{radius:<10}{name:<14}{statistics.median(times):>8.1f}"
+                f"{percentiles[94]:>8.1f}{percentiles[98]:>8.1f}"
+            )
+
+    # Both lookups agree
+    for latitude, longitude in points[:20]:
+        expected = [pk for _, pk in scan(latitude, longitude, 10, args.limit)]
+        found = [pk for pk, _ in nearby(latitude, longitude, 10, args.limit)]
+        assert found == expected, (latitude, longitude)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Messages per second: Django's SMTP backend vs the pooled backend.
+
+A local SMTP stand-in adds ``--connect-latency`` before its greeting, for
+the TCP and TLS handshakes of a real relay, and ``--latency`` per message.
+
+    python -m benchmarks.smtp_pool --messages 200 --connect-latency 30
+"""
+import argparse
+import time
+
+from benchmarks import setup_django
+
+STOCK = "django.core.mail.backends.smtp.EmailBackend"
+POOLED = "core.smtp_pool.PooledEmailBackend"
+
+
+def run(label, server, send):
+    connections = server.connections
+    start = time.perf_counter()
+    sent = send()
+    elapsed = time.perf_counter() - start
+    print(
+        f"{label:<34} {sent:>6} sent  {server.connections - connections:>5} "
+        f"connections  {elapsed:>7.2f}s  {sent / elapsed:>8.1f} msg/s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument(
+        "--connect-latency", type=float, default=30, help="handshake time, in ms"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=2, help="time per message, in ms"
+    )
+    parser.add_argument("--pool-size", type=int, default=4)
+    args = parser.parse_args()
+
+    from utils.smtp import LocalSMTPServer
+
+    server = LocalSMTPServer(
+        latency=args.latency / 1000,
+        connect_latency=args.connect_latency / 1000,
+        credentials=("bench", "bench"),
+    ).start()
+    setup_django(
+        EMAIL_HOST=server.host,
+        EMAIL_PORT=server.port,
+        EMAIL_HOST_USER="bench",
+        EMAIL_HOST_PASSWORD="bench",
+        EMAIL_POOL={"SIZE": args.pool_size, "MAX_IDLE": 60, "CHECK_AFTER": 5},
+    )
+
+    from django.core.mail import EmailMessage, get_connection, send_mail
+
+    from core.smtp_pool import send_bulk
+
+    def messages():
+        return [
+            EmailMessage("Notification", "Body", "admin@studebt.com", ["a@b.com"])
+            for _ in range(args.messages)
+        ]
+
+    def send_one_by_one(backend):
+        def send():
+            for _ in range(args.messages):
+                send_mail(
+                    "Notification",
+                    "Body",
+                    "admin@studebt.com",
+                    ["a@b.com"],
+                    connection=get_connection(backend),
+                )
+            return args.messages
+
+        return send
+
+    print(
+        f"{args.messages} messages, {args.connect_latency:.0f}ms handshake, "
+        f"{args.latency:.0f}ms per message, pool of {args.pool_size}"
+    )
+    run("stock, send_mail per message", server, send_one_by_one(STOCK))
+    run(
+        "stock, one send_messages call",
+        server,
+        lambda: get_connection(STOCK).send_messages(messages()),
+    )
+    run("pooled, send_mail per message", server, send_one_by_one(POOLED))
+    run("pooled, send_bulk", server, lambda: send_bulk(messages())[0])
+
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
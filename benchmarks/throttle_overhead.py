@@ -0,0 +1,76 @@
+"""
+Cost of one rate limit check: DRF's SimpleRateThrottle vs the sliding window.
+
+SimpleRateThrottle stores the timestamp of every request in the window and
+filters that list on each check, so its cost grows with the limit. The
+sliding window throttles read two counters whatever the limit.
+
+    python -m benchmarks.throttle_overhead --checks 20000 --limits 10 100 1000
+"""
+import argparse
+import time
+
+from benchmarks import setup_django
+
+
+def measure(throttle, request, view, checks):
+    start = time.perf_counter()
+    for _ in range(checks):
+        throttle.allow_request(request, view)
+    return (time.perf_counter() - start) / checks * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--checks", type=int, default=20_000)
+    parser.add_argument("--limits", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args()
+
+    import PA.settings
+
+    setup_django(
+        REST_FRAMEWORK={**PA.settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": {}}
+    )
+
+    from django.core.cache import cache
+    from rest_framework.settings import api_settings
+    from rest_framework.test import APIRequestFactory
+    from rest_framework.throttling import SimpleRateThrottle
+
+    from core import throttling
+
+    class View:
+        throttle_scope = "bench"
+        kwargs = {}
+
+    class DRFThrottle(SimpleRateThrottle):
+        scope = "bench.ip"
+
+        def get_cache_key(self, request, view):
+            return self.get_ident(request)
+
+    request = APIRequestFactory().get("/", REMOTE_ADDR="10.0.0.1")
+    throttles = [
+        ("SimpleRateThrottle", DRFThrottle, None),
+        ("sliding, local store", throttling.IPRateThrottle, throttling.local_store),
+        ("sliding, cache store", throttling.IPRateThrottle, throttling.cache_store),
+    ]
+
+    print(f"{'throttle':<24} {'limit':>6} {'us/check':>10}")
+    for limit in args.limits:
+        # Requests past the limit are refused without being recorded, so a
+        # full window is the steady state for a busy client
+        api_settings.DEFAULT_THROTTLE_RATES["bench.ip"] = f"{limit}/hour"
+
+        for label, throttle_class, store in throttles:
+            cache.clear()
+            throttling.local_store.clear()
+            throttling.get_store = lambda: store
+
+            throttle = throttle_class()
+            measure(throttle, request, View, limit)
+            cost = measure(throttle, request, View, args.checks)
+            print(f"{label:<24} {limit:>6} {cost:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+from django.urls import path
+
+from . import async_views
+
+urlpatterns = [
+    path("register", async_views.AsyncRegisterView.as_view(), name="async-register"),
+    path("login", async_views.AsyncLoginView.as_view(), name="async-login"),
+    path(
+        "refresh/token",
+        async_views.AsyncRefreshView.as_view(),
+        name="async-token-refresh",
+    ),
+    path(
+        "forgot/password",
+        async_views.AsyncForgotPasswordView.as_view(),
+        name="async-forgot-password",
+    ),
+    path("profile", async_views.AsyncProfileView.as_view(), name="async-profile"),
+    path(
+        "otp/send/<str:email>",
+        async_views.AsyncGetOTPView.as_view(),
+        name="async-otp-send",
+    ),
+    path(
+        "otp/verify", async_views.AsyncVerifyOTPView.as_view(), name="async-otp-verify"
+    ),
+]
@@ -0,0 +1,377 @@
+"""
+Async versions of the account endpoints, for deployments served by PA.asgi.
+
+DRF views are synchronous, so these are plain Django async views that reuse
+the DRF serializers. Database access goes through Django's async ORM. Code
+that is still synchronous (authentication backends, signals, token blacklist,
+OTP storage) runs in ``sync_to_async``. SMTP and password hashing run off the
+event loop, so a slow relay or a PBKDF2 burst does not block other requests.
+"""
+import hashlib
+import json
+
+from asgiref.sync import sync_to_async
+from decouple import config
+from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth.signals import user_logged_in
+from django.contrib.auth.tokens import default_token_generator
+from django.core.exceptions import ValidationError
+from django.core.mail import send_mail
+from django.http import JsonResponse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from django.views import View
+from rest_framework import status
+from rest_framework.exceptions import (
+    APIException,
+    NotAuthenticated,
+    ParseError,
+    Throttled,
+)
+from rest_framework_simplejwt.exceptions import TokenError
+
+from .idempotency import HEADER, IdempotencyKeyInFlight, claim
+from .models import Assistant, BaseUser
+from .otp import OTPGenerator
+from .serializers import (
+    AssistantSerializer,
+    BaseUserSerializer,
+    ClaimsTokenRefreshSerializer,
+    ForgotPasswordSerializer,
+    LoginSerializer,
+    OTPSerializer,
+    RegisterSerializer,
+)
+from .throttling import EmailRateThrottle, IPRateThrottle, set_rate_limit_headers
+from .tokens import ClaimsJWTAuthentication, ClaimsRefreshToken
+
+
+class AsyncAPIView(View):
+    """
+    Base for the async views: CSRF exempt, DRF-style error responses, and
+    the same sliding-window throttles and RateLimit headers as the DRF views.
+    ``idempotent`` views replay their first response to a POST's
+    Idempotency-Key, as IdempotencyMixin does.
+    """
+
+    authentication_class = None
+    throttle_classes = []
+    throttle_scope = None
+    idempotent = False
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # Token authenticated like the DRF views, so no CSRF check
+        view.csrf_exempt = True
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        idempotent_request = response = None
+        try:
+            if self.authentication_class is not None:
+                request.user = await self.authenticate(request)
+            if self.throttle_classes:
+                await sync_to_async(self.check_throttles)(request)
+            idempotent_request, response = await self.claim(request)
+            if response is None:
+                response = await super().dispatch(request, *args, **kwargs)
+        except APIException as exc:
+            response = self.handle_exception(exc)
+        finally:
+            if idempotent_request is not None:
+                # Stored, or only freed after an unhandled error
+                await sync_to_async(self.finish, thread_sensitive=False)(
+                    idempotent_request, response
+                )
+        return set_rate_limit_headers(request, response)
+
+    async def claim(self, request):
+        """The request's hold on its Idempotency-Key, and a response to replay."""
+        key = request.headers.get(HEADER)
+        if not self.idempotent or key is None or request.method != "POST":
+            return None, None
+
+        # Not request.user, the session lookup behind it is synchronous
+        user = request.user if self.authentication_class is not None else None
+        fingerprint = hashlib.sha256(request.body).hexdigest()
+        return await sync_to_async(claim, thread_sensitive=False)(
+            user, request.path, key, fingerprint
+        )
+
+    def finish(self, idempotent_request, response):
+        if response is None:
+            idempotent_request.release()
+        else:
+            idempotent_request.finish(response)
+
+    async def authenticate(self, request):
+        result = await sync_to_async(self.authentication_class().authenticate)(
+            request
+        )
+        if result is None:
+            raise NotAuthenticated()
+        return result[0]
+
+    def check_throttles(self, request):
+        # EmailRateThrottle reads the email from the body, as DRF parses it
+        request.data = self.get_data(request)
+        throttles = [throttle() for throttle in self.throttle_classes]
+        # Every throttle counts the request, as in DRF
+        waits = [
+            throttle.wait()
+            for throttle in throttles
+            if not throttle.allow_request(request, self)
+        ]
+        if waits:
+            raise Throttled(wait=max(waits))
+
+    def handle_exception(self, exc):
+        data = exc.detail
+        if not isinstance(data, (list, dict)):
+            data = {"detail": data}
+
+        response = JsonResponse(data, status=exc.status_code, safe=False)
+        if getattr(exc, "wait", None):
+            response["Retry-After"] = "%d" % exc.wait
+        if isinstance(exc, IdempotencyKeyInFlight):
+            response["Retry-After"] = str(exc.retry_after)
+        return response
+
+    def get_data(self, request):
+        if hasattr(request, "data"):
+            return request.data
+        if request.content_type == "application/json":
+            try:
+                return json.loads(request.body or b"{}")
+            except ValueError as exc:
+                # A 400, like DRF's JSONParser
+                raise ParseError(f"JSON parse error - {exc}")
+        return request.POST
+
+
+class AsyncRegisterView(AsyncAPIView):
+    idempotent = True
+
+    async def post(self, request):
+        serializer = RegisterSerializer(data=self.get_data(request))
+        try:
+            await sync_to_async(serializer.is_valid)(raise_exception=True)
+        except ValidationError as e:
+            return JsonResponse({"error": list(e), "status": False})
+
+        # Profile and wallet creation live in post_save receivers, keep them
+        # on one thread with the insert
+        await sync_to_async(serializer.save)()
+
+        return JsonResponse(
+            {"message": "Registered successfully", "status": True},
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class AsyncLoginView(AsyncAPIView):
+    throttle_classes = [IPRateThrottle, EmailRateThrottle]
+    throttle_scope = "login"
+
+    async def post(self, request):
+        serializer = LoginSerializer(data=self.get_data(request))
+        serializer.is_valid(raise_exception=True)
+
+        email, password = serializer.validated_data.values()
+        # Through AUTHENTICATION_BACKENDS like LoginView, user_login_failed too.
+        # The pooled backend hashes on its executor, not on this thread.
+        user = await sync_to_async(authenticate)(
+            request, username=email, password=password
+        )
+        if user is not None:
+            return await self.login(user)
+
+        return JsonResponse(
+            {"message": "Email or password is incorrect", "status": False},
+            status=status.HTTP_401_UNAUTHORIZED,
+        )
+
+    async def login(self, user):
+        refresh = await sync_to_async(ClaimsRefreshToken.for_user)(user)
+
+        await sync_to_async(user_logged_in.send_robust)(get_user_model(), user=user)
+
+        return JsonResponse(
+            {
+                "status": True,
+                "message": "Logged in successfully",
+                "tokens": {
+                    "access": str(refresh.access_token),
+                    "refresh": str(refresh),
+                },
+                "user": {
+                    "id": user.pk,
+                    "email": user.email,
+                },
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class AsyncRefreshView(AsyncAPIView):
+    async def post(self, request):
+        serializer = ClaimsTokenRefreshSerializer(data=self.get_data(request))
+        try:
+            await sync_to_async(serializer.is_valid)(raise_exception=True)
+        except TokenError:
+            return JsonResponse(
+                {"error": "Token is invalid or expired"},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+
+        return JsonResponse(
+            {**serializer.validated_data, "status": True},
+            status=status.HTTP_200_OK,
+        )
+
+
+class AsyncProfileView(AsyncAPIView):
+    authentication_class = ClaimsJWTAuthentication
+
+    def get_serializer_class(self, user):
+        return AssistantSerializer if user.is_assistant else BaseUserSerializer
+
+    async def get_instance(self, user):
+        Model = Assistant if user.is_assistant else BaseUser
+
+        try:
+            return await Model.objects.aget(user_id=user.pk)
+        except Model.DoesNotExist:
+            return None
+
+    async def get(self, request):
+        instance = await self.get_instance(request.user)
+        if instance is None:
+            return JsonResponse(
+                {"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        serializer = self.get_serializer_class(request.user)(instance)
+
+        return JsonResponse(serializer.data, status=status.HTTP_200_OK)
+
+    async def put(self, request):
+        instance = await self.get_instance(request.user)
+        if instance is None:
+            return JsonResponse(
+                {"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        serializer = self.get_serializer_class(request.user)(
+            instance, data=self.get_data(request)
+        )
+        serializer.is_valid(raise_exception=True)
+        await sync_to_async(serializer.save)()
+
+        return JsonResponse(serializer.data, status=status.HTTP_200_OK)
+
+
+class AsyncForgotPasswordView(AsyncAPIView):
+    throttle_classes = [IPRateThrottle, EmailRateThrottle]
+    throttle_scope = "password_reset"
+
+    async def post(self, request):
+        serializer = ForgotPasswordSerializer(data=self.get_data(request))
+        serializer.is_valid(raise_exception=True)
+
+        email = serializer.validated_data["email"]
+        user = await get_user_model().objects.filter(email=email).afirst()
+
+        if user is None:
+            return JsonResponse(
+                {"message": "User not found.", "status": False},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        uid = urlsafe_base64_encode(force_bytes(user.pk))
+        domain = config("FRONTEND_URL", request.get_host())
+        token = default_token_generator.make_token(user)
+
+        link = f"{request.scheme}://{domain}/account/reset/password/confirm/{uid}/{token}"
+
+        # The SMTP round trip runs on a worker thread, not the event loop
+        await sync_to_async(send_mail, thread_sensitive=False)(
+            subject="RESET PASSWORD",
+            message=f"click this link to proceed to reset password  \n{link}",
+            recipient_list=[user.email],
+            from_email="admin@studebt.com",
+        )
+        return JsonResponse(
+            {
+                "message": "email containing link to reset password has been sent",
+                "status": True,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class AsyncGetOTPView(AsyncAPIView):
+    throttle_classes = [IPRateThrottle, EmailRateThrottle]
+    throttle_scope = "otp_send"
+
+    async def get(self, request, email):
+        user = await get_user_model().objects.filter(email=email).afirst()
+
+        if user is None:
+            return JsonResponse(
+                {"status": False, "message": "No user with the provided email"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        otp = await sync_to_async(lambda: OTPGenerator(user_id=user.id).get_otp())()
+
+        return JsonResponse(
+            {"message": f"OTP sent to the provided email {otp}", "status": True},
+            status=status.HTTP_200_OK,
+        )
+
+
+class AsyncVerifyOTPView(AsyncAPIView):
+    throttle_classes = [IPRateThrottle, EmailRateThrottle]
+    throttle_scope = "otp_verify"
+
+    async def post(self, request):
+        serializer = OTPSerializer(data=self.get_data(request))
+        serializer.is_valid(raise_exception=True)
+
+        user = (
+            await get_user_model()
+            .objects.filter(email=serializer.validated_data["email"])
+            .afirst()
+        )
+        if user is None:
+            return JsonResponse(
+                {"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        check = await sync_to_async(
+            lambda: OTPGenerator(user_id=user.id).check_otp(
+                serializer.validated_data["otp"]
+            )
+        )()
+
+        if check == "passed":
+            # Mark user as verified
+            if not user.is_verified:
+                user.is_verified = True
+                await user.asave(update_fields=["is_verified"])
+
+            return JsonResponse(
+                {"message": "2FA successfully completed", "status": True},
+                status=status.HTTP_202_ACCEPTED,
+            )
+        elif check == "expired":
+            return JsonResponse(
+                {"message": "OTP is expired"},
+                status=status.HTTP_406_NOT_ACCEPTABLE,
+            )
+        else:
+            return JsonResponse(
+                {"message": "Invalid otp"}, status=status.HTTP_403_FORBIDDEN
+            )
@@ -0,0 +1,122 @@
+"""
+JWT authentication that keeps recently seen users in a per-process cache.
+
+simplejwt's ``JWTAuthentication`` loads the user row on every request. The
+cache here is a bounded LRU with a TTL (``USER_CACHE`` setting). Entries are
+dropped by the ``post_save``/``post_delete`` receivers in ``core.signals``.
+A password change is saved through ``user.save()``, so it drops the entry too.
+Views save only the fields they change on a cached user, the rest may be stale.
+Other processes keep their copy until the TTL expires, so keep it short.
+"""
+import copy
+import threading
+
+from cachetools import TTLCache
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+DEFAULTS = {
+    "MAXSIZE": 10_000,
+    # Seconds another process may still see a deactivated user or old password
+    "TTL": 60,
+}
+
+
+class UserCache:
+    def __init__(self, maxsize, ttl):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        # Bumped on every invalidation so a lookup that raced with a save
+        # does not put the old row back
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id):
+        with self._lock:
+            user = self._cache.get(str(user_id))
+            if user is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        # Views may mutate request.user, never hand out the cached instance
+        return copy.copy(user)
+
+    def generation(self):
+        return self._generation
+
+    def set(self, user, generation):
+        with self._lock:
+            if generation == self._generation:
+                self._cache[str(user.pk)] = copy.copy(user)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._generation += 1
+            self._cache.pop(str(user_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._cache.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._cache)}
+
+
+_user_cache = None
+_user_cache_lock = threading.Lock()
+
+
+def get_user_cache():
+    global _user_cache
+
+    if _user_cache is None:
+        with _user_cache_lock:
+            if _user_cache is None:
+                options = {**DEFAULTS, **getattr(settings, "USER_CACHE", {})}
+                _user_cache = UserCache(maxsize=options["MAXSIZE"], ttl=options["TTL"])
+    return _user_cache
+
+
+@receiver(setting_changed)
+def reset_user_cache_on_setting_change(*, setting, **kwargs):
+    global _user_cache
+
+    if setting == "USER_CACHE":
+        _user_cache = None
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that serves the user from `get_user_cache()`."""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        cache = get_user_cache()
+        user = cache.get(user_id)
+
+        if user is None:
+            generation = cache.generation()
+            try:
+                user = self.user_model.objects.get(
+                    **{api_settings.USER_ID_FIELD: user_id}
+                )
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            cache.set(user, generation)
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        return user
@@ -0,0 +1,9 @@
+"""Which kind of cache the project runs on."""
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def is_shared(alias="default"):
+    """Whether every process sees the same entries, not so for LocMem or dummy."""
+    return not isinstance(caches[alias], (LocMemCache, DummyCache))
@@ -0,0 +1,65 @@
+"""
+Version-based ETags.
+
+An ETag is built from a version the row carries, a ``version`` renewed on
+every save or ``date_updated``, never by hashing the rendered body. So a
+request with ``If-None-Match`` can be answered with a 304 before anything is
+serialized, and a write with ``If-Match`` refused with a 412 if the row
+changed since the client read it.
+"""
+from django.core.cache import cache
+from django.http import HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .caches import is_shared
+
+# Profile versions are cached so a conditional GET needs no query at all,
+# when the cache is shared: a per-process cache would not see the writes
+# other processes handle, so without one versions are read from the row.
+# Every write through the model or ProfileView overwrites the entry, reads
+# only add a missing one, so a slow read cannot put back an older version.
+# The timeout bounds how stale it can be after a bulk UPDATE.
+VERSION_TIMEOUT = 300
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = "The resource has changed, fetch it again."
+    default_code = "precondition_failed"
+
+
+def make_etag(*parts):
+    return quote_etag(".".join(str(part) for part in parts))
+
+
+def etag_matches(header, etag):
+    """Whether ``etag`` is in an If-Match or If-None-Match header."""
+    etags = parse_etags(header)
+    # Our ETags are never weak, treat W/"x" as "x"
+    return "*" in etags or etag in {tag.removeprefix("W/") for tag in etags}
+
+
+def set_etag(response, etag):
+    response["ETag"] = etag
+    # Per user, and to be revalidated before every use
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def not_modified(etag):
+    return set_etag(HttpResponseNotModified(), etag)
+
+
+def profile_version_key(user_id):
+    return f"profile-version:{user_id}"
+
+
+def remember_profile_version(profile, overwrite=True):
+    """Cache ``profile``'s version, ``overwrite`` False on read paths."""
+    if not is_shared():
+        return
+    remember = cache.set if overwrite else cache.add
+    remember(profile_version_key(profile.user_id), profile.version, VERSION_TIMEOUT)
@@ -0,0 +1,101 @@
+"""
+Geohashes: a point as a string in which every character narrows the cell
+it lies in. Points in a cell share its geohash as a prefix, so a cell is a
+range of an ordinary index and needs no spatial extension.
+"""
+import math
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+MAX_PRECISION = 12
+EARTH_RADIUS = 6371.0088  # km
+KM_PER_DEGREE = math.pi * EARTH_RADIUS / 180
+
+
+def encode(latitude, longitude, precision=MAX_PRECISION):
+    latitudes, longitudes = [-90.0, 90.0], [-180.0, 180.0]
+    geohash, bits = [], 0
+
+    # Bits alternate between longitude and latitude, five to a character
+    for bit in range(precision * 5):
+        if bit % 2 == 0:
+            interval, value = longitudes, longitude
+        else:
+            interval, value = latitudes, latitude
+        middle = (interval[0] + interval[1]) / 2
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+
+        if bit % 5 == 4:
+            geohash.append(BASE32[bits])
+            bits = 0
+
+    return "".join(geohash)
+
+
+def cell_size(precision):
+    """Height and width of the cells at ``precision``, in degrees."""
+    bits = precision * 5
+    return 180 / 2 ** (bits // 2), 360 / 2 ** ((bits + 1) // 2)
+
+
+def neighbourhood(latitude, longitude, precision):
+    """The cell of a point and the ones around it, up to 9."""
+    height, width = cell_size(precision)
+    cells = set()
+
+    for rows in (-1, 0, 1):
+        row = latitude + rows * height
+        if not -90 <= row <= 90:
+            continue
+        for columns in (-1, 0, 1):
+            column = (longitude + columns * width + 180) % 360 - 180
+            cells.add(encode(row, column, precision))
+
+    return cells
+
+
+def covered_radius(latitude, precision):
+    """
+    How far around a point its neighbourhood at ``precision`` is sure to
+    reach, in km: one cell in every direction.
+    """
+    height, width = cell_size(precision)
+    # Cells narrow towards the poles, take the narrowest row
+    widest_latitude = min(abs(latitude) + height, 90)
+    return KM_PER_DEGREE * min(height, width * math.cos(math.radians(widest_latitude)))
+
+
+def bounding_box(latitude, longitude, km):
+    """
+    The latitude and longitude ranges of the points within ``km`` of a point.
+    The longitude range is None when the box would cross a pole or the
+    antimeridian.
+    """
+    height = km / KM_PER_DEGREE
+    south, north = latitude - height, latitude + height
+    if south <= -90 or north >= 90:
+        return (max(south, -90), min(north, 90)), None
+
+    width = height / math.cos(math.radians(max(abs(south), abs(north))))
+    west, east = longitude - width, longitude + width
+    if west < -180 or east > 180:
+        return (south, north), None
+    return (south, north), (west, east)
+
+
+def distance(latitude1, longitude1, latitude2, longitude2):
+    """Great circle distance in km, by the haversine formula."""
+    latitude1, longitude1, latitude2, longitude2 = map(
+        math.radians, (latitude1, longitude1, latitude2, longitude2)
+    )
+    a = (
+        math.sin((latitude2 - latitude1) / 2) ** 2
+        + math.cos(latitude1)
+        * math.cos(latitude2)
+        * math.sin((longitude2 - longitude1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS * math.asin(min(1, math.sqrt(a)))
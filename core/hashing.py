@@ -0,0 +1,206 @@
+"""
+Runs password hashing on a bounded worker pool instead of the request thread.
+
+PBKDF2 is slow on purpose, so a burst of logins can keep every worker busy
+and starve cheap endpoints. The executor caps how many hashes run at once.
+A caller that cannot get a slot within ``QUEUE_TIMEOUT`` seconds gets a 503
+with ``Retry-After`` instead of waiting in an unbounded queue.
+
+Configure it through the ``PASSWORD_HASHING`` setting:
+
+    PASSWORD_HASHING = {
+        "EXECUTOR": "thread",  # or "process"
+        "MAX_WORKERS": 4,
+        "QUEUE_TIMEOUT": 0.5,  # seconds to wait for a free slot
+        "RETRY_AFTER": 1,  # seconds, sent back in the Retry-After header
+    }
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import django
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+DEFAULTS = {
+    "EXECUTOR": "thread",
+    "MAX_WORKERS": 4,
+    "QUEUE_TIMEOUT": 0.5,
+    "RETRY_AFTER": 1,
+}
+
+
+class HashingPoolSaturated(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Too many requests are being processed, try again shortly."
+    default_code = "hashing_pool_saturated"
+
+    def __init__(self, wait, detail=None, code=None):
+        super().__init__(detail, code)
+        # DRF's exception handler turns `wait` into a Retry-After header
+        self.wait = wait
+
+
+class HashingExecutor:
+    """
+    A thread or process pool with a fixed number of slots.
+
+    A slot is taken when a job is submitted and handed back when the job
+    finishes, so at most ``max_workers`` hashes are queued or running.
+    """
+
+    pools = {"thread": ThreadPoolExecutor, "process": ProcessPoolExecutor}
+
+    def __init__(
+        self, executor="thread", max_workers=4, queue_timeout=0.5, retry_after=1
+    ):
+        try:
+            pool_class = self.pools[executor]
+        except KeyError:
+            raise ImproperlyConfigured(
+                f"PASSWORD_HASHING['EXECUTOR'] must be one of {sorted(self.pools)}"
+            )
+
+        pool_kwargs = {"max_workers": max_workers}
+        if pool_class is ProcessPoolExecutor:
+            # Spawned children need Django configured before they can hash
+            pool_kwargs["initializer"] = django.setup
+
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self._pool = pool_class(**pool_kwargs)
+        self._slots = threading.BoundedSemaphore(max_workers)
+
+    def submit(self, fn, *args):
+        """Schedule ``fn(*args)`` and return its future, or raise if saturated."""
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise HashingPoolSaturated(self.retry_after)
+
+        try:
+            future = self._pool.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    async def asubmit(self, fn, *args):
+        """Async `submit`: waits for a slot off the event loop, then awaits."""
+        future = await sync_to_async(self.submit, thread_sensitive=False)(fn, *args)
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                options = {**DEFAULTS, **getattr(settings, "PASSWORD_HASHING", {})}
+                _executor = HashingExecutor(
+                    executor=options["EXECUTOR"],
+                    max_workers=options["MAX_WORKERS"],
+                    queue_timeout=options["QUEUE_TIMEOUT"],
+                    retry_after=options["RETRY_AFTER"],
+                )
+    return _executor
+
+
+def reset_executor():
+    global _executor
+
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown()
+        _executor = None
+
+
+def _forget_executor():
+    # Pool threads do not survive a fork, so children build their own pool
+    global _executor
+    _executor = None
+
+
+os.register_at_fork(after_in_child=_forget_executor)
+
+
+@receiver(setting_changed)
+def reset_executor_on_setting_change(*, setting, **kwargs):
+    if setting == "PASSWORD_HASHING":
+        reset_executor()
+
+
+def verify_password(raw_password, encoded):
+    """
+    Check ``raw_password`` against ``encoded`` inside a worker.
+
+    Returns ``(is_correct, must_update)``. The upgrade itself is left to the
+    caller because it has to save the user from the request thread.
+    """
+    must_update = []
+    is_correct = hashers.check_password(raw_password, encoded, must_update.append)
+    return is_correct, bool(must_update)
+
+
+def make_password(raw_password):
+    if raw_password is None:
+        # Unusable passwords are not hashed, no need for a slot
+        return hashers.make_password(None)
+    return get_executor().submit(hashers.make_password, raw_password).result()
+
+
+def set_password(user, raw_password):
+    """Pooled equivalent of ``user.set_password``."""
+    user.password = make_password(raw_password)
+    user._password = raw_password
+
+
+def upgrade_password(user, raw_password):
+    set_password(user, raw_password)
+    # Password hash upgrades shouldn't be considered password changes.
+    user._password = None
+    user.save(update_fields=["password"])
+
+
+def check_password(user, raw_password):
+    """Pooled equivalent of ``user.check_password``, hash upgrades included."""
+    future = get_executor().submit(verify_password, raw_password, user.password)
+    is_correct, must_update = future.result()
+
+    if is_correct and must_update:
+        upgrade_password(user, raw_password)
+
+    return is_correct
+
+
+async def amake_password(raw_password):
+    if raw_password is None:
+        return hashers.make_password(None)
+    return await get_executor().asubmit(hashers.make_password, raw_password)
+
+
+async def acheck_password(user, raw_password):
+    is_correct, must_update = await get_executor().asubmit(
+        verify_password, raw_password, user.password
+    )
+
+    if is_correct and must_update:
+        await sync_to_async(upgrade_password)(user, raw_password)
+
+    return is_correct
@@ -0,0 +1,235 @@
+"""
+Idempotency-Key support for POST endpoints.
+
+Mobile clients retry on flaky networks, so the same request can arrive more
+than once. A client that sends an ``Idempotency-Key`` header gets the first
+response for that key replayed, status and body byte for byte, instead of
+the work being done again. Keys are scoped to the user (or to anonymous
+clients) and the endpoint, and stored responses expire after ``TTL``.
+
+A repeat with a different body gets a 422, the key is already spent. A
+repeat that arrives while the first request is still running gets a 409
+with Retry-After at once, it does not hold a worker while it waits.
+
+Responses are stored in the default cache, which has to be shared between
+processes (Redis, Memcached, database) for keys to hold across workers. A
+keyed request on a per-process cache raises ImproperlyConfigured, unless
+``ALLOW_LOCAL`` is set for a single process. 5xx responses are not stored, so the client can retry them. Neither are the
+responses of views that issue tokens, login and refresh, which are not
+mixed in: their tokens would sit in the cache for ``TTL``.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from .caches import is_shared
+
+HEADER = "Idempotency-Key"
+
+DEFAULTS = {
+    "TTL": 86400,
+    # How long a request holds its key, should outlast the slowest request
+    "LOCK_TIMEOUT": 60,
+    # Seconds a repeat of a request still running is told to wait
+    "RETRY_AFTER": 1,
+    "MAX_KEY_LENGTH": 255,
+    "ALLOW_LOCAL": False,
+}
+
+# Not replayed, they depend on the connection rather than the request
+SKIPPED_HEADERS = {"ratelimit-limit", "ratelimit-remaining", "ratelimit-reset"}
+
+
+def get_option(name):
+    return {**DEFAULTS, **getattr(settings, "IDEMPOTENCY", {})}[name]
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = "This Idempotency-Key was already used with another request."
+    default_code = "idempotency_key_reused"
+
+
+class IdempotencyKeyInFlight(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "A request with this Idempotency-Key is still in progress."
+    default_code = "idempotency_key_in_flight"
+
+    def __init__(self, retry_after):
+        super().__init__()
+        self.retry_after = retry_after
+
+
+class Replay(Exception):
+    """Raised from ``initial`` to answer with a stored response."""
+
+    def __init__(self, response):
+        self.response = response
+
+
+def store_key(user, path, key):
+    scope = user.pk if user and user.is_authenticated else "anonymous"
+    digest = hashlib.sha256(f"{scope}:{path}:{key}".encode()).hexdigest()
+    return f"idempotency:{digest}"
+
+
+def freeze(response, fingerprint):
+    """What is kept of ``response``: enough to send it again as is."""
+    headers = [
+        (name, value)
+        for name, value in response.items()
+        if name.lower() not in SKIPPED_HEADERS
+    ]
+    return {
+        "fingerprint": fingerprint,
+        "status": response.status_code,
+        "headers": headers,
+        "content": response.content,
+    }
+
+
+def thaw(stored):
+    response = HttpResponse(stored["content"], status=stored["status"])
+    for name, value in stored["headers"]:
+        response[name] = value
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+class IdempotentRequest:
+    """One request's hold on its key, from ``begin`` to ``finish``."""
+
+    def __init__(self, key, fingerprint):
+        self.key = key
+        self.lock_key = f"{key}:lock"
+        self.fingerprint = fingerprint
+        self.held = False
+
+    def begin(self):
+        """
+        Claim the key, or return the stored response if there is one.
+
+        Raises IdempotencyKeyReused if the key came with another body, and
+        IdempotencyKeyInFlight if the first request is still running.
+        """
+        stored = cache.get(self.key)
+        if stored is not None:
+            self.check(stored["fingerprint"])
+            return thaw(stored)
+
+        if cache.add(self.lock_key, self.fingerprint, get_option("LOCK_TIMEOUT")):
+            # The first request may have finished since the get
+            stored = cache.get(self.key)
+            if stored is not None:
+                cache.delete(self.lock_key)
+                self.check(stored["fingerprint"])
+                return thaw(stored)
+            self.held = True
+            return None
+
+        in_flight = cache.get(self.lock_key)
+        if in_flight is not None:
+            self.check(in_flight)
+        else:
+            # Finished between the add and the get
+            stored = cache.get(self.key)
+            if stored is not None:
+                self.check(stored["fingerprint"])
+                return thaw(stored)
+        raise IdempotencyKeyInFlight(retry_after=get_option("RETRY_AFTER"))
+
+    def check(self, fingerprint):
+        if fingerprint != self.fingerprint:
+            raise IdempotencyKeyReused()
+
+    def finish(self, response):
+        """Store ``response`` unless it is a server error, and free the key."""
+        if not self.held:
+            return
+        try:
+            if response.status_code < 500:
+                if hasattr(response, "render") and not response.is_rendered:
+                    response.render()
+                stored = freeze(response, self.fingerprint)
+                cache.set(self.key, stored, get_option("TTL"))
+        finally:
+            self.release()
+
+    def release(self):
+        if self.held:
+            self.held = False
+            cache.delete(self.lock_key)
+
+
+def claim(user, path, key, fingerprint):
+    """
+    Check ``key`` and hold it for a request to ``path``. Return the
+    IdempotentRequest to finish once answered, and the stored response to
+    replay instead, if any.
+    """
+    if not get_option("ALLOW_LOCAL") and not is_shared():
+        raise ImproperlyConfigured(
+            "Idempotency-Key needs a shared default cache, it is per process"
+        )
+    max_length = get_option("MAX_KEY_LENGTH")
+    if not key or len(key) > max_length:
+        raise ValidationError({HEADER: f"Must be 1 to {max_length} characters."})
+
+    idempotent_request = IdempotentRequest(store_key(user, path, key), fingerprint)
+    return idempotent_request, idempotent_request.begin()
+
+
+class IdempotencyMixin:
+    """
+    Replays the first response to POSTs sent with an Idempotency-Key.
+
+    Goes after authentication, permissions and throttles, so a retry is
+    still checked and counted like any other request.
+    """
+
+    idempotent_methods = ("POST",)
+
+    def initial(self, request, *args, **kwargs):
+        self.idempotent_request = None
+        key = request.headers.get(HEADER)
+        if key is None or request.method not in self.idempotent_methods:
+            return super().initial(request, *args, **kwargs)
+
+        # Before the throttles parse the body, which consumes the stream
+        fingerprint = hashlib.sha256(request.body).hexdigest()
+        super().initial(request, *args, **kwargs)
+
+        idempotent_request, replay = claim(request.user, request.path, key, fingerprint)
+        if replay is not None:
+            raise Replay(replay)
+        self.idempotent_request = idempotent_request
+
+    def handle_exception(self, exc):
+        if isinstance(exc, Replay):
+            return exc.response
+        response = super().handle_exception(exc)
+        if isinstance(exc, IdempotencyKeyInFlight):
+            response["Retry-After"] = str(exc.retry_after)
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+
+        idempotent_request = getattr(self, "idempotent_request", None)
+        if idempotent_request is not None:
+            idempotent_request.finish(response)
+        return response
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            # An unhandled error never reaches finalize_response
+            idempotent_request = getattr(self, "idempotent_request", None)
+            if idempotent_request is not None:
+                idempotent_request.release()
@@ -0,0 +1,177 @@
+"""
+Outbound email queue.
+
+With ``EMAIL_BACKEND = "core.mail.QueuedEmailBackend"`` send_mail() only
+inserts a QueuedEmail row, so requests never wait on the SMTP relay. The row
+is written in the caller's transaction: a rolled back request sends nothing.
+
+``manage.py send_queued_mail`` drains the queue in batches over one
+connection of ``MAIL_QUEUE["BACKEND"]``, retrying failures with exponential
+backoff until ``MAX_ATTEMPTS``, after which the message is marked failed.
+"""
+import copy
+import logging
+import pickle
+import smtplib
+from contextlib import suppress
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from core.models import QueuedEmail
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "BACKEND": "django.core.mail.backends.smtp.EmailBackend",
+    "BATCH_SIZE": 100,
+    "MAX_ATTEMPTS": 5,
+    # Seconds before the first retry, doubled after every failed attempt
+    "RETRY_DELAY": 30,
+    # Seconds a claimed batch is hidden from other workers
+    "LEASE": 300,
+}
+
+
+def get_option(name):
+    return {**DEFAULTS, **getattr(settings, "MAIL_QUEUE", {})}[name]
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        queued = []
+        for message in email_messages:
+            if not message.recipients():
+                continue
+
+            message = copy.copy(message)
+            message.connection = None
+            queued.append(
+                QueuedEmail(
+                    message=pickle.dumps(message),
+                    subject=message.subject[:255],
+                    recipients=", ".join(message.recipients()),
+                )
+            )
+
+        QueuedEmail.objects.bulk_create(queued)
+        return len(queued)
+
+
+def claim_batch(size=None):
+    """Return up to ``size`` due messages, leased to this worker."""
+    now = timezone.now()
+    lease = timedelta(seconds=get_option("LEASE"))
+
+    with transaction.atomic():
+        batch = list(
+            QueuedEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=QueuedEmail.Status.PENDING, next_attempt__lte=now)
+            .order_by("next_attempt")[: size or get_option("BATCH_SIZE")]
+        )
+        # If this worker dies, the batch is picked up again once the lease ends
+        QueuedEmail.objects.filter(pk__in=[email.pk for email in batch]).update(
+            next_attempt=now + lease
+        )
+    return batch
+
+
+def send_batch(batch, connection):
+    """
+    Send ``batch`` over ``connection``, which is left open for the next one.
+
+    Return the number of messages sent and failed.
+    """
+    sent = 0
+
+    for position, email in enumerate(batch):
+        try:
+            connection.open()
+        except Exception as error:
+            # The relay is unreachable, the rest of the batch waits too. Not an
+            # attempt at the message, so an outage never exhausts the retries
+            logger.warning("Could not connect to the mail relay: %s", error)
+            for waiting in batch[position:]:
+                retry(waiting, error)
+            break
+
+        email.attempts += 1
+        try:
+            connection.send_messages([pickle.loads(email.message)])
+        except Exception as error:
+            logger.warning("Could not send queued email %s: %s", email.pk, error)
+            if not is_permanent(error):
+                # The connection may be broken, reconnect for the next one
+                with suppress(Exception):
+                    connection.close()
+            retry(email, error)
+        else:
+            email.status = QueuedEmail.Status.SENT
+            email.date_sent = timezone.now()
+            sent += 1
+
+    QueuedEmail.objects.bulk_update(
+        batch, ["status", "attempts", "next_attempt", "last_error", "date_sent"]
+    )
+    return sent, len(batch) - sent
+
+
+def retry(email, error):
+    email.last_error = f"{type(error).__name__}: {error}"
+
+    if is_permanent(error) or email.attempts >= get_option("MAX_ATTEMPTS"):
+        email.status = QueuedEmail.Status.FAILED
+        return
+
+    delay = get_option("RETRY_DELAY") * 2 ** max(email.attempts - 1, 0)
+    email.next_attempt = timezone.now() + timedelta(seconds=delay)
+
+
+def is_permanent(error):
+    """5xx replies will not go away by retrying."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500
+
+
+def queue_stats(window=timedelta(hours=1)):
+    """
+    Queue depth and send latency.
+
+    depth: pending messages, oldest_age: seconds the oldest of them has
+    waited, failed: messages given up on. sent, latency_p50, latency_p95:
+    messages sent during ``window`` and their seconds from enqueue to send.
+    """
+    now = timezone.now()
+    pending = QueuedEmail.objects.filter(status=QueuedEmail.Status.PENDING).aggregate(
+        depth=Count("pk"), oldest=Min("date_created")
+    )
+    latencies = sorted(
+        (date_sent - date_created).total_seconds()
+        for date_created, date_sent in QueuedEmail.objects.filter(
+            status=QueuedEmail.Status.SENT, date_sent__gte=now - window
+        ).values_list("date_created", "date_sent")
+    )
+
+    return {
+        "depth": pending["depth"],
+        "oldest_age": (
+            (now - pending["oldest"]).total_seconds() if pending["oldest"] else 0
+        ),
+        "failed": QueuedEmail.objects.filter(
+            status=QueuedEmail.Status.FAILED
+        ).count(),
+        "sent": len(latencies),
+        "latency_p50": percentile(latencies, 0.5),
+        "latency_p95": percentile(latencies, 0.95),
+    }
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    return values[min(int(len(values) * fraction), len(values) - 1)]
@@ -0,0 +1,99 @@
+import hashlib
+import heapq
+import os
+import tempfile
+from functools import partial
+from itertools import groupby
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.validators import RECORD_SIZE
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the sorted SHA-1 file used by BreachedPasswordValidator from a "
+        "plain-text password list, one password per line. Large lists are "
+        "sorted in runs on disk and merged, so memory use stays bounded."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("source", help="Plain-text password list")
+        parser.add_argument("output", help="Where to write the digest file")
+        parser.add_argument(
+            "--sha1",
+            action="store_true",
+            help="Lines are already hex SHA-1 digests, optionally followed by "
+            "':count' as in the Have I Been Pwned downloads",
+        )
+        parser.add_argument(
+            "--run-size",
+            type=int,
+            default=5_000_000,
+            help="Digests sorted in memory at once",
+        )
+
+    def handle(self, *args, source, output, sha1, run_size, **options):
+        to_digest = from_hex if sha1 else from_password
+        output_dir = os.path.dirname(os.path.abspath(output))
+
+        with tempfile.TemporaryDirectory(dir=output_dir) as runs_dir:
+            runs = self.write_runs(source, to_digest, run_size, runs_dir)
+
+            with tempfile.NamedTemporaryFile(dir=output_dir, delete=False) as out:
+                merged = heapq.merge(*(read_run(run) for run in runs))
+                count = 0
+                for digest, _ in groupby(merged):
+                    out.write(digest)
+                    count += 1
+
+        # NamedTemporaryFile is owner-only, the workers may run as another user
+        os.chmod(out.name, 0o644)
+        # Replace atomically, workers may have the old file mapped
+        os.replace(out.name, output)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {count} digests to {output}"))
+
+    def write_runs(self, source, to_digest, run_size, runs_dir):
+        runs = []
+        digests = []
+
+        with open(source, "rb") as f:
+            for number, line in enumerate(f, start=1):
+                line = line.rstrip(b"\r\n")
+                if not line:
+                    continue
+                try:
+                    digests.append(to_digest(line))
+                except ValueError:
+                    raise CommandError(f"Line {number} is not a SHA-1 digest")
+
+                if len(digests) >= run_size:
+                    runs.append(write_run(digests, runs_dir))
+                    digests = []
+
+        if digests or not runs:
+            runs.append(write_run(digests, runs_dir))
+        return runs
+
+
+def from_password(line):
+    return hashlib.sha1(line).digest()
+
+
+def from_hex(line):
+    digest = bytes.fromhex(line.split(b":", 1)[0].decode("ascii"))
+    if len(digest) != RECORD_SIZE:
+        raise ValueError(line)
+    return digest
+
+
+def write_run(digests, runs_dir):
+    digests.sort()
+    with tempfile.NamedTemporaryFile(dir=runs_dir, delete=False) as run:
+        run.writelines(digests)
+    return run.name
+
+
+def read_run(path):
+    with open(path, "rb") as f:
+        yield from iter(partial(f.read, RECORD_SIZE), b"")
@@ -0,0 +1,247 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+
+from core.models import Assistant, BaseUser
+from payments.models import Wallet
+from search.index import index_assistants
+from search.ranking import record_change
+
+FIELDS = ["email", "password", "first_name", "last_name", "phone", "is_assistant"]
+TRUE_VALUES = {"1", "true", "yes", "y"}
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk import users from a CSV or JSONL file. Rows are inserted in "
+        "chunks with bulk_create, bypassing the per-row post_save receivers, "
+        "and passwords are hashed in a process pool. Each chunk's assistants "
+        "are indexed for search and ranking after it is committed. Bad rows "
+        "are written to a rejects file and progress is checkpointed after "
+        "every chunk."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV (with a header row) or JSONL file")
+        parser.add_argument("--format", choices=["csv", "jsonl"])
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Password hashing processes, 0 hashes in this process",
+        )
+        parser.add_argument("--rejects", help="Defaults to <path>.rejects.jsonl")
+        parser.add_argument("--checkpoint", help="Defaults to <path>.checkpoint")
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Skip the rows already imported according to the checkpoint",
+        )
+
+    def handle(self, *args, path, chunk_size, workers, resume, **options):
+        file_format = options["format"] or (
+            "jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv"
+        )
+        checkpoint = options["checkpoint"] or f"{path}.checkpoint"
+        rejects_path = options["rejects"] or f"{path}.rejects.jsonl"
+
+        skip = self.read_checkpoint(checkpoint) if resume else 0
+        pool = (
+            ProcessPoolExecutor(max_workers=workers, initializer=django.setup)
+            if workers
+            else None
+        )
+        imported = rejected = 0
+        start = time.perf_counter()
+
+        try:
+            with open(path, newline="") as source, open(
+                rejects_path, "a" if resume else "w"
+            ) as rejects:
+                rows = islice(self.read_rows(source, file_format), skip, None)
+                position = skip
+
+                while chunk := list(islice(rows, chunk_size)):
+                    users, bad_rows = self.build_users(chunk, pool)
+                    try:
+                        assistants = self.insert([user for _, user in users])
+                    except IntegrityError:
+                        # An email registered since build_users looked
+                        assistants, users, taken = self.insert_each(users)
+                        bad_rows += taken
+                    self.index(assistants)
+
+                    for row in bad_rows:
+                        rejects.write(json.dumps(row) + "\n")
+                    rejects.flush()
+
+                    position += len(chunk)
+                    self.write_checkpoint(checkpoint, position)
+
+                    imported += len(users)
+                    rejected += len(bad_rows)
+                    rate = (imported + rejected) / (time.perf_counter() - start)
+                    self.stdout.write(
+                        f"{position} rows read, {imported} imported, "
+                        f"{rejected} rejected, {rate:.0f} rows/s"
+                    )
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Imported {imported} users, rejected {rejected}")
+        )
+
+    def read_rows(self, source, file_format):
+        """Yield ``(line_number, row)``, with ``row`` None for unparsable lines"""
+        if file_format == "csv":
+            reader = csv.DictReader(source)
+            for row in reader:
+                yield reader.line_num, row
+            return
+
+        for line_number, line in enumerate(source, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield line_number, row if isinstance(row, dict) else None
+
+    def build_users(self, chunk, pool):
+        User = get_user_model()
+        valid, bad_rows = [], []
+        seen = set()
+
+        for line, row in chunk:
+            try:
+                row = self.clean(row)
+            except ValidationError as e:
+                bad_rows.append(reject(line, row, e.messages))
+                continue
+
+            if row["email"] in seen:
+                bad_rows.append(reject(line, row, ["Duplicate email in file"]))
+                continue
+            seen.add(row["email"])
+            valid.append((line, row))
+
+        existing = set(
+            User.objects.filter(email__in=seen).values_list("email", flat=True)
+        )
+        for line, row in valid:
+            if row["email"] in existing:
+                bad_rows.append(reject(line, row, ["User already exists"]))
+        valid = [(line, row) for line, row in valid if row["email"] not in existing]
+
+        passwords = [row.pop("password") for _, row in valid]
+        hash_all = pool.map if pool else map
+
+        users = [
+            (line, User(password=password, **row))
+            for (line, row), password in zip(valid, hash_all(make_password, passwords))
+        ]
+        return users, bad_rows
+
+    def clean(self, row):
+        if row is None:
+            raise ValidationError("Row could not be parsed")
+
+        row = {field: row.get(field) for field in FIELDS}
+        email = (row["email"] or "").strip()
+        validate_email(email)
+
+        cleaned = {
+            "email": get_user_model().objects.normalize_email(email),
+            # An empty password becomes unusable, users reset it later
+            "password": row["password"] or None,
+            "first_name": str(row["first_name"] or ""),
+            "last_name": str(row["last_name"] or ""),
+            "phone": str(row["phone"] or ""),
+            "is_assistant": str(row["is_assistant"]).lower() in TRUE_VALUES,
+        }
+        # The model's own checks, max_length among them, so one overlong value
+        # is this row's reject rather than a DataError for the whole chunk
+        opts = get_user_model()._meta
+        for name in ["email", "first_name", "last_name", "phone"]:
+            if cleaned[name]:
+                try:
+                    opts.get_field(name).run_validators(cleaned[name])
+                except ValidationError as e:
+                    raise ValidationError({name: e.messages})
+        return cleaned
+
+    @transaction.atomic
+    def insert(self, users):
+        User = get_user_model()
+        User.objects.bulk_create(users)
+
+        assistants = Assistant.objects.bulk_create(
+            Assistant(user=user) for user in users if user.is_assistant
+        )
+        BaseUser.objects.bulk_create(
+            BaseUser(user=user) for user in users if not user.is_assistant
+        )
+        Wallet.objects.bulk_create(Wallet(user=user) for user in users)
+        return assistants
+
+    @transaction.atomic
+    def insert_each(self, users):
+        """
+        Insert ``(line, user)`` pairs one at a time, each in a savepoint.
+        Return the assistants created, the pairs inserted and the rejects of
+        those whose email is taken.
+        """
+        assistants, inserted, taken = [], [], []
+        for line, user in users:
+            try:
+                assistants += self.insert([user])
+            except IntegrityError:
+                row = {field: getattr(user, field) for field in FIELDS}
+                taken.append(reject(line, row, ["User already exists"]))
+            else:
+                inserted.append((line, user))
+        return assistants, inserted, taken
+
+    def index(self, assistants):
+        """What the post_save receivers would have done, for the whole chunk."""
+        if not assistants:
+            return
+        index_assistants(assistants)
+        for assistant in assistants:
+            record_change(assistant.user_id)
+
+    def read_checkpoint(self, checkpoint):
+        try:
+            with open(checkpoint) as f:
+                return json.load(f)["rows"]
+        except FileNotFoundError:
+            return 0
+        except (ValueError, KeyError):
+            raise CommandError(f"Checkpoint {checkpoint} is corrupt")
+
+    def write_checkpoint(self, checkpoint, rows):
+        # Write then rename, so a crash never leaves a half written checkpoint
+        with open(f"{checkpoint}.tmp", "w") as f:
+            json.dump({"rows": rows}, f)
+        os.replace(f"{checkpoint}.tmp", checkpoint)
+
+
+def reject(line, row, reasons):
+    # Never copy passwords into the rejects file
+    data = {k: v for k, v in (row or {}).items() if k != "password"}
+    return {"line": line, "reasons": reasons, "row": data}
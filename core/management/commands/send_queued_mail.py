@@ -0,0 +1,59 @@
+import time
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from core.mail import claim_batch, get_option, queue_stats, send_batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Send the emails queued by core.mail.QueuedEmailBackend. Batches are "
+        "sent over one connection, kept open while there is work."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once no message is due instead of polling",
+        )
+        parser.add_argument("--batch-size", type=int)
+        parser.add_argument(
+            "--interval", type=float, default=5, help="Seconds between polls"
+        )
+
+    def handle(self, *args, once, batch_size, interval, **options):
+        connection = get_connection(get_option("BACKEND"))
+
+        try:
+            while True:
+                batch = claim_batch(batch_size)
+                if not batch:
+                    # Don't hold a connection the relay will time out anyway
+                    connection.close()
+                    if once:
+                        break
+                    time.sleep(interval)
+                    continue
+
+                start = time.perf_counter()
+                sent, failed = send_batch(batch, connection)
+                elapsed = time.perf_counter() - start
+
+                if options["verbosity"] >= 1:
+                    self.report(sent, failed, elapsed)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connection.close()
+
+    def report(self, sent, failed, elapsed):
+        stats = queue_stats()
+        p95 = stats["latency_p95"]
+        self.stdout.write(
+            f"{sent} sent, {failed} failed in {elapsed * 1000:.0f}ms, "
+            f"{stats['depth']} queued (oldest {stats['oldest_age']:.0f}s), "
+            f"{stats['failed']} given up, "
+            f"p95 latency {'-' if p95 is None else f'{p95:.1f}s'}"
+        )
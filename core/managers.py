@@ -1,5 +1,7 @@
 from django.contrib.auth.models import BaseUserManager
 
+from . import hashing
+
 
 class CustomBaseManager (BaseUserManager):
     def _create_user(self,email, password, **extra_fields):
@@ -13,7 +15,7 @@ class CustomBaseManager (BaseUserManager):
         )
         
 
-        user.set_password(password)
+        hashing.set_password(user, password)
 
         user.save(using = self._db)
 
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.3 on 2026-10-18 06:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_queuedemail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='otp',
+            name='date_updated',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name='otp',
+            name='counter',
+            field=models.BigIntegerField(default=1),
+        ),
+    ]
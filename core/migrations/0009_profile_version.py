@@ -0,0 +1,33 @@
+# Generated by Django 4.2.3 on 2026-10-18 06:09
+
+from django.db import migrations, models
+import uuid
+
+
+def set_versions(apps, schema_editor):
+    # AddField gave every existing row the same default
+    for name in ("Assistant", "BaseUser"):
+        Model = apps.get_model("core", name)
+        for pk in Model.objects.values_list("pk", flat=True):
+            Model.objects.filter(pk=pk).update(version=uuid.uuid4())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_otp_date_updated'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assistant',
+            name='version',
+            field=models.UUIDField(default=uuid.uuid4, editable=False),
+        ),
+        migrations.AddField(
+            model_name='baseuser',
+            name='version',
+            field=models.UUIDField(default=uuid.uuid4, editable=False),
+        ),
+        migrations.RunPython(set_versions, migrations.RunPython.noop),
+    ]
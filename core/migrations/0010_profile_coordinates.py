@@ -0,0 +1,48 @@
+# Generated by Django 4.2.3 on 2026-10-18 06:32
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_profile_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assistant',
+            name='geohash',
+            field=models.CharField(editable=False, max_length=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='assistant',
+            name='latitude',
+            field=models.FloatField(null=True, validators=[django.core.validators.MinValueValidator(-90), django.core.validators.MaxValueValidator(90)]),
+        ),
+        migrations.AddField(
+            model_name='assistant',
+            name='longitude',
+            field=models.FloatField(null=True, validators=[django.core.validators.MinValueValidator(-180), django.core.validators.MaxValueValidator(180)]),
+        ),
+        migrations.AddField(
+            model_name='baseuser',
+            name='geohash',
+            field=models.CharField(editable=False, max_length=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='baseuser',
+            name='latitude',
+            field=models.FloatField(null=True, validators=[django.core.validators.MinValueValidator(-90), django.core.validators.MaxValueValidator(90)]),
+        ),
+        migrations.AddField(
+            model_name='baseuser',
+            name='longitude',
+            field=models.FloatField(null=True, validators=[django.core.validators.MinValueValidator(-180), django.core.validators.MaxValueValidator(180)]),
+        ),
+        migrations.AddIndex(
+            model_name='assistant',
+            index=models.Index(fields=['geohash', 'latitude', 'longitude', 'user'], name='assistant_location'),
+        ),
+    ]
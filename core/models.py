@@ -1,8 +1,13 @@
 from uuid import uuid4
 
 from django.contrib.auth.models import AbstractUser
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.db.models.signals import post_save
+from django.utils import timezone
 
+from .geohash import MAX_PRECISION
+from .geohash import encode as encode_geohash
 from .managers import CustomBaseManager
 
 
@@ -23,12 +28,89 @@ class User(AbstractUser):
     REQUIRED_FIELDS = []
 
 
-class BaseUser(models.Model):
+class VersionedModel(models.Model):
+    """A model whose ``version`` changes on every save, used for ETags."""
+
+    # Random rather than a counter, so two racing saves of the same row can
+    # never leave different contents under one version
+    version = models.UUIDField(default=uuid4, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, update_fields=None, **kwargs):
+        self.version = uuid4()
+        if update_fields is not None:
+            update_fields = {*update_fields, "version"}
+        super().save(*args, update_fields=update_fields, **kwargs)
+
+    def save_if_version(self, version, update_fields):
+        """
+        Save ``update_fields`` only if the row is still at ``version``, in a
+        single UPDATE. Return whether it was saved.
+        """
+        new_version = uuid4()
+        values = {name: getattr(self, name) for name in update_fields}
+        saved = (
+            type(self)
+            ._default_manager.filter(pk=self.pk, version=version)
+            .update(version=new_version, **values)
+        )
+        if saved:
+            self.version = new_version
+            # As save() would, so receivers keep caches and indexes in step
+            post_save.send(
+                sender=type(self),
+                instance=self,
+                created=False,
+                update_fields=frozenset([*update_fields, "version"]),
+                raw=False,
+                using=self._state.db,
+            )
+        return bool(saved)
+
+
+class LocatedModel(models.Model):
+    """A model with coordinates, and their geohash for lookups by area."""
+
+    latitude = models.FloatField(
+        null=True, validators=[MinValueValidator(-90), MaxValueValidator(90)]
+    )
+    longitude = models.FloatField(
+        null=True, validators=[MinValueValidator(-180), MaxValueValidator(180)]
+    )
+    geohash = models.CharField(max_length=MAX_PRECISION, null=True, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def update_geohash(self, update_fields):
+        """Recompute the geohash, return ``update_fields`` including it."""
+        if update_fields is not None:
+            if not {"latitude", "longitude"} & set(update_fields):
+                return update_fields
+            update_fields = {*update_fields, "geohash"}
+
+        if self.latitude is None or self.longitude is None:
+            self.geohash = None
+        else:
+            self.geohash = encode_geohash(self.latitude, self.longitude)
+        return update_fields
+
+    def save(self, *args, update_fields=None, **kwargs):
+        update_fields = self.update_geohash(update_fields)
+        super().save(*args, update_fields=update_fields, **kwargs)
+
+    def save_if_version(self, version, update_fields):
+        return super().save_if_version(version, self.update_geohash(update_fields))
+
+
+class BaseUser(LocatedModel, VersionedModel):
     location = models.TextField(null=True)
     user = models.OneToOneField(User, on_delete=models.CASCADE)
 
 
-class Assistant(models.Model):
+class Assistant(LocatedModel, VersionedModel):
     IDENTITY = [
         ("NIN", "NIN"),
         ("Passport", "Passport"),
@@ -54,8 +136,44 @@ class Assistant(models.Model):
 
     user = models.OneToOneField(User, on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [
+            # Nearby searches filter a cell's rows on their coordinates and
+            # only then look up their users
+            models.Index(
+                fields=["geohash", "latitude", "longitude", "user"],
+                name="assistant_location",
+            )
+        ]
+
 
 class OTP(models.Model):
-    counter = models.IntegerField(default=1)
+    counter = models.BigIntegerField(default=1)
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     time_created = models.TimeField(auto_now=True)
+    date_updated = models.DateTimeField(auto_now=True)
+
+
+class QueuedEmail(models.Model):
+    """An outgoing email, written by core.mail.QueuedEmailBackend."""
+
+    class Status(models.TextChoices):
+        PENDING = "pending"
+        SENT = "sent"
+        FAILED = "failed"
+
+    # Pickled EmailMessage, so any message Django can send can be queued
+    message = models.BinaryField()
+    subject = models.CharField(max_length=255)
+    recipients = models.TextField()
+    status = models.CharField(
+        max_length=10, choices=Status.choices, default=Status.PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    date_created = models.DateTimeField(auto_now_add=True)
+    date_sent = models.DateTimeField(null=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "next_attempt"])]
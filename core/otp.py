@@ -1,74 +1,200 @@
 import base64
+import time
+from abc import ABC, abstractmethod
+from datetime import timedelta
+from functools import cache
 
 from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.module_loading import import_string
 from pyotp import HOTP
-from datetime import datetime, timedelta
-
 
+from core.caches import is_shared
 from core.models import OTP
 
 
+class OTPStore(ABC):
+    """
+    Keeps the HOTP counter of each user.
+
+    issue(user_id): advance the counter and return the value to build a new
+    OTP from.
+    current(user_id): return ``(counter, expired)`` for the last issued OTP,
+    or None if the user never asked for one.
+    """
+
+    def __init__(self, ttl=300, **options):
+        self.ttl = ttl
+
+    @abstractmethod
+    def issue(self, user_id):
+        pass
+
+    @abstractmethod
+    def current(self, user_id):
+        pass
+
+
+class DatabaseOTPStore(OTPStore):
+    """Counters in the core_otp table, two or three queries per OTP sent."""
+
+    def issue(self, user_id):
+        # Seed from the clock, expired rows are deleted by core.tasks.sweep_otps
+        obj, created = OTP.objects.get_or_create(
+            user_id=user_id, defaults={"counter": int(time.time())}
+        )
+        counter = obj.counter
+
+        obj.counter += 1
+        obj.save()
+
+        return counter
+
+    def current(self, user_id):
+        row = OTP.objects.filter(user_id=user_id).values_list(
+            "counter", "date_updated"
+        ).first()
+        if row is None:
+            return None
+
+        # A full datetime, time_created alone goes wrong across midnight
+        counter, date_updated = row
+        expired = timezone.now() - date_updated > timedelta(seconds=self.ttl)
+
+        return counter - 1, expired
+
+
+class CacheOTPStore(OTPStore):
+    """
+    Counters in a Django cache, no database queries.
+
+    The counter is bumped with the cache's atomic ``incr``, and kept for
+    ``counter_ttl`` seconds after the last OTP, a day by default. A second
+    key holding the issued counter expires with the cache's own TTL, so an
+    OTP is expired exactly when that key is gone.
+
+    The cache must be shared by every process (Redis, Memcached, database):
+    on LocMem an OTP sent by one worker is unknown to the others. A local
+    cache is refused unless ``ALLOW_LOCAL`` is set, for a single process.
+    """
+
+    def __init__(
+        self,
+        ttl=300,
+        cache_alias="default",
+        allow_local=False,
+        counter_ttl=86400,
+        **options,
+    ):
+        super().__init__(ttl)
+        self.counter_ttl = counter_ttl
+        if not allow_local and not is_shared(cache_alias):
+            raise ImproperlyConfigured(
+                f"CacheOTPStore needs a shared cache, {cache_alias!r} is per process"
+            )
+        self.cache_alias = cache_alias
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def issue(self, user_id):
+        key = f"otp:{user_id}"
+        # Seed from the clock, so a flushed or expired counter never
+        # re-issues old values
+        self.cache.add(key, int(time.time()), timeout=self.counter_ttl)
+        try:
+            counter = self.cache.incr(key)
+        except ValueError:
+            # Evicted between add and incr
+            self.cache.add(key, int(time.time()), timeout=self.counter_ttl)
+            counter = self.cache.incr(key)
+        # incr keeps the expiry add set, abandoned counters go after a while
+        self.cache.touch(key, self.counter_ttl)
+
+        self.cache.set(f"{key}:live", counter, timeout=self.ttl)
+        return counter
+
+    def current(self, user_id):
+        key = f"otp:{user_id}"
+        values = self.cache.get_many([key, f"{key}:live"])
+
+        if key not in values:
+            return None
+        return values[key], f"{key}:live" not in values
+
+
+@cache
+def get_otp_store():
+    options = {**getattr(settings, "OTP_STORE", {})}
+    backend = options.pop("BACKEND", "core.otp.DatabaseOTPStore")
+
+    return import_string(backend)(**{name.lower(): v for name, v in options.items()})
+
+
+@cache
+def get_secret():
+    """
+    Derived from SECRET_KEY once per process.
+
+    # Note: the otp_auth scheme DOES NOT use base32 padding for secret lengths not divisible by 8.
+    # Some third-party tools have bugs when dealing with such secrets.
+    # We might consider warning the user when generating a secret of length not divisible by 8.
+
+    """
+    string = getattr(settings, "SECRET_KEY")
+
+    base32_encoded = base64.b32encode(string.encode("utf-8"))
+
+    secret = base32_encoded.decode("utf-8")
+
+    return secret[:32]
+
+
+@receiver(setting_changed)
+def reset_otp_settings(*, setting, **kwargs):
+    if setting == "OTP_STORE":
+        get_otp_store.cache_clear()
+    elif setting == "SECRET_KEY":
+        get_secret.cache_clear()
+
+
 class OTPGenerator:
     """
     secret_key(Base32): is needed to generate and verify the otp securely
     processed_id: is the first 4 digit of a UUID object type casted to Integer
-    counter: keeps track of otp request made by a user.
+    counter: keeps track of otp request made by a user, held by the OTP store.
     value: makes each request unique by adding processed_id and counter
     """
 
     def __init__(self, user_id, **kwargs) -> None:
-        self.secret_key = self.get_secret()
+        self.secret_key = get_secret()
         self.user_id = user_id
         self.processed_id = int(str(int(user_id))[:4])
         self.hotp = HOTP(self.secret_key, digits=6)
-        self.obj, created = OTP.objects.get_or_create(user_id=self.user_id)
+        self.store = get_otp_store()
 
     def get_otp(self):
-        value = self.processed_id + self.obj.counter
-        otp = self.hotp.at(value)
+        counter = self.store.issue(self.user_id)
 
-        self.obj.counter += 1
-        self.obj.save()
-
-        return otp
+        return self.hotp.at(self.processed_id + counter)
 
     def check_otp(self, otp):
+        current = self.store.current(self.user_id)
+        if current is None:
+            return "invalid"
 
-        # convert otp_time to datetime object to enable subtraction
-        otp_time = datetime.combine(datetime.today(), self.obj.time_created)
-        current_time = datetime.now()
-
-        time_check = current_time - otp_time <= timedelta(minutes=5)
-
-        
-        # get the previous counter associated with a user and evaluate to get value
-        value = self.processed_id + (self.obj.counter - 1)
-        verify_status = self.hotp.verify(otp, value)
+        # get the counter of the last issued otp and evaluate to get value
+        counter, expired = current
+        verify_status = self.hotp.verify(otp, self.processed_id + counter)
 
-        if verify_status and time_check:
-            return  "passed"
-        elif verify_status and not time_check:
+        if verify_status and not expired:
+            return "passed"
+        elif verify_status and expired:
             return "expired"
         else:
             return "invalid"
-
-        
-        
-
-        
-        
-
-    def get_secret(self):
-        """
-        # Note: the otp_auth scheme DOES NOT use base32 padding for secret lengths not divisible by 8.
-        # Some third-party tools have bugs when dealing with such secrets.
-        # We might consider warning the user when generating a secret of length not divisible by 8.
-
-        """
-        string = getattr(settings, "SECRET_KEY")
-
-        base32_encoded = base64.b32encode(string.encode("utf-8"))
-
-        secret = base32_encoded.decode("utf-8")
-
-        return secret[:32]
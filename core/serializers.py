@@ -1,11 +1,18 @@
 # import stripe
+import copy
+
 from decouple import config
 from django.contrib.auth import get_user_model, password_validation
 from django.core.exceptions import ValidationError
 from django.db import IntegrityError
 from rest_framework import serializers
 from rest_framework.response import Response
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from . import hashing
+from .etags import PreconditionFailed
 from .models import Assistant, BaseUser
+from .services import UserAlreadyExists, register_user
+from .tokens import refresh_access_token
 from .utils import Google, register_social_user
 
 
@@ -20,66 +27,87 @@ class RegisterSerializer(serializers.Serializer):
     is_assistant = serializers.BooleanField(default=False)
 
     def validate(self, attrs):
-        if get_user_model().objects.filter(email = attrs["email"]):
+        password_validation.validate_password(attrs['password'])
+        return super().validate(attrs)
+
+    def save(self, **kwargs):
+        # Blank names are left to the model defaults
+        fields = {
+            name: value
+            for name, value in self.validated_data.items()
+            if value is not None
+        }
+
+        # Duplicate emails are caught by the unique constraint on insert
+        try:
+            user = register_user(**fields)
+        except UserAlreadyExists:
             raise serializers.ValidationError(
                 detail={
                     "error": "User with provided credentials already exists",
                     "status": False,
                 }
             )
-        password_validation.validate_password(attrs['password'])
-        return super().validate(attrs)
-
-    def save(self, **kwargs):
-        (
-            first_name,
-            last_name,
-            email,
-            phone,
-            password,
-            is_assistant,
-        ) = self.validated_data.values()
-
-        # try:
-
-        user = get_user_model().objects._create_user(
-            first_name=first_name,
-            last_name=last_name,
-            email=email,
-            phone=phone,
-            password=password,
-            is_assistant=is_assistant,
-        )
-        # except IntegrityError:
-        #     # return Response(
-        #     #     data={
-        #     #         "message": "User with provided credentials already exists",
-        #     #         "status": False,
-        #     #     }
-        #     # )
-        #     raise serializers.ValidationError(
-        #         detail={
-        #             "message": "User with provided credentials already exists",
-        #             "status": False,
-        #         }
-        #     )
-        # except ValidationError as e:
-        #     raise serializers.ValidationError(detail=e.messages)
 
         return user
 
 
-class BaseUserSerializer(serializers.ModelSerializer):
+class CachedFieldsMixin:
+    """
+    Builds a ModelSerializer's fields once per class instead of per instance.
+
+    ModelSerializer introspects the model and constructs every field on each
+    instantiation. The result only depends on the class, so it is built
+    once and deep-copied, as DRF already does for declared fields.
+    """
+
+    def get_fields(self):
+        cls = type(self)
+        # Look in the class itself, subclasses have fields of their own
+        fields = cls.__dict__.get("_cached_fields")
+        if fields is None:
+            fields = super().get_fields()
+            cls._cached_fields = fields
+        return copy.deepcopy(fields)
+
+
+class BaseUserSerializer(CachedFieldsMixin, serializers.ModelSerializer):
     user_id = serializers.UUIDField(read_only=True)
     class Meta:
         model = BaseUser
-        fields = ["location", "user_id"]
+        fields = ["location", "latitude", "longitude", "user_id"]
 
-    def update(self, instance, validated_data):
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
+    def validate(self, attrs):
+        coordinates = [
+            attrs.get(name, getattr(self.instance, name, None))
+            for name in ("latitude", "longitude")
+        ]
+        if coordinates.count(None) == 1:
+            raise serializers.ValidationError(
+                "Give both the latitude and the longitude, or neither"
+            )
+        return super().validate(attrs)
 
-        instance.save()
+    def update(self, instance, validated_data):
+        changed = [
+            attr
+            for attr, value in validated_data.items()
+            if getattr(instance, attr) != value
+        ]
+        if not changed:
+            # Nothing to write, the version and ETag stay as they are
+            return instance
+
+        for attr in changed:
+            setattr(instance, attr, validated_data[attr])
+
+        # Only write the changed columns, and with If-Match only if the row
+        # is still the version the client read
+        expected_version = self.context.get("expected_version")
+        if expected_version is None:
+            instance.save(update_fields=changed)
+        elif not instance.save_if_version(expected_version, changed):
+            raise PreconditionFailed()
 
         return instance
 
@@ -88,7 +116,7 @@ class AssistantSerializer(BaseUserSerializer):
     class Meta:
         model = Assistant
         fields = ["age", "bio", "passport", "services", "qualifications", "id_card", 
-                  "id_card_number", "height", "disability","allergy", "experience", "user_id" ]
+                  "id_card_number", "experience", "latitude", "longitude", "user_id" ]
 
 
 class ForgotPasswordSerializer(serializers.Serializer):
@@ -116,7 +144,7 @@ class PasswordUpdateSerializer(serializers.Serializer):
 
         user = self.context["user"]
 
-        if not user.check_password(attrs["old_password"]):
+        if not hashing.check_password(user, attrs["old_password"]):
             raise serializers.ValidationError({"message": "Invalid old password"})
 
         return super().validate(attrs)
@@ -170,4 +198,16 @@ class GoogleSocialAuthSerializer(serializers.Serializer):
 
 class OTPSerializer(serializers.Serializer):
     email = serializers.EmailField()
-    otp = serializers.CharField(max_length=6)
\ No newline at end of file
+    otp = serializers.CharField(max_length=6)
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """Re-reads the user so refreshed claims-only tokens carry fresh claims"""
+
+    def validate(self, attrs):
+        # Checked before simplejwt rotates and blacklists the refresh token
+        access = refresh_access_token(self.token_class(attrs["refresh"]))
+
+        data = super().validate(attrs)
+        data["access"] = str(access)
+        return data
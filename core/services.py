@@ -0,0 +1,28 @@
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+
+
+class UserAlreadyExists(Exception):
+    pass
+
+
+def register_user(email, password, **extra_fields):
+    """
+    Create a user together with its profile and wallet, all or nothing.
+
+    The profile (core.signals) and wallet (payments.signals) are inserted by
+    post_save receivers, which run inside this transaction. The unique email
+    constraint catches duplicates, so no existence query runs beforehand. A
+    registration costs three INSERTs in one transaction. Only a failed
+    insert looks the email up, any other integrity error is raised as is.
+    """
+    User = get_user_model()
+    try:
+        with transaction.atomic():
+            return User.objects._create_user(
+                email=email, password=password, **extra_fields
+            )
+    except IntegrityError:
+        if User.objects.filter(email=User.objects.normalize_email(email)).exists():
+            raise UserAlreadyExists(email) from None
+        raise
@@ -1,6 +1,9 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
+from django.core.cache import cache
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
+from core.authentication import get_user_cache
+from core.etags import profile_version_key, remember_profile_version
 from core.models import BaseUser, Assistant
 
 
@@ -12,4 +15,22 @@ def create_profiles(*args, **kwargs):
         else:
             BaseUser.objects.create(user = kwargs['instance'])
 
- 
\ No newline at end of file
+
+@receiver(post_save, sender = get_user_model())
+@receiver(post_delete, sender = get_user_model())
+def invalidate_cached_user(*args, **kwargs):
+    # Covers password changes too, they are persisted with user.save()
+    get_user_cache().invalidate(kwargs['instance'].pk)
+
+
+@receiver(post_save, sender = BaseUser)
+@receiver(post_save, sender = Assistant)
+def remember_version(*args, **kwargs):
+    # Keeps conditional GETs on the profile from answering 304 to a stale ETag
+    remember_profile_version(kwargs['instance'])
+
+
+@receiver(post_delete, sender = BaseUser)
+@receiver(post_delete, sender = Assistant)
+def forget_version(*args, **kwargs):
+    cache.delete(profile_version_key(kwargs['instance'].user_id))
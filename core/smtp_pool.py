@@ -0,0 +1,244 @@
+"""
+An SMTP email backend that keeps its connections open between sends.
+
+Django's SMTP backend connects, says EHLO, negotiates TLS and logs in for
+every send_mail() call, then quits. PooledEmailBackend borrows an already
+authenticated connection from a per-process pool instead, and hands it back
+afterwards. A connection idle for more than ``CHECK_AFTER`` seconds is
+checked with NOOP before reuse, one idle for more than ``MAX_IDLE`` seconds
+is dropped, relays close those anyway.
+
+    EMAIL_BACKEND = "core.smtp_pool.PooledEmailBackend"
+    EMAIL_POOL = {"SIZE": 4, "MAX_IDLE": 60, "CHECK_AFTER": 5}
+
+send_bulk() spreads a list of messages over several pooled connections at
+once, for fan-out notifications.
+"""
+import atexit
+import os
+import smtplib
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+
+from django.conf import settings
+from django.core.mail.backends import smtp
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+DEFAULTS = {"SIZE": 4, "MAX_IDLE": 60, "CHECK_AFTER": 5}
+
+# Errors after which smtplib has reset the transaction, the connection is fine
+TRANSACTION_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException)
+
+
+class SMTPConnectionPool:
+    """
+    At most ``size`` connections to one relay, in use or idle.
+
+    ``connect`` opens a new, logged in ``smtplib.SMTP`` connection. Idle
+    connections are reused last in, first out, so the fewest stay warm.
+    """
+
+    def __init__(self, connect, size=4, max_idle=60, check_after=5):
+        self.connect = connect
+        self.max_idle = max_idle
+        self.check_after = check_after
+        self.created = 0
+        self._idle = deque()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        if not self._slots.acquire(timeout=timeout):
+            raise smtplib.SMTPConnectError(421, "No free connection in the pool")
+
+        try:
+            connection = self._pop_idle()
+            if connection is None:
+                connection = self.connect()
+                with self._lock:
+                    self.created += 1
+            return connection
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _pop_idle(self):
+        """Return a usable idle connection, closing stale ones on the way."""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                connection, last_used = self._idle.pop()
+
+            idle = time.monotonic() - last_used
+            if idle > self.max_idle:
+                close_quietly(connection)
+            elif idle > self.check_after and not is_alive(connection):
+                close_quietly(connection)
+            else:
+                return connection
+
+    def release(self, connection, broken=False):
+        if broken:
+            close_quietly(connection)
+        else:
+            with self._lock:
+                self._idle.append((connection, time.monotonic()))
+        self._slots.release()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, deque()
+        for connection, _ in idle:
+            close_quietly(connection)
+
+
+def is_alive(connection):
+    try:
+        return connection.noop()[0] == 250
+    except (smtplib.SMTPException, OSError):
+        return False
+
+
+def close_quietly(connection):
+    with suppress(smtplib.SMTPException, OSError):
+        connection.quit()
+    connection.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(backend):
+    key = (
+        backend.host,
+        backend.port,
+        backend.username,
+        backend.password,
+        backend.use_tls,
+        backend.use_ssl,
+        backend.ssl_certfile,
+        backend.ssl_keyfile,
+    )
+    with _pools_lock:
+        if key not in _pools:
+            options = {**DEFAULTS, **getattr(settings, "EMAIL_POOL", {})}
+            _pools[key] = SMTPConnectionPool(
+                backend.connect,
+                size=options["SIZE"],
+                max_idle=options["MAX_IDLE"],
+                check_after=options["CHECK_AFTER"],
+            )
+        return _pools[key]
+
+
+def close_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+atexit.register(close_pools)
+# A forked worker must not share the parent's sockets
+os.register_at_fork(after_in_child=_pools.clear)
+
+
+@receiver(setting_changed)
+def reset_pools(*, setting, **kwargs):
+    if setting == "EMAIL_POOL":
+        close_pools()
+
+
+class PooledEmailBackend(smtp.EmailBackend):
+    def connect(self):
+        """Open a new connection the way Django's backend does."""
+        backend = smtp.EmailBackend(
+            host=self.host,
+            port=self.port,
+            username=self.username,
+            password=self.password,
+            use_tls=self.use_tls,
+            use_ssl=self.use_ssl,
+            timeout=self.timeout,
+            ssl_keyfile=self.ssl_keyfile,
+            ssl_certfile=self.ssl_certfile,
+        )
+        backend.open()
+        return backend.connection
+
+    def open(self):
+        if self.connection:
+            return False
+        try:
+            self.connection = get_pool(self).acquire(timeout=self.timeout)
+        except OSError:
+            if not self.fail_silently:
+                raise
+            return None
+        return True
+
+    def close(self):
+        if self.connection is not None:
+            get_pool(self).release(self.connection)
+            self.connection = None
+
+    def discard(self):
+        if self.connection is not None:
+            get_pool(self).release(self.connection, broken=True)
+            self.connection = None
+
+    def send_messages(self, email_messages):
+        borrowed = self.connection is None
+        try:
+            return super().send_messages(email_messages)
+        except TRANSACTION_ERRORS:
+            if borrowed:
+                self.close()
+            raise
+        except Exception:
+            # Nobody knows what state the connection is in
+            self.discard()
+            raise
+
+
+def send_bulk(email_messages, workers=None, **backend_kwargs):
+    """
+    Send ``email_messages`` over up to ``workers`` pooled connections at once,
+    the pool size by default.
+
+    Return the number sent and a list of ``(message, error)`` for the others.
+    """
+    if workers is None:
+        workers = {**DEFAULTS, **getattr(settings, "EMAIL_POOL", {})}["SIZE"]
+    chunks = [email_messages[start::workers] for start in range(workers)]
+
+    def send_chunk(chunk):
+        sent, failed = 0, []
+        backend = PooledEmailBackend(**backend_kwargs)
+        # Hold one connection for the whole chunk. If it cannot be opened,
+        # every send below tries again and reports its own error.
+        with suppress(Exception):
+            backend.open()
+        try:
+            for message in chunk:
+                try:
+                    sent += backend.send_messages([message])
+                except Exception as error:
+                    failed.append((message, error))
+        finally:
+            backend.close()
+        return sent, failed
+
+    sent, failed = 0, []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for chunk_sent, chunk_failed in executor.map(send_chunk, chunks):
+            sent += chunk_sent
+            failed += chunk_failed
+    return sent, failed
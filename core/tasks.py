@@ -0,0 +1,30 @@
+"""Periodic maintenance, scheduled in settings.SCHEDULE."""
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+from .models import OTP
+
+
+def flush_expired_tokens():
+    """What simplejwt's flushexpiredtokens command does."""
+    deleted, _ = OutstandingToken.objects.filter(
+        expires_at__lte=timezone.now()
+    ).delete()
+    return f"Deleted {deleted} expired tokens and blacklist entries"
+
+
+def sweep_otps():
+    """
+    Delete the OTP rows of expired OTPs.
+
+    Counters of new rows are seeded from the clock, so a user asking again
+    later never gets a counter, and an OTP, they had before.
+    """
+    ttl = getattr(settings, "OTP_STORE", {}).get("TTL", 300)
+    deleted, _ = OTP.objects.filter(
+        date_updated__lt=timezone.now() - timedelta(seconds=ttl)
+    ).delete()
+    return f"Deleted {deleted} expired OTPs"
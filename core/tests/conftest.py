@@ -3,9 +3,16 @@ from django.contrib.auth import get_user_model
 from model_bakery import baker
 from rest_framework.test import APIClient
 
+from core import throttling
+
 User = get_user_model()
 
 
+@pytest.fixture(autouse=True)
+def reset_rate_limits():
+    throttling.local_store.clear()
+
+
 @pytest.fixture
 def api_client():
     return APIClient()
@@ -0,0 +1,114 @@
+import re
+
+import pytest
+from django.contrib.auth.signals import user_login_failed
+from django.urls import reverse
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+
+
+@pytest.mark.django_db
+class TestAsyncAccountViews:
+    def test_register_and_login(self, api_client):
+        data = {
+            "first_name": "test_first",
+            "last_name": "test_last",
+            "email": "async@example.com",
+            "phone": "+2349066757334",
+            "password": "simple-password",
+        }
+        response = api_client.post(reverse("async-register"), data, format="json")
+        assert response.status_code == status.HTTP_201_CREATED
+
+        response = api_client.post(
+            reverse("async-login"),
+            {"email": data["email"], "password": data["password"]},
+            format="json",
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert "tokens" in response.json()
+
+        refresh = response.json()["tokens"]["refresh"]
+        response = api_client.post(
+            reverse("async-token-refresh"), {"refresh": refresh}, format="json"
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_invalid_login_return_401(self, api_client, get_user):
+        user = get_user(save=True)
+
+        response = api_client.post(
+            reverse("async-login"),
+            {"email": user.email, "password": "wrong-password"},
+            format="json",
+        )
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_login_goes_through_the_backends(self, api_client, get_user):
+        inactive = get_user(save=True)
+        inactive.is_active = False
+        inactive.save()
+        failures = []
+
+        def receiver(sender, credentials, **kwargs):
+            failures.append(credentials)
+
+        user_login_failed.connect(receiver)
+        try:
+            response = api_client.post(
+                reverse("async-login"),
+                {"email": inactive.email, "password": "simple-password"},
+                format="json",
+            )
+        finally:
+            user_login_failed.disconnect(receiver)
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert [credentials["username"] for credentials in failures] == [
+            inactive.email
+        ]
+
+    def test_profile_requires_token(self, api_client, get_user):
+        response = api_client.get(reverse("async-profile"))
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+        token = AccessToken.for_user(get_user())
+        response = api_client.get(
+            reverse("async-profile"), HTTP_AUTHORIZATION=f"Bearer {token}"
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_forgot_password_sends_mail(self, api_client, get_user, mailoutbox):
+        response = api_client.post(
+            reverse("async-forgot-password"),
+            {"email": get_user().email},
+            format="json",
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(mailoutbox) == 1
+
+    def test_otp_send_and_verify(self, api_client, get_user):
+        user = get_user()
+
+        response = api_client.get(reverse("async-otp-send", args=[user.email]))
+        otp = re.search(r"\d{6}", response.json()["message"]).group()
+
+        response = api_client.post(
+            reverse("async-otp-verify"),
+            {"email": user.email, "otp": otp},
+            format="json",
+        )
+
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        user.refresh_from_db()
+        assert user.is_verified
+
+    def test_malformed_json_return_400(self, api_client):
+        response = api_client.post(
+            reverse("async-login"), "{not json", content_type="application/json"
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "JSON parse error" in response.json()["detail"]
@@ -0,0 +1,84 @@
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.authentication import get_user_cache
+
+
+@pytest.fixture
+def user_cache():
+    cache = get_user_cache()
+    cache.clear()
+    yield cache
+    cache.clear()
+
+
+@pytest.fixture
+def authorized_client(api_client, get_user):
+    user = get_user()
+    api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+    api_client.user = user
+    return api_client
+
+
+@pytest.mark.django_db
+class TestCachedJWTAuthentication:
+    url = reverse("profile")
+
+    def test_second_request_skips_user_query(
+        self, authorized_client, user_cache, django_assert_num_queries
+    ):
+        # user + profile
+        with django_assert_num_queries(2):
+            response = authorized_client.get(self.url)
+        assert response.status_code == status.HTTP_200_OK
+
+        # profile only
+        with django_assert_num_queries(1):
+            response = authorized_client.get(self.url)
+        assert response.status_code == status.HTTP_200_OK
+
+        assert user_cache.stats()["hits"] == 1
+        assert user_cache.stats()["misses"] == 1
+
+    def test_saving_user_drops_cached_entry(self, authorized_client, user_cache):
+        authorized_client.get(self.url)
+
+        user = authorized_client.user
+        user.set_password("another-password")
+        user.save()
+
+        assert user_cache.get(user.pk) is None
+
+    def test_deactivated_user_is_rejected(self, authorized_client, user_cache):
+        authorized_client.get(self.url)
+
+        authorized_client.user.is_active = False
+        authorized_client.user.save()
+        response = authorized_client.get(self.url)
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_password_update_keeps_newer_fields(self, api_client, get_user, user_cache):
+        user = get_user(save=True)
+        api_client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}"
+        )
+        api_client.get(self.url)
+        # Verified by another worker, whose save never reached this cache
+        type(user).objects.filter(pk=user.pk).update(is_verified=True)
+
+        response = api_client.post(
+            reverse("password-update"),
+            {
+                "old_password": "simple-password",
+                "password1": "a-new-long-password",
+                "password2": "a-new-long-password",
+            },
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        user.refresh_from_db()
+        assert user.is_verified
+        assert user.check_password("a-new-long-password")
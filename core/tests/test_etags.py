@@ -0,0 +1,179 @@
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from model_bakery import baker
+from rest_framework import status
+
+from core.etags import (
+    etag_matches,
+    make_etag,
+    profile_version_key,
+    remember_profile_version,
+)
+from core.models import Assistant, BaseUser
+from core.tokens import ClaimsRefreshToken
+
+PROFILES = [
+    (False, {"location": "Lagos"}),
+    (True, {"age": 30, "bio": "Tidy and punctual", "services": ["cleaning"]}),
+]
+
+
+@pytest.fixture
+def claims_mode(settings):
+    settings.CLAIMS_AUTH = {"ENABLED": True, "MAX_AGE": timedelta(minutes=15)}
+
+
+@pytest.fixture
+def shared_cache(settings, tmp_path):
+    # Seen by every process, unlike the default LocMem cache
+    settings.CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": str(tmp_path / "cache"),
+        }
+    }
+
+
+class TestEtagMatches:
+    def test_exact(self):
+        assert etag_matches('"a", "b"', '"b"')
+        assert not etag_matches('"a"', '"b"')
+
+    def test_weak_and_wildcard(self):
+        assert etag_matches('W/"b"', '"b"')
+        assert etag_matches("*", '"b"')
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("is_assistant, data", PROFILES)
+class TestProfileETags:
+    url = reverse("profile")
+
+    @pytest.fixture
+    def client(self, api_client, claims_mode, is_assistant):
+        self.user = baker.make(get_user_model(), is_assistant=is_assistant)
+        token = ClaimsRefreshToken.for_user(self.user).access_token
+        api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        return api_client
+
+    def profile(self):
+        Model = Assistant if self.user.is_assistant else BaseUser
+        return Model.objects.get(user=self.user)
+
+    def test_get_sets_etag(self, client, is_assistant, data):
+        response = client.get(self.url)
+
+        assert response["ETag"] == make_etag(self.profile().version.hex)
+        assert "no-cache" in response["Cache-Control"]
+
+    @pytest.mark.usefixtures("shared_cache")
+    def test_unchanged_is_304_without_queries(
+        self, client, django_assert_num_queries, is_assistant, data
+    ):
+        etag = client.get(self.url)["ETag"]
+
+        with django_assert_num_queries(0):
+            response = client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response["ETag"] == etag
+        assert not response.content
+
+    @pytest.mark.usefixtures("shared_cache")
+    def test_version_read_alone_when_not_cached(
+        self, client, django_assert_num_queries, is_assistant, data
+    ):
+        etag = client.get(self.url)["ETag"]
+        cache.delete(profile_version_key(self.user.pk))
+
+        with django_assert_num_queries(1) as queries:
+            response = client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert "JOIN" not in queries.captured_queries[0]["sql"]
+
+    def test_local_cache_is_not_trusted(
+        self, client, django_assert_num_queries, is_assistant, data
+    ):
+        etag = client.get(self.url)["ETag"]
+        # As if another process had changed it
+        self.profile().save()
+
+        with django_assert_num_queries(2):
+            response = client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert cache.get(profile_version_key(self.user.pk)) is None
+
+    @pytest.mark.usefixtures("shared_cache")
+    def test_reads_do_not_overwrite_newer_versions(self, client, is_assistant, data):
+        stale = self.profile()
+        fresh = self.profile()
+        fresh.save()
+
+        remember_profile_version(stale, overwrite=False)
+
+        assert cache.get(profile_version_key(self.user.pk)) == fresh.version
+
+    def test_changed_is_200(self, client, is_assistant, data):
+        etag = client.get(self.url)["ETag"]
+        profile = self.profile()
+        for name, value in data.items():
+            setattr(profile, name, value)
+        profile.save()
+
+        response = client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["ETag"] != etag
+        assert response.data.items() >= data.items()
+
+    def test_put_changes_etag(self, client, is_assistant, data):
+        etag = client.get(self.url)["ETag"]
+
+        response = client.put(self.url, data, format="json")
+
+        assert response["ETag"] == make_etag(self.profile().version.hex) != etag
+        assert client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    def test_put_if_match(self, client, is_assistant, data):
+        etag = client.get(self.url)["ETag"]
+
+        response = client.put(self.url, data, format="json", HTTP_IF_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["ETag"] == make_etag(self.profile().version.hex)
+        assert self.profile().version.hex not in etag
+
+    def test_put_if_match_stale(self, client, is_assistant, data):
+        etag = client.get(self.url)["ETag"]
+        client.put(self.url, data, format="json")
+        before = self.profile()
+
+        response = client.put(
+            self.url, {**data, "location": "Abuja", "bio": "x"}, HTTP_IF_MATCH=etag
+        )
+
+        assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+        assert self.profile().version == before.version
+
+    def test_put_if_match_lost_race(self, client, is_assistant, data, monkeypatch):
+        etag = client.get(self.url)["ETag"]
+        Model = type(self.profile())
+        save_if_version = Model.save_if_version
+
+        def concurrent_write(profile, *args):
+            # Another request saves between the If-Match check and the UPDATE
+            Model.objects.get(pk=profile.pk).save()
+            return save_if_version(profile, *args)
+
+        monkeypatch.setattr(Model, "save_if_version", concurrent_write)
+        response = client.put(self.url, data, format="json", HTTP_IF_MATCH=etag)
+
+        assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+        profile = self.profile()
+        assert all(getattr(profile, name) != value for name, value in data.items())
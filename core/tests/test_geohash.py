@@ -0,0 +1,52 @@
+import pytest
+
+from core.geohash import (
+    bounding_box,
+    covered_radius,
+    distance,
+    encode,
+    neighbourhood,
+)
+
+LAGOS = (6.5244, 3.3792)
+ABUJA = (9.0765, 7.3986)
+
+
+class TestGeohash:
+    def test_encode(self):
+        assert encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+        assert encode(*LAGOS).startswith(encode(*LAGOS, 6))
+
+    def test_neighbourhood(self):
+        cells = neighbourhood(*LAGOS, 6)
+
+        assert len(cells) == 9
+        assert encode(*LAGOS, 6) in cells
+        assert all(len(cell) == 6 for cell in cells)
+
+    def test_neighbourhood_across_the_antimeridian(self):
+        cells = neighbourhood(0.1, 179.99, 4)
+
+        assert encode(0.1, -179.99, 4) in cells
+
+    def test_neighbourhood_at_a_pole(self):
+        assert len(neighbourhood(89.99, 0, 3)) == 6
+
+    def test_covered_radius(self):
+        # Each precision at least halves the reach
+        radii = [covered_radius(LAGOS[0], precision) for precision in range(1, 13)]
+        assert all(finer <= coarser / 2 for coarser, finer in zip(radii, radii[1:]))
+        assert 4 < covered_radius(LAGOS[0], 5) < 5
+
+    def test_bounding_box(self):
+        (south, north), (west, east) = bounding_box(*LAGOS, 10)
+
+        assert distance(*LAGOS, north, LAGOS[1]) == pytest.approx(10)
+        assert distance(*LAGOS, LAGOS[0], east) > 10
+        assert bounding_box(89.95, 0, 10)[1] is None
+        assert bounding_box(0, 179.95, 10)[1] is None
+
+    def test_distance(self):
+        assert distance(*LAGOS, *LAGOS) == 0
+        assert distance(*LAGOS, *ABUJA) == pytest.approx(526, abs=1)
+        assert distance(0, 0, 0, 180) == pytest.approx(20015, abs=1)
@@ -0,0 +1,161 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import rsa
+from google.auth import crypt, jwt
+
+from core.utils import Google, GoogleCertificates
+
+
+class CertsHandler(BaseHTTPRequestHandler):
+    """Stand-in for https://www.googleapis.com/oauth2/v1/certs"""
+
+    def do_GET(self):
+        self.server.hits += 1
+        body = json.dumps(self.server.certs).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Cache-Control", f"public, max-age={self.server.max_age}")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def keys():
+    public, private = rsa.newkeys(1024)
+    return public.save_pkcs1().decode(), private.save_pkcs1().decode()
+
+
+@pytest.fixture
+def certs_server(keys):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CertsHandler)
+    server.hits = 0
+    server.max_age = 3600
+    server.certs = {"key-1": keys[0]}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/certs"
+    yield server
+    server.shutdown()
+
+
+def make_token(keys, key_id="key-1", **claims):
+    signer = crypt.RSASigner.from_string(keys[1], key_id=key_id)
+    now = int(time.time())
+    payload = {
+        "iss": "https://accounts.google.com",
+        "aud": "client-id",
+        "sub": "1234",
+        "iat": now,
+        "exp": now + 600,
+        **claims,
+    }
+    return jwt.encode(signer, payload).decode()
+
+
+class TestGoogleCertificates:
+    def test_warm_cache_verifies_offline(self, keys, certs_server):
+        certificates = GoogleCertificates(url=certs_server.url)
+
+        for _ in range(5):
+            idinfo = certificates.verify(make_token(keys))
+
+        assert idinfo["sub"] == "1234"
+        assert certs_server.hits == 1
+
+    def test_refreshes_in_background_before_expiry(self, keys, certs_server):
+        certs_server.max_age = 2
+        certificates = GoogleCertificates(
+            url=certs_server.url, refresh_margin=1, min_max_age=1
+        )
+
+        certificates.verify(make_token(keys))
+        time.sleep(1.1)
+        certificates.verify(make_token(keys))
+        certificates._refresher.join(timeout=5)
+
+        assert certs_server.hits == 2
+
+    def test_unknown_key_id_triggers_refetch(self, keys, certs_server):
+        certificates = GoogleCertificates(url=certs_server.url)
+        certificates.verify(make_token(keys))
+
+        certs_server.certs["key-2"] = keys[0]
+        certificates.verify(make_token(keys, key_id="key-2"))
+
+        assert certs_server.hits == 2
+
+    def test_unknown_key_ids_refetch_once_per_interval(self, keys, certs_server):
+        certificates = GoogleCertificates(url=certs_server.url)
+        certificates.verify(make_token(keys))
+
+        for _ in range(5):
+            with pytest.raises(ValueError):
+                certificates.verify(make_token(keys, key_id="forged"))
+
+        assert certs_server.hits == 2
+
+    def test_missing_max_age_has_a_floor(self, keys, certs_server):
+        certs_server.max_age = 0
+        certificates = GoogleCertificates(url=certs_server.url, min_max_age=60)
+
+        for _ in range(3):
+            certificates.verify(make_token(keys))
+
+        assert certs_server.hits == 1
+
+    def test_refresh_does_not_block_readers(self, keys, certs_server, monkeypatch):
+        certificates = GoogleCertificates(url=certs_server.url)
+        certificates.verify(make_token(keys))
+        release = threading.Event()
+        get = certificates.session.get
+
+        def slow_get(*args, **kwargs):
+            release.wait(5)
+            return get(*args, **kwargs)
+
+        monkeypatch.setattr(certificates.session, "get", slow_get)
+        certificates._refresh_at = 0
+
+        start = time.monotonic()
+        for _ in range(3):
+            certificates.verify(make_token(keys))
+        elapsed = time.monotonic() - start
+        release.set()
+        certificates._refresher.join(timeout=5)
+
+        assert elapsed < 1
+        assert certs_server.hits == 2
+
+    def test_concurrent_cold_fetches_hit_google_once(self, keys, certs_server):
+        certificates = GoogleCertificates(url=certs_server.url)
+        workers = [
+            threading.Thread(target=certificates.verify, args=(make_token(keys),))
+            for _ in range(8)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        assert certs_server.hits == 1
+
+    def test_wrong_issuer_is_rejected(self, keys, certs_server):
+        certificates = GoogleCertificates(url=certs_server.url)
+
+        with pytest.raises(ValueError):
+            certificates.verify(make_token(keys, iss="https://evil.example.com"))
+
+    def test_validate_uses_configured_endpoint(self, keys, certs_server, settings):
+        settings.GOOGLE_CERTS_URL = certs_server.url
+
+        assert Google.validate(make_token(keys))["sub"] == "1234"
+        assert Google.validate("not-a-token").status_code == 401
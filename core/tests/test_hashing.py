@@ -0,0 +1,69 @@
+import threading
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.urls import reverse
+from rest_framework import status
+
+from core import hashing
+
+User = get_user_model()
+
+
+@pytest.fixture
+def small_pool(settings):
+    settings.PASSWORD_HASHING = {
+        "EXECUTOR": "thread",
+        "MAX_WORKERS": 1,
+        "QUEUE_TIMEOUT": 0.01,
+        "RETRY_AFTER": 3,
+    }
+    yield hashing.get_executor()
+    hashing.reset_executor()
+
+
+@pytest.mark.django_db
+class TestHashingPool:
+    def test_login_when_pool_saturated_returns_503(
+        self, api_client, get_user, small_pool
+    ):
+        user = get_user(save=True)
+        release = threading.Event()
+        small_pool.submit(release.wait)
+
+        try:
+            response = api_client.post(
+                reverse("login"),
+                {"email": user.email, "password": "simple-password"},
+                format="json",
+            )
+        finally:
+            release.set()
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response["Retry-After"] == "3"
+
+    def test_slot_is_released_after_hashing(self, get_user, small_pool):
+        user = get_user(save=True)
+
+        assert hashing.check_password(user, "simple-password")
+        assert not hashing.check_password(user, "wrong-password")
+
+    def test_outdated_hash_is_upgraded(self, get_user):
+        user = get_user()
+        hasher = PBKDF2PasswordHasher()
+        user.password = hasher.encode(
+            "simple-password", hasher.salt(), iterations=1000
+        )
+        user.save()
+
+        assert hashing.check_password(user, "simple-password")
+
+        user.refresh_from_db()
+        assert not hasher.must_update(user.password)
+
+    def test_create_user_hashes_on_pool(self):
+        user = User.objects.create_user(email="pool@example.com", password="p4ssw0rd!")
+
+        assert user.check_password("p4ssw0rd!")
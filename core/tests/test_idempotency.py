@@ -0,0 +1,241 @@
+import threading
+import time
+import uuid
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.urls import reverse
+from model_bakery import baker
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+from core import serializers
+from core.idempotency import IdempotencyMixin
+
+User = get_user_model()
+LOCAL_CACHE = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+
+
+class CountingView(IdempotencyMixin, APIView):
+    authentication_classes = []
+    permission_classes = []
+    calls = 0
+    delay = 0
+    status_code = status.HTTP_201_CREATED
+
+    def post(self, request):
+        type(self).calls += 1
+        time.sleep(self.delay)
+        return Response({"call": self.calls}, status=self.status_code)
+
+
+@pytest.fixture(autouse=True)
+def shared_cache(settings, tmp_path):
+    # Seen by every process, unlike the default LocMem cache
+    settings.CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": str(tmp_path / "cache"),
+        }
+    }
+
+
+@pytest.fixture
+def counting_view():
+    CountingView.calls = 0
+    yield CountingView
+    CountingView.delay = 0
+    CountingView.status_code = status.HTTP_201_CREATED
+
+
+def call(view, key, data=None, path="/counting"):
+    request = APIRequestFactory().post(
+        path, data or {"amount": 1}, format="json", HTTP_IDEMPOTENCY_KEY=key
+    )
+    response = view.as_view()(request)
+    # Replays are plain HttpResponses, already rendered
+    return response.render() if hasattr(response, "render") else response
+
+
+class TestIdempotencyMixin:
+    def test_replays_the_first_response(self, counting_view):
+        key = str(uuid.uuid4())
+
+        first = call(counting_view, key)
+        second = call(counting_view, key)
+
+        assert counting_view.calls == 1
+        assert second.status_code == status.HTTP_201_CREATED
+        assert second.content == first.content
+        assert second["Content-Type"] == first["Content-Type"]
+        assert second["Idempotent-Replayed"] == "true"
+
+    def test_keys_are_per_endpoint(self, counting_view):
+        key = str(uuid.uuid4())
+
+        call(counting_view, key)
+        call(counting_view, key, path="/other")
+
+        assert counting_view.calls == 2
+
+    def test_reused_key_with_another_body(self, counting_view):
+        key = str(uuid.uuid4())
+        call(counting_view, key)
+
+        response = call(counting_view, key, {"amount": 2})
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        assert counting_view.calls == 1
+
+    def test_server_errors_are_not_stored(self, counting_view):
+        key = str(uuid.uuid4())
+        counting_view.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        call(counting_view, key)
+
+        counting_view.status_code = status.HTTP_201_CREATED
+        response = call(counting_view, key)
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert counting_view.calls == 2
+
+    def test_without_a_key(self, counting_view):
+        request = APIRequestFactory().post("/counting", {}, format="json")
+        counting_view.as_view()(request)
+        counting_view.as_view()(request)
+
+        assert counting_view.calls == 2
+
+    def test_key_too_long(self, counting_view):
+        response = call(counting_view, "k" * 256)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert counting_view.calls == 0
+
+    def test_concurrent_duplicates_run_once(self, counting_view):
+        key = str(uuid.uuid4())
+        counting_view.delay = 0.2
+        responses = []
+
+        def post():
+            responses.append(call(counting_view, key))
+
+        workers = [threading.Thread(target=post) for _ in range(5)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        assert counting_view.calls == 1
+        codes = [response.status_code for response in responses]
+        assert codes.count(status.HTTP_201_CREATED) >= 1
+        assert set(codes) <= {status.HTTP_201_CREATED, status.HTTP_409_CONFLICT}
+
+    def test_in_flight_is_a_conflict_at_once(self, counting_view):
+        key = str(uuid.uuid4())
+        counting_view.delay = 0.5
+        first = threading.Thread(target=call, args=(counting_view, key))
+        first.start()
+        time.sleep(0.1)
+
+        started = time.monotonic()
+        response = call(counting_view, key)
+        waited = time.monotonic() - started
+        first.join()
+
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert response["Retry-After"] == "1"
+        assert waited < 0.3
+        assert call(counting_view, key).status_code == status.HTTP_201_CREATED
+        assert counting_view.calls == 1
+
+    def test_refuses_a_local_cache(self, counting_view, settings):
+        settings.CACHES = LOCAL_CACHE
+
+        with pytest.raises(ImproperlyConfigured):
+            call(counting_view, str(uuid.uuid4()))
+
+    def test_local_cache_for_a_single_process(self, counting_view, settings):
+        settings.CACHES = LOCAL_CACHE
+        settings.IDEMPOTENCY = {"ALLOW_LOCAL": True}
+        key = str(uuid.uuid4())
+
+        call(counting_view, key)
+        assert call(counting_view, key)["Idempotent-Replayed"] == "true"
+
+
+@pytest.mark.django_db
+class TestIdempotentEndpoints:
+    data = {
+        "email": "retry@example.com",
+        "phone": "+2349066757334",
+        "password": "simple-password",
+        "is_assistant": False,
+    }
+
+    def test_register_retry(self, api_client, monkeypatch):
+        calls = []
+        register_user = serializers.register_user
+        monkeypatch.setattr(
+            serializers,
+            "register_user",
+            lambda **kwargs: calls.append(kwargs) or register_user(**kwargs),
+        )
+        headers = {"HTTP_IDEMPOTENCY_KEY": str(uuid.uuid4())}
+
+        first = api_client.post(reverse("register"), self.data, **headers)
+        second = api_client.post(reverse("register"), self.data, **headers)
+
+        assert first.status_code == second.status_code == status.HTTP_201_CREATED
+        assert second.content == first.content
+        assert User.objects.filter(email="retry@example.com").count() == 1
+        assert len(calls) == 1
+
+    def test_keys_are_per_user(self, api_client):
+        key = str(uuid.uuid4())
+        data = {
+            "old_password": "simple-password",
+            "password1": "a-new-long-password",
+            "password2": "a-new-long-password",
+        }
+        for _ in range(2):
+            user = baker.make(User)
+            user.set_password("simple-password")
+            user.save()
+            api_client.force_authenticate(user)
+
+            response = api_client.post(
+                reverse("password-update"), data, HTTP_IDEMPOTENCY_KEY=key
+            )
+
+            assert "Idempotent-Replayed" not in response
+            user.refresh_from_db()
+            assert user.check_password("a-new-long-password")
+
+
+    def test_async_register_retry(self, api_client):
+        headers = {"HTTP_IDEMPOTENCY_KEY": str(uuid.uuid4())}
+        url = reverse("async-register")
+
+        first = api_client.post(url, self.data, format="json", **headers)
+        second = api_client.post(url, self.data, format="json", **headers)
+
+        assert first.status_code == second.status_code == status.HTTP_201_CREATED
+        assert second.content == first.content
+        assert second["Idempotent-Replayed"] == "true"
+        assert User.objects.filter(email="retry@example.com").count() == 1
+
+    def test_tokens_are_not_stored(self, api_client, get_user):
+        user = get_user(save=True)
+        data = {"email": user.email, "password": "simple-password"}
+        headers = {"HTTP_IDEMPOTENCY_KEY": str(uuid.uuid4())}
+
+        first = api_client.post(reverse("login"), data, **headers)
+        second = api_client.post(reverse("login"), data, **headers)
+
+        assert "Idempotent-Replayed" not in second
+        assert first.data["status"] and second.data["status"]
@@ -0,0 +1,133 @@
+import json
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+
+from core.management.commands.import_users import Command
+from core.models import Assistant, BaseUser
+from payments.models import Wallet
+from search.models import IndexedAssistant
+from search.ranking import RankingEngine
+
+User = get_user_model()
+
+ROWS = """email,password,first_name,last_name,phone,is_assistant
+first@example.com,simple-password,First,User,09066757334,true
+second@example.com,simple-password,Second,User,09066757335,false
+not-an-email,simple-password,Bad,Row,,false
+first@example.com,simple-password,Duplicate,Row,,false
+third@example.com,,Third,User,,yes
+"""
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    path = tmp_path / "users.csv"
+    path.write_text(ROWS)
+    return path
+
+
+@pytest.mark.django_db
+class TestImportUsers:
+    def test_imports_valid_rows_and_rejects_bad_ones(self, csv_file):
+        call_command("import_users", str(csv_file), workers=0, chunk_size=2)
+
+        assert User.objects.count() == 3
+        assert Assistant.objects.count() == 2
+        assert BaseUser.objects.count() == 1
+        assert Wallet.objects.count() == 3
+        assert User.objects.get(email="first@example.com").check_password(
+            "simple-password"
+        )
+        assert not User.objects.get(email="third@example.com").has_usable_password()
+
+        rejects = [
+            json.loads(line)
+            for line in (csv_file.parent / "users.csv.rejects.jsonl").open()
+        ]
+        assert [reject["line"] for reject in rejects] == [4, 5]
+        assert all("password" not in reject["row"] for reject in rejects)
+
+    def test_assistants_are_indexed(self, csv_file):
+        engine = RankingEngine(use_numpy=False)
+        engine.rank()
+
+        call_command("import_users", str(csv_file), workers=0, chunk_size=2)
+
+        assistants = set(Assistant.objects.values_list("pk", flat=True))
+        indexed = IndexedAssistant.objects.values_list("assistant_id", flat=True)
+        assert set(indexed) == assistants
+        # Picked up from the change feed, without a full load
+        engine.load = None
+        assert {pk for pk, _ in engine.rank()} == assistants
+
+    def test_resume_skips_checkpointed_rows(self, csv_file):
+        checkpoint = csv_file.parent / "users.csv.checkpoint"
+        checkpoint.write_text(json.dumps({"rows": 4}))
+
+        call_command("import_users", str(csv_file), workers=0, resume=True)
+
+        assert list(User.objects.values_list("email", flat=True)) == [
+            "third@example.com"
+        ]
+        assert json.loads(checkpoint.read_text()) == {"rows": 5}
+
+    def test_jsonl_with_process_pool(self, tmp_path):
+        path = tmp_path / "users.jsonl"
+        path.write_text(
+            '{"email": "pool@example.com", "password": "simple-password"}\n'
+            "not json\n"
+        )
+
+        call_command("import_users", str(path), workers=2)
+
+        assert User.objects.get(email="pool@example.com").check_password(
+            "simple-password"
+        )
+        assert (tmp_path / "users.jsonl.rejects.jsonl").read_text().count("\n") == 1
+
+    def test_overlong_values_reject_the_row(self, tmp_path):
+        path = tmp_path / "users.csv"
+        path.write_text(
+            "email,phone,first_name\n"
+            "long-phone@example.com,+23490667573341234,Long\n"
+            f"long-name@example.com,,{'n' * 151}\n"
+            "fine@example.com,09066757334,Fine\n"
+        )
+
+        call_command("import_users", str(path), workers=0)
+
+        assert list(User.objects.values_list("email", flat=True)) == [
+            "fine@example.com"
+        ]
+        rejects = (tmp_path / "users.csv.rejects.jsonl").read_text().splitlines()
+        assert [json.loads(line)["line"] for line in rejects] == [2, 3]
+
+    def test_email_registered_during_the_import(self, csv_file, monkeypatch):
+        build_users = Command.build_users
+
+        def racing(self, chunk, pool):
+            users, bad_rows = build_users(self, chunk, pool)
+            if any(user.email == "second@example.com" for _, user in users):
+                # Registered after the existence check, before the insert
+                User.objects.create(email="second@example.com")
+            return users, bad_rows
+
+        monkeypatch.setattr(Command, "build_users", racing)
+
+        call_command("import_users", str(csv_file), workers=0, chunk_size=2)
+
+        assert set(User.objects.values_list("email", flat=True)) == {
+            "first@example.com",
+            "second@example.com",
+            "third@example.com",
+        }
+        # The registered user is left as is
+        assert User.objects.get(email="second@example.com").first_name == ""
+        rejects = [
+            json.loads(line)
+            for line in (csv_file.parent / "users.csv.rejects.jsonl").open()
+        ]
+        assert [reject["line"] for reject in rejects] == [3, 4, 5]
+        assert rejects[0]["reasons"] == ["User already exists"]
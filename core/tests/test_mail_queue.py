@@ -0,0 +1,125 @@
+import socket
+from datetime import timedelta
+
+import pytest
+from django.core.mail import send_mail
+from django.core.management import call_command
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from core.mail import queue_stats, retry
+from core.models import QueuedEmail
+from utils.smtp import LocalSMTPServer
+
+
+@pytest.fixture
+def smtp_server(settings):
+    server = LocalSMTPServer().start()
+    settings.EMAIL_BACKEND = "core.mail.QueuedEmailBackend"
+    settings.EMAIL_HOST = server.host
+    settings.EMAIL_PORT = server.port
+    settings.MAIL_QUEUE = {"BACKEND": "django.core.mail.backends.smtp.EmailBackend"}
+    yield server
+    server.stop()
+
+
+def queue(count, recipient="someone@example.com"):
+    for number in range(count):
+        send_mail(f"Subject {number}", "Body", "admin@studebt.com", [recipient])
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.mark.django_db
+class TestMailQueue:
+    def test_forgot_password_only_queues(self, api_client, get_user, smtp_server):
+        user = get_user()
+
+        response = api_client.post(reverse("forgot-password"), {"email": user.email})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert smtp_server.connections == 0
+        assert QueuedEmail.objects.get().recipients == user.email
+
+    def test_rolled_back_request_sends_nothing(self, smtp_server):
+        with pytest.raises(ZeroDivisionError), transaction.atomic():
+            queue(1)
+            1 / 0
+
+        assert not QueuedEmail.objects.exists()
+
+    def test_worker_sends_batches_over_one_connection(self, smtp_server):
+        queue(5)
+
+        call_command("send_queued_mail", "--once", "--batch-size=2", verbosity=0)
+
+        assert len(smtp_server.messages) == 5
+        assert smtp_server.connections == 1
+        assert not QueuedEmail.objects.exclude(status=QueuedEmail.Status.SENT)
+        assert b"Subject: Subject 4" in smtp_server.messages[4][2]
+
+    def test_rejected_recipient_fails_without_retry(self, smtp_server):
+        smtp_server.rejected.add("nobody@example.com")
+        queue(1, "nobody@example.com")
+        queue(1)
+
+        call_command("send_queued_mail", "--once", verbosity=0)
+
+        failed = QueuedEmail.objects.get(status=QueuedEmail.Status.FAILED)
+        assert failed.recipients == "nobody@example.com"
+        assert "SMTPRecipientsRefused" in failed.last_error
+        assert len(smtp_server.messages) == 1
+
+    def test_unreachable_relay_is_retried_later(self, smtp_server, settings):
+        settings.EMAIL_PORT = free_port()
+        queue(2)
+
+        call_command("send_queued_mail", "--once", verbosity=0)
+
+        for email in QueuedEmail.objects.all():
+            assert email.status == QueuedEmail.Status.PENDING
+            assert email.next_attempt > timezone.now()
+            # An outage is not held against the message
+            assert email.attempts == 0
+
+        # Once due again, the messages go out
+        QueuedEmail.objects.update(next_attempt=timezone.now())
+        settings.EMAIL_PORT = smtp_server.port
+        call_command("send_queued_mail", "--once", verbosity=0)
+
+        assert len(smtp_server.messages) == 2
+
+    def test_backoff_until_max_attempts(self, settings):
+        settings.MAIL_QUEUE = {"MAX_ATTEMPTS": 3, "RETRY_DELAY": 10}
+        email = QueuedEmail(attempts=1)
+
+        retry(email, OSError("timed out"))
+        first = email.next_attempt - timezone.now()
+        email.attempts = 2
+        retry(email, OSError("timed out"))
+        second = email.next_attempt - timezone.now()
+
+        assert timedelta(seconds=9) < first <= timedelta(seconds=10)
+        assert timedelta(seconds=19) < second <= timedelta(seconds=20)
+
+        email.attempts = 3
+        retry(email, OSError("timed out"))
+        assert email.status == QueuedEmail.Status.FAILED
+
+    def test_queue_stats(self, smtp_server):
+        queue(3)
+        call_command("send_queued_mail", "--once", verbosity=0)
+        queue(2)
+
+        stats = queue_stats()
+
+        assert stats["depth"] == 2
+        assert stats["sent"] == 3
+        assert stats["failed"] == 0
+        assert 0 <= stats["latency_p50"] <= stats["latency_p95"] < 5
@@ -0,0 +1,115 @@
+import re
+import time
+from datetime import timedelta
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import status
+
+from core.models import OTP
+from core.otp import CacheOTPStore, DatabaseOTPStore, OTPGenerator, OTPStore
+
+STORES = ["core.otp.DatabaseOTPStore", "core.otp.CacheOTPStore"]
+
+
+@pytest.fixture
+def shared_cache(settings, tmp_path):
+    # Seen by every process, unlike the default LocMem cache
+    settings.CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": str(tmp_path / "cache"),
+        }
+    }
+
+
+@pytest.fixture(params=STORES)
+def otp_store(request, settings, shared_cache):
+    settings.OTP_STORE = {"BACKEND": request.param, "TTL": 300}
+    return request.param
+
+
+def request_otp(api_client, user):
+    response = api_client.get(f"/accounts/otp/send/{user.email}")
+    return re.search(r"\d{6}", response.data["message"]).group()
+
+
+def verify_otp(api_client, user, otp):
+    return api_client.post(
+        "/accounts/otp/verify", {"email": user.email, "otp": otp}, format="json"
+    )
+
+
+@pytest.mark.django_db
+class TestOTPStores:
+    def test_send_and_verify(self, api_client, get_user, otp_store):
+        user = get_user()
+
+        response = verify_otp(api_client, user, request_otp(api_client, user))
+
+        assert response.status_code == status.HTTP_202_ACCEPTED
+
+    def test_only_latest_otp_is_valid(self, api_client, get_user, otp_store):
+        user = get_user()
+        first = request_otp(api_client, user)
+        second = request_otp(api_client, user)
+
+        assert first != second
+        assert verify_otp(api_client, user, first).status_code == 403
+        assert verify_otp(api_client, user, second).status_code == 202
+
+    def test_expired_otp(self, api_client, get_user, otp_store, settings):
+        settings.OTP_STORE = {"BACKEND": otp_store, "TTL": -1}
+        user = get_user()
+
+        response = verify_otp(api_client, user, request_otp(api_client, user))
+
+        assert response.status_code == status.HTTP_406_NOT_ACCEPTABLE
+
+    def test_cache_store_skips_database(
+        self, get_user, settings, shared_cache, django_assert_num_queries
+    ):
+        settings.OTP_STORE = {"BACKEND": "core.otp.CacheOTPStore"}
+        user = get_user()
+
+        with django_assert_num_queries(0):
+            generator = OTPGenerator(user_id=user.id)
+            assert generator.check_otp(generator.get_otp()) == "passed"
+
+
+@pytest.mark.django_db
+class TestDatabaseOTPStore:
+    def test_age_counts_the_date(self, get_user):
+        user = get_user()
+        store = DatabaseOTPStore(ttl=300)
+        store.issue(user.pk)
+        # Issued yesterday at this time of day
+        OTP.objects.filter(user=user).update(
+            date_updated=timezone.now() - timedelta(days=1)
+        )
+
+        assert store.current(user.pk)[1] is True
+
+
+class TestCacheOTPStore:
+    def test_refuses_a_local_cache(self):
+        with pytest.raises(ImproperlyConfigured):
+            CacheOTPStore()
+
+    def test_local_cache_for_a_single_process(self):
+        assert CacheOTPStore(allow_local=True).cache_alias == "default"
+
+    def test_stores_issue_and_check(self):
+        with pytest.raises(TypeError):
+            OTPStore()
+
+    def test_counters_expire(self, monkeypatch):
+        store = CacheOTPStore(allow_local=True, counter_ttl=60)
+        store.issue("user")
+        store.issue("user")
+        later = time.time() + 61
+
+        monkeypatch.setattr(time, "time", lambda: later)
+
+        assert store.current("user") is None
@@ -0,0 +1,190 @@
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from model_bakery import baker
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.authentication import get_user_cache
+from core.geohash import encode
+from core.models import Assistant, BaseUser
+from core.serializers import AssistantSerializer, BaseUserSerializer
+from core.tokens import ClaimsRefreshToken
+
+PROFILES = [
+    (False, {"location": "Lagos"}),
+    (True, {"age": 30, "bio": "Tidy and punctual", "services": ["cleaning"]}),
+]
+
+
+@pytest.fixture
+def claims_mode(settings):
+    settings.CLAIMS_AUTH = {"ENABLED": True, "MAX_AGE": timedelta(minutes=15)}
+
+
+def profile_of(user):
+    Model = Assistant if user.is_assistant else BaseUser
+    return Model.objects.get(user=user)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("is_assistant, data", PROFILES)
+class TestProfileQueries:
+    url = reverse("profile")
+
+    def client_for(self, api_client, is_assistant):
+        user = baker.make(get_user_model(), is_assistant=is_assistant)
+        token = ClaimsRefreshToken.for_user(user).access_token
+        api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        return api_client, user
+
+    def test_get_is_one_query(
+        self, api_client, claims_mode, django_assert_num_queries, is_assistant, data
+    ):
+        client, user = self.client_for(api_client, is_assistant)
+
+        # Profile joined to its user
+        with django_assert_num_queries(1):
+            response = client.get(self.url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["user_id"] == str(user.pk)
+
+    def test_put_is_two_queries(
+        self, api_client, claims_mode, django_assert_num_queries, is_assistant, data
+    ):
+        client, user = self.client_for(api_client, is_assistant)
+
+        # The join, then an UPDATE of the submitted columns
+        with django_assert_num_queries(2) as queries:
+            response = client.put(self.url, data, format="json")
+
+        assert response.status_code == status.HTTP_200_OK
+        for field, value in data.items():
+            assert getattr(profile_of(user), field) == value
+        update = queries.captured_queries[1]["sql"]
+        assert update.startswith("UPDATE")
+        assert '"user_id"' not in update.split(" WHERE ")[0]
+
+    def test_get_with_cached_user_is_one_query(
+        self, api_client, django_assert_num_queries, is_assistant, data
+    ):
+        get_user_cache().clear()
+        user = baker.make(get_user_model(), is_assistant=is_assistant)
+        api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+        api_client.get(self.url)
+
+        with django_assert_num_queries(1):
+            response = api_client.get(self.url)
+
+        assert response.status_code == status.HTTP_200_OK
+
+
+class TestCachedSerializerFields:
+    def test_fields_are_built_once_per_class(self):
+        first, second = AssistantSerializer(), AssistantSerializer()
+
+        assert first.fields.keys() == second.fields.keys()
+        # Every instance binds its own copies
+        assert first.fields["bio"] is not second.fields["bio"]
+        assert "_cached_fields" in AssistantSerializer.__dict__
+
+    def test_subclasses_do_not_share_fields(self):
+        assert list(BaseUserSerializer().fields) == [
+            "location",
+            "latitude",
+            "longitude",
+            "user_id",
+        ]
+        assert "age" in AssistantSerializer().fields
+
+
+@pytest.mark.django_db
+class TestProfilePatch:
+    url = reverse("profile")
+
+    @pytest.fixture
+    def client(self, api_client, claims_mode):
+        self.user = baker.make(get_user_model(), is_assistant=True)
+        Assistant.objects.filter(user=self.user).update(
+            bio="Tidy", services=["cleaning", "laundry"]
+        )
+        token = ClaimsRefreshToken.for_user(self.user).access_token
+        api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        return api_client
+
+    def test_writes_only_changed_columns(self, client, django_assert_num_queries):
+        with django_assert_num_queries(2) as queries:
+            response = client.patch(
+                self.url,
+                {"bio": "Punctual", "services": ["cleaning", "laundry"]},
+                format="json",
+            )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["services"] == ["cleaning", "laundry"]
+        update = queries.captured_queries[1]["sql"].split(" WHERE ")[0]
+        assert '"bio"' in update
+        assert '"services"' not in update
+        assert profile_of(self.user).bio == "Punctual"
+
+    def test_unchanged_skips_the_write(self, client, django_assert_num_queries):
+        version = profile_of(self.user).version
+
+        with django_assert_num_queries(1):
+            response = client.patch(self.url, {"bio": "Tidy"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert profile_of(self.user).version == version
+
+    def test_unchanged_put_skips_the_write(self, client, django_assert_num_queries):
+        data = AssistantSerializer(profile_of(self.user)).data
+
+        with django_assert_num_queries(1):
+            response = client.put(self.url, data, format="json")
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_validates_only_submitted_fields(self, client):
+        response = client.patch(self.url, {"age": "thirty"})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert list(response.data) == ["age"]
+
+
+@pytest.mark.django_db
+class TestProfileLocation:
+    url = reverse("profile")
+
+    @pytest.fixture
+    def client(self, api_client, claims_mode):
+        self.user = baker.make(get_user_model())
+        token = ClaimsRefreshToken.for_user(self.user).access_token
+        api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        return api_client
+
+    def test_sets_geohash(self, client):
+        response = client.patch(self.url, {"latitude": 6.5244, "longitude": 3.3792})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert profile_of(self.user).geohash.startswith("s14mhg")
+
+    def test_geohash_follows_if_match_writes(self, client):
+        etag = client.get(self.url)["ETag"]
+
+        response = client.patch(
+            self.url, {"latitude": 9.0765, "longitude": 7.3986}, HTTP_IF_MATCH=etag
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert profile_of(self.user).geohash == encode(9.0765, 7.3986)
+
+    @pytest.mark.parametrize(
+        "data", [{"latitude": 6.5}, {"latitude": 91, "longitude": 3}]
+    )
+    def test_invalid(self, client, data):
+        response = client.patch(self.url, data)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
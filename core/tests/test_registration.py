@@ -0,0 +1,60 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError
+from django.urls import reverse
+from rest_framework import status
+
+from core.models import Assistant
+from core.services import UserAlreadyExists, register_user
+from payments.models import Wallet
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+class TestRegisterUser:
+    data = {
+        "email": "unit@example.com",
+        "phone": "+2349066757334",
+        "password": "simple-password",
+        "is_assistant": True,
+    }
+
+    def test_registration_statement_count(self, api_client, django_assert_num_queries):
+        # SAVEPOINT, user, assistant and wallet INSERTs, RELEASE SAVEPOINT
+        with django_assert_num_queries(5):
+            response = api_client.post(reverse("register"), self.data, format="json")
+
+        assert response.status_code == status.HTTP_201_CREATED
+
+    def test_creates_profile_and_wallet(self):
+        user = register_user(**self.data)
+
+        assert Assistant.objects.filter(user=user).exists()
+        assert Wallet.objects.filter(user=user).exists()
+
+    def test_duplicate_email_rolls_back(self, get_user):
+        user = get_user()
+
+        with pytest.raises(UserAlreadyExists):
+            register_user(**{**self.data, "email": user.email})
+
+        assert User.objects.count() == 1
+
+    def test_other_integrity_errors_are_raised(self, monkeypatch):
+        def fail(**kwargs):
+            raise IntegrityError("NOT NULL constraint failed: payments_wallet.user_id")
+
+        monkeypatch.setattr(Wallet.objects, "create", fail)
+
+        with pytest.raises(IntegrityError):
+            register_user(**self.data)
+
+        assert not User.objects.exists()
+
+    def test_duplicate_email_returns_400(self, api_client, get_user):
+        data = {**self.data, "email": get_user().email}
+
+        response = api_client.post(reverse("register"), data, format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
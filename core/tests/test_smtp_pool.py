@@ -0,0 +1,105 @@
+import threading
+
+import pytest
+from django.core.mail import EmailMessage, get_connection, send_mail
+
+from core import smtp_pool
+from core.smtp_pool import PooledEmailBackend, send_bulk
+from utils.smtp import LocalSMTPServer
+
+BACKEND = "core.smtp_pool.PooledEmailBackend"
+
+
+@pytest.fixture
+def smtp_server(settings):
+    server = LocalSMTPServer(credentials=("relay-user", "relay-password")).start()
+    settings.EMAIL_BACKEND = BACKEND
+    settings.EMAIL_HOST = server.host
+    settings.EMAIL_PORT = server.port
+    settings.EMAIL_HOST_USER, settings.EMAIL_HOST_PASSWORD = server.credentials
+    settings.EMAIL_POOL = {"SIZE": 3, "MAX_IDLE": 60, "CHECK_AFTER": 5}
+    yield server
+    smtp_pool.close_pools()
+    server.stop()
+
+
+def message(number, to="someone@example.com"):
+    return EmailMessage(f"Subject {number}", "Body", "admin@studebt.com", [to])
+
+
+def pool():
+    return smtp_pool.get_pool(get_connection(BACKEND))
+
+
+class TestPooledEmailBackend:
+    def test_connections_are_reused(self, smtp_server):
+        for number in range(5):
+            send_mail(f"Subject {number}", "Body", "admin@studebt.com", ["a@b.com"])
+
+        assert len(smtp_server.messages) == 5
+        assert smtp_server.connections == 1
+        assert smtp_server.logins == 1
+
+    def test_dead_idle_connection_is_replaced(self, smtp_server, settings):
+        settings.EMAIL_POOL = {**settings.EMAIL_POOL, "CHECK_AFTER": 0}
+        get_connection(BACKEND).send_messages([message(1)])
+
+        # The relay dropped the connection while it sat in the pool
+        connection, _ = pool()._idle[0]
+        connection.close()
+        get_connection(BACKEND).send_messages([message(2)])
+
+        assert len(smtp_server.messages) == 2
+        assert smtp_server.connections == 2
+
+    def test_long_idle_connection_is_closed(self, smtp_server, settings):
+        settings.EMAIL_POOL = {**settings.EMAIL_POOL, "MAX_IDLE": 0}
+
+        get_connection(BACKEND).send_messages([message(1)])
+        get_connection(BACKEND).send_messages([message(2)])
+
+        assert smtp_server.connections == 2
+
+    def test_refused_recipient_keeps_the_connection(self, smtp_server):
+        smtp_server.rejected.add("nobody@example.com")
+        backend = get_connection(BACKEND)
+
+        with pytest.raises(Exception):
+            backend.send_messages([message(1, "nobody@example.com")])
+        backend.send_messages([message(2)])
+
+        assert smtp_server.connections == 1
+        assert len(smtp_server.messages) == 1
+
+    def test_pool_is_bounded(self, smtp_server):
+        backends = [get_connection(BACKEND) for _ in range(3)]
+        for backend in backends:
+            backend.open()
+
+        waiting = get_connection(BACKEND, timeout=0.1)
+        with pytest.raises(OSError):
+            waiting.open()
+
+        backends[0].close()
+        assert waiting.open()
+
+
+class TestSendBulk:
+    def test_fans_out_over_the_pool(self, smtp_server):
+        sent, failed = send_bulk([message(number) for number in range(30)])
+
+        assert sent == 30
+        assert failed == []
+        assert len(smtp_server.messages) == 30
+        assert smtp_server.connections <= 3
+
+    def test_reports_failures(self, smtp_server):
+        smtp_server.rejected.add("nobody@example.com")
+        messages = [message(number) for number in range(10)]
+        messages[4] = message(4, "nobody@example.com")
+
+        sent, failed = send_bulk(messages, workers=2)
+
+        assert sent == 9
+        assert [m for m, _ in failed] == [messages[4]]
+        assert len(smtp_server.messages) == 9
@@ -0,0 +1,189 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIRequestFactory
+
+from core import throttling
+from core.throttling import CacheWindowStore, IPRateThrottle, LocalWindowStore
+
+LOGIN_RATES = {"login.ip": "100/min", "login.email": "3/min"}
+
+
+@pytest.fixture
+def login_rates(settings):
+    settings.REST_FRAMEWORK = {
+        **settings.REST_FRAMEWORK,
+        "DEFAULT_THROTTLE_RATES": LOGIN_RATES,
+    }
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("login_rates")
+class TestLoginThrottle:
+    def login(self, api_client, email):
+        return api_client.post(
+            reverse("login"), {"email": email, "password": "wrong-password"}
+        )
+
+    def test_rate_limit_headers(self, api_client):
+        response = self.login(api_client, "someone@example.com")
+
+        assert response["RateLimit-Limit"] == "3"
+        assert response["RateLimit-Remaining"] == "2"
+        assert 1 <= int(response["RateLimit-Reset"]) <= 60
+
+    def test_blocks_after_limit(self, api_client):
+        for _ in range(3):
+            assert self.login(api_client, "someone@example.com").status_code != 429
+
+        response = self.login(api_client, "someone@example.com")
+
+        assert response.status_code == 429
+        assert response["RateLimit-Remaining"] == "0"
+        assert int(response["Retry-After"]) >= 1
+
+    def test_email_is_case_insensitive(self, api_client):
+        emails = ["someone@example.com", "SOMEONE@example.com", "Someone@Example.com"]
+        for email in emails:
+            self.login(api_client, email)
+
+        assert self.login(api_client, "someone@EXAMPLE.com").status_code == 429
+
+    def test_other_emails_are_not_blocked(self, api_client):
+        for _ in range(4):
+            self.login(api_client, "someone@example.com")
+
+        assert self.login(api_client, "other@example.com").status_code != 429
+
+    def test_forged_forwarded_for_keeps_the_ip_count(self, api_client, settings):
+        settings.REST_FRAMEWORK = {
+            **settings.REST_FRAMEWORK,
+            "DEFAULT_THROTTLE_RATES": {"login.ip": "3/min", "login.email": "100/min"},
+        }
+        for number in range(3):
+            api_client.post(
+                reverse("login"),
+                {"email": f"user{number}@example.com", "password": "wrong"},
+                HTTP_X_FORWARDED_FOR=f"10.0.0.{number}",
+            )
+
+        response = api_client.post(
+            reverse("login"),
+            {"email": "user3@example.com", "password": "wrong"},
+            HTTP_X_FORWARDED_FOR="10.0.0.3",
+        )
+
+        assert response.status_code == 429
+
+    def test_trusted_proxy_forwards_the_client(self, api_client, settings):
+        settings.REST_FRAMEWORK = {
+            **settings.REST_FRAMEWORK,
+            "NUM_PROXIES": 1,
+            "DEFAULT_THROTTLE_RATES": {"login.ip": "1/min", "login.email": "100/min"},
+        }
+        for client_ip in ["10.0.0.1", "10.0.0.2"]:
+            # The proxy appends the address it got the request from
+            response = api_client.post(
+                reverse("login"),
+                {"email": f"{client_ip}@example.com", "password": "wrong"},
+                HTTP_X_FORWARDED_FOR=f"1.2.3.4, {client_ip}",
+            )
+
+            assert response.status_code != 429
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("login_rates")
+class TestAsyncThrottles:
+    def test_async_login_is_limited(self, api_client):
+        data = {"email": "someone@example.com", "password": "wrong-password"}
+        response = api_client.post(reverse("async-login"), data, format="json")
+
+        assert response["RateLimit-Remaining"] == "2"
+
+        # The same counters as the DRF view, either URL uses them up
+        api_client.post(reverse("login"), data)
+        api_client.post(reverse("async-login"), data, format="json")
+        response = api_client.post(reverse("async-login"), data, format="json")
+
+        assert response.status_code == 429
+        assert int(response["Retry-After"]) >= 1
+
+    def test_async_otp_send_is_limited(self, api_client, settings):
+        settings.REST_FRAMEWORK = {
+            **settings.REST_FRAMEWORK,
+            "DEFAULT_THROTTLE_RATES": {"otp_send.email": "1/hour"},
+        }
+        url = reverse("async-otp-send", args=["someone@example.com"])
+
+        assert api_client.get(url).status_code == 404
+        assert api_client.get(url).status_code == 429
+
+
+class FakeView:
+    throttle_scope = "login"
+    kwargs = {}
+
+
+class TestSlidingWindow:
+    @pytest.fixture
+    def throttle(self, login_rates):
+        throttle = IPRateThrottle()
+        throttle.now = 600.0
+        throttle.timer = lambda: throttle.now
+        return throttle
+
+    def request(self):
+        return APIRequestFactory().get("/", REMOTE_ADDR="10.0.0.1")
+
+    def fill(self, throttle, count):
+        for _ in range(count):
+            assert throttle.allow_request(self.request(), FakeView)
+
+    def test_previous_window_is_weighted(self, throttle):
+        self.fill(throttle, 100)
+
+        # A quarter into the next window, 75 of the 100 still count
+        throttle.now = 675.0
+        self.fill(throttle, 25)
+        assert not throttle.allow_request(self.request(), FakeView)
+
+    def test_wait(self, throttle):
+        self.fill(throttle, 100)
+        throttle.now = 610.0
+        assert not throttle.allow_request(self.request(), FakeView)
+        # The current window is full, nothing frees up before it ends
+        assert throttle.wait() == 50
+
+        throttle.now = 675.0
+        self.fill(throttle, 25)
+        assert not throttle.allow_request(self.request(), FakeView)
+        # The previous window's share shrinks every second
+        assert throttle.wait() == 1
+
+    def test_old_windows_are_forgotten(self, throttle):
+        self.fill(throttle, 100)
+
+        throttle.now = 750.0
+        self.fill(throttle, 100)
+
+    def test_falls_back_to_local_store_when_cache_fails(self, throttle, monkeypatch):
+        def broken(*args):
+            raise ConnectionError
+
+        store = CacheWindowStore()
+        monkeypatch.setattr(store, "counts", broken)
+        monkeypatch.setattr(throttling, "get_store", lambda: store)
+
+        self.fill(throttle, 100)
+        assert not throttle.allow_request(self.request(), FakeView)
+
+
+class TestWindowStores:
+    @pytest.mark.parametrize("store", [LocalWindowStore(), CacheWindowStore()])
+    def test_counts(self, store):
+        for _ in range(3):
+            store.hit("key", 10, 60)
+        store.hit("key", 11, 60)
+
+        assert store.counts("key", 11) == (1, 3)
+        assert store.counts("key", 13) == (0, 0)
@@ -0,0 +1,147 @@
+from datetime import timedelta
+
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from core.authentication import get_user_cache
+from core.tokens import ClaimsRefreshToken, ClaimsUser, user_claims
+
+
+@pytest.fixture
+def claims_mode(settings):
+    settings.CLAIMS_AUTH = {"ENABLED": True, "MAX_AGE": timedelta(minutes=15)}
+    get_user_cache().clear()
+
+
+def bearer(token):
+    return {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+
+
+@pytest.mark.django_db
+class TestClaimsTokens:
+    url = reverse("profile")
+
+    def test_login_embeds_claims(self, api_client, get_user, claims_mode):
+        user = get_user(save=True)
+
+        response = api_client.post(
+            reverse("login"),
+            {"email": user.email, "password": "simple-password"},
+            format="json",
+        )
+        access = ClaimsRefreshToken(response.data["tokens"]["refresh"]).access_token
+
+        for claim, value in user_claims(user).items():
+            assert access[claim] == value
+
+    def test_profile_read_skips_user_query(
+        self, api_client, get_user, claims_mode, django_assert_num_queries
+    ):
+        token = ClaimsRefreshToken.for_user(get_user()).access_token
+
+        with django_assert_num_queries(1):
+            response = api_client.get(self.url, **bearer(token))
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_token_past_max_age_loads_user(
+        self, api_client, get_user, settings, claims_mode, django_assert_num_queries
+    ):
+        token = ClaimsRefreshToken.for_user(get_user()).access_token
+        settings.CLAIMS_AUTH = {"ENABLED": True, "MAX_AGE": timedelta(seconds=-1)}
+
+        with django_assert_num_queries(2):
+            response = api_client.get(self.url, **bearer(token))
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_disabled_mode_issues_plain_tokens(self, get_user):
+        token = ClaimsRefreshToken.for_user(get_user()).access_token
+
+        assert "is_assistant" not in token
+
+    def test_stale_claims_are_rejected_on_load(self, get_user, claims_mode):
+        user = get_user()
+        token = ClaimsRefreshToken.for_user(user).access_token
+        user.is_verified = not user.is_verified
+        user.save()
+
+        proxy = ClaimsUser(token, loader=lambda token: user)
+
+        assert proxy.is_verified is not user.is_verified
+        with pytest.raises(AuthenticationFailed):
+            proxy.email
+
+    def test_refresh_after_password_change_returns_401(
+        self, api_client, get_user, claims_mode
+    ):
+        user = get_user()
+        refresh = ClaimsRefreshToken.for_user(user)
+        user.set_password("a-new-password")
+        user.save()
+
+        response = api_client.post(
+            reverse("token-refresh"), {"refresh": str(refresh)}, format="json"
+        )
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_refresh_carries_fresh_claims(self, api_client, get_user, claims_mode):
+        user = get_user()
+        refresh = ClaimsRefreshToken.for_user(user)
+        user.is_verified = True
+        user.save()
+
+        response = api_client.post(
+            reverse("token-refresh"), {"refresh": str(refresh)}, format="json"
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert AccessToken(response.data["access"])["is_verified"] is True
+
+    def test_deactivated_user_is_refused(self, api_client, get_user, claims_mode):
+        user = get_user()
+        token = ClaimsRefreshToken.for_user(user).access_token
+        user.is_active = False
+        user.save()
+
+        response = api_client.get(self.url, **bearer(token))
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_inactive_claim_is_refused(self, api_client, get_user, claims_mode):
+        user = get_user()
+        user.is_active = False
+        token = ClaimsRefreshToken.for_user(user).access_token
+
+        url = reverse("assistant-search")
+
+        response = api_client.get(url, {"q": "cleaning"}, **bearer(token))
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_refresh_rotates_and_blacklists(
+        self, api_client, get_user, claims_mode, monkeypatch
+    ):
+        # Overriding SIMPLE_JWT does not reach the serializers' api_settings
+        monkeypatch.setattr(jwt_serializers.api_settings, "ROTATE_REFRESH_TOKENS", True)
+        monkeypatch.setattr(
+            jwt_serializers.api_settings, "BLACKLIST_AFTER_ROTATION", True
+        )
+        refresh = str(ClaimsRefreshToken.for_user(get_user()))
+
+        response = api_client.post(
+            reverse("token-refresh"), {"refresh": refresh}, format="json"
+        )
+        again = api_client.post(
+            reverse("token-refresh"), {"refresh": refresh}, format="json"
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert RefreshToken(response.data["refresh"])
+        assert "is_active" in AccessToken(response.data["access"])
+        assert again.status_code == status.HTTP_401_UNAUTHORIZED
@@ -0,0 +1,64 @@
+import hashlib
+import stat
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.core.management import call_command
+
+from core.validators import BreachedPasswordValidator
+
+BREACHED = ["password123", "qwerty-uiop", "letmein!", "dragon2023", "p@ssw0rd"]
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    source = tmp_path / "breached.txt"
+    source.write_text("\n".join(BREACHED + BREACHED[:2]) + "\n")
+    output = tmp_path / "breached.bin"
+
+    # Tiny runs so the on-disk merge is exercised
+    call_command("build_breached_passwords", str(source), str(output), run_size=2)
+    return output
+
+
+class TestBreachedPasswordValidator:
+    def test_file_is_sorted_and_deduplicated(self, corpus):
+        data = corpus.read_bytes()
+        records = [data[i : i + 20] for i in range(0, len(data), 20)]
+
+        assert len(records) == len(BREACHED)
+        assert records == sorted(records)
+
+    def test_file_is_readable_by_all(self, corpus):
+        assert stat.S_IMODE(corpus.stat().st_mode) == 0o644
+
+    def test_breached_password_is_rejected(self, corpus):
+        validator = BreachedPasswordValidator(path=corpus)
+
+        for password in BREACHED:
+            with pytest.raises(ValidationError):
+                validator.validate(password)
+
+        validator.validate("a-password-nobody-has-leaked")
+
+    def test_hex_digest_input(self, tmp_path):
+        source = tmp_path / "pwned.txt"
+        digest = hashlib.sha1(b"hunter2").hexdigest().upper()
+        source.write_text(f"{digest}:2042\n")
+        output = tmp_path / "pwned.bin"
+
+        call_command("build_breached_passwords", str(source), str(output), sha1=True)
+
+        assert "hunter2" in BreachedPasswordValidator(path=output)
+
+    def test_missing_file_skips_check(self, tmp_path):
+        validator = BreachedPasswordValidator(path=tmp_path / "missing.bin")
+
+        validator.validate("password123")
+
+    def test_truncated_file_is_refused(self, corpus):
+        corpus.write_bytes(corpus.read_bytes()[:-1])
+        validator = BreachedPasswordValidator(path=corpus)
+
+        with pytest.raises(ImproperlyConfigured):
+            validator.validate("password123")
@@ -0,0 +1,209 @@
+"""
+Sliding-window rate limits for the login, OTP and password reset endpoints.
+
+DRF's SimpleRateThrottle keeps every request timestamp in the cache, so each
+check costs O(limit). These throttles keep two counters per key instead: the
+current and the previous fixed window. The previous count is weighted by
+how much of it still overlaps the sliding window. A check is one
+``get_many`` plus one ``incr``.
+
+Rates are looked up in ``REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"]`` under
+``"<view.throttle_scope>.<key type>"``, e.g. ``"login.ip"``. A missing rate
+means that key type is not limited for that view.
+
+Counters live in the default cache when it is shared (Redis, Memcached,
+database). With a per-process or dummy cache, or when the cache is down,
+they fall back to an in-process store.
+"""
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from cachetools import TTLCache
+from django.core.cache import cache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from .caches import is_shared
+
+logger = logging.getLogger(__name__)
+
+DURATIONS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+class CacheWindowStore:
+    """Window counters in the Django cache, atomic on Redis/Memcached."""
+
+    def counts(self, key, window):
+        current, previous = f"{key}:{window}", f"{key}:{window - 1}"
+        values = cache.get_many([current, previous])
+        return values.get(current, 0), values.get(previous, 0)
+
+    def hit(self, key, window, duration):
+        window_key = f"{key}:{window}"
+        # Keep the window around while it is the "previous" one
+        cache.add(window_key, 0, timeout=duration * 2)
+        try:
+            cache.incr(window_key)
+        except ValueError:
+            cache.set(window_key, 1, timeout=duration * 2)
+
+
+class LocalWindowStore:
+    """Window counters in this process, bounded by a TTL cache."""
+
+    def __init__(self, maxsize=100_000, ttl=86400 * 2):
+        self._windows = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def counts(self, key, window):
+        with self._lock:
+            current_window, current, previous = self._windows.get(key, (window, 0, 0))
+
+        if current_window == window:
+            return current, previous
+        if current_window == window - 1:
+            return 0, current
+        return 0, 0
+
+    def hit(self, key, window, duration):
+        with self._lock:
+            current_window, current, previous = self._windows.get(key, (window, 0, 0))
+
+            if current_window == window:
+                self._windows[key] = (window, current + 1, previous)
+            elif current_window == window - 1:
+                self._windows[key] = (window, 1, current)
+            else:
+                self._windows[key] = (window, 1, 0)
+
+    def clear(self):
+        with self._lock:
+            self._windows.clear()
+
+
+local_store = LocalWindowStore()
+cache_store = CacheWindowStore()
+
+
+def get_store():
+    return cache_store if is_shared() else local_store
+
+
+class SlidingWindowThrottle(BaseThrottle, ABC):
+    key_type = None
+    timer = time.time
+
+    @abstractmethod
+    def get_ident_key(self, request, view):
+        """Return the value to limit on, or None to skip this throttle."""
+
+    def get_rate(self, view):
+        scope = getattr(view, "throttle_scope", None)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(f"{scope}.{self.key_type}")
+        if rate is None:
+            return None, None
+
+        num, period = rate.split("/")
+        return int(num), DURATIONS[period[0]]
+
+    def allow_request(self, request, view):
+        self.limit, self.duration = self.get_rate(view)
+        if self.limit is None:
+            return True
+
+        ident = self.get_ident_key(request, view)
+        if ident is None:
+            return True
+
+        key = f"throttle:{view.throttle_scope}:{self.key_type}:{ident}"
+        now = self.timer()
+        window, elapsed = divmod(now, self.duration)
+        window = int(window)
+        # Share of the previous window still inside the sliding window
+        weight = 1 - elapsed / self.duration
+
+        store = get_store()
+        try:
+            current, previous = store.counts(key, window)
+        except Exception:
+            logger.warning("Rate limit cache unavailable", exc_info=True)
+            store = local_store
+            current, previous = store.counts(key, window)
+
+        used = previous * weight + current
+        self.reset = self.duration - elapsed
+
+        if used >= self.limit:
+            self.wait_time = self.get_wait(current, previous, elapsed)
+            self.record(request, 0)
+            return False
+
+        store.hit(key, window, self.duration)
+        self.record(request, int(self.limit - used - 1))
+        return True
+
+    def get_wait(self, current, previous, elapsed):
+        if current >= self.limit or not previous:
+            # Nothing frees up before the next window
+            return self.duration - elapsed
+        # The previous window's weight has to drop until `used` < limit
+        free_at = self.duration * (1 - (self.limit - current) / previous)
+        return max(free_at - elapsed, 1)
+
+    def record(self, request, remaining):
+        limits = getattr(request, "rate_limits", [])
+        limits.append((self.limit, max(remaining, 0), self.reset))
+        request.rate_limits = limits
+
+    def wait(self):
+        return self.wait_time
+
+
+class IPRateThrottle(SlidingWindowThrottle):
+    key_type = "ip"
+
+    def get_ident_key(self, request, view):
+        return self.get_ident(request)
+
+
+class EmailRateThrottle(SlidingWindowThrottle):
+    """Limits on the email in the body or URL, whoever sends the request."""
+
+    key_type = "email"
+
+    def get_ident_key(self, request, view):
+        data = request.data if hasattr(request.data, "get") else {}
+        email = view.kwargs.get("email") or data.get("email")
+        if not isinstance(email, str) or not email:
+            return None
+        return email.strip().lower()
+
+
+class UserRateThrottle(SlidingWindowThrottle):
+    key_type = "user"
+
+    def get_ident_key(self, request, view):
+        if not request.user or not request.user.is_authenticated:
+            return None
+        return request.user.pk
+
+
+class RateLimitHeadersMixin:
+    """Adds RateLimit-* headers for the most restrictive throttle hit."""
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        return set_rate_limit_headers(request, response)
+
+
+def set_rate_limit_headers(request, response):
+    limits = getattr(request, "rate_limits", None)
+    if limits:
+        limit, remaining, reset = min(limits, key=lambda limit: limit[1])
+        response["RateLimit-Limit"] = str(limit)
+        response["RateLimit-Remaining"] = str(remaining)
+        response["RateLimit-Reset"] = str(int(reset) or 1)
+
+    return response
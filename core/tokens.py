@@ -0,0 +1,176 @@
+"""
+Opt-in "claims-only" tokens.
+
+With ``CLAIMS_AUTH["ENABLED"]`` on, tokens issued by `ClaimsRefreshToken`
+carry ``is_active``, ``is_assistant``, ``is_verified`` and a password epoch. Views that
+authenticate with `ClaimsJWTAuthentication` then get a `ClaimsUser` built
+from those claims. It only loads the user row when the view reads some other
+attribute.
+
+Stale claims are handled explicitly:
+
+* Claims are trusted only while the token is younger than
+  ``CLAIMS_AUTH["MAX_AGE"]``. Older tokens load the user from the database.
+* When a `ClaimsUser` loads the row and the claims no longer match it, the
+  request fails with 401 ``stale_claims`` and the client has to refresh.
+  ProfileView always loads it, so a deactivated user is refused there at
+  once. Views that never load the row, search and matching, keep serving a
+  deactivated user until the token is ``MAX_AGE`` old.
+* Tokens claiming an inactive user are refused, and tokens issued without
+  ``is_active`` load the user from the database.
+* Refreshing re-reads the user. It embeds fresh claims in the new access token
+  and rejects refresh tokens issued before the last password change.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .authentication import CachedJWTAuthentication
+
+PASSWORD_EPOCH_CLAIM = "pwd_epoch"
+
+DEFAULTS = {
+    "ENABLED": False,
+    "MAX_AGE": timedelta(minutes=15),
+}
+
+
+def claims_settings():
+    return {**DEFAULTS, **getattr(settings, "CLAIMS_AUTH", {})}
+
+
+def password_epoch(user):
+    """Changes whenever the password hash changes, without exposing the hash."""
+    return salted_hmac("core.tokens.password_epoch", user.password).hexdigest()[:16]
+
+
+def user_claims(user):
+    return {
+        "is_active": user.is_active,
+        "is_assistant": user.is_assistant,
+        "is_verified": user.is_verified,
+        PASSWORD_EPOCH_CLAIM: password_epoch(user),
+    }
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """RefreshToken whose access tokens carry `user_claims` in claims mode."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+
+        if claims_settings()["ENABLED"]:
+            for claim, value in user_claims(user).items():
+                token[claim] = value
+
+        return token
+
+
+class ClaimsUser:
+    """
+    Stand-in for ``request.user`` built from token claims.
+
+    ``pk``, ``is_active``, ``is_assistant`` and ``is_verified`` come from the
+    token. Reading anything else loads the real user, which must still match
+    the claims.
+    """
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, validated_token, loader):
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+
+        self.pk = self.id = get_user_model()._meta.pk.to_python(user_id)
+        self.is_active = validated_token["is_active"]
+        self.is_assistant = validated_token["is_assistant"]
+        self.is_verified = validated_token["is_verified"]
+        self._token = validated_token
+        self._loader = loader
+        self._user = None
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self._load(), name)
+
+    def preload(self, user):
+        """Use a user row another query already loaded, checked as on load."""
+        if self._user is None:
+            self._loader = lambda token: user
+            self._load()
+
+    def _load(self):
+        if self._user is None:
+            user = self._loader(self._token)
+            if not user.is_active:
+                raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+            claims = user_claims(user)
+
+            if any(self._token.get(claim) != value for claim, value in claims.items()):
+                raise AuthenticationFailed(
+                    _("Token claims are stale, refresh the token"),
+                    code="stale_claims",
+                )
+            self._user = user
+        return self._user
+
+    def __eq__(self, other):
+        return getattr(other, "pk", None) == self.pk
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    def __str__(self):
+        return str(self.pk)
+
+
+class ClaimsJWTAuthentication(CachedJWTAuthentication):
+    """
+    Builds a `ClaimsUser` from fresh claims-only tokens, and falls back to
+    `CachedJWTAuthentication` for everything else.
+    """
+
+    def get_user(self, validated_token):
+        options = claims_settings()
+
+        claims = ("is_active", PASSWORD_EPOCH_CLAIM)
+        if not options["ENABLED"] or any(c not in validated_token for c in claims):
+            return super().get_user(validated_token)
+        if not validated_token["is_active"]:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        issued_at = datetime_from_epoch(validated_token["iat"])
+        if timezone.now() - issued_at > options["MAX_AGE"]:
+            return super().get_user(validated_token)
+
+        return ClaimsUser(validated_token, loader=super().get_user)
+
+
+def refresh_access_token(refresh):
+    """
+    Return an access token for ``refresh`` whose claims reflect the current
+    user row. Raises `TokenError` if the password changed since issue.
+    """
+    access = refresh.access_token
+
+    if PASSWORD_EPOCH_CLAIM in refresh:
+        user = CachedJWTAuthentication().get_user(refresh)
+        claims = user_claims(user)
+
+        if claims[PASSWORD_EPOCH_CLAIM] != refresh[PASSWORD_EPOCH_CLAIM]:
+            raise TokenError(_("Password changed since the token was issued"))
+
+        for claim, value in claims.items():
+            access[claim] = value
+
+    return access
@@ -1,9 +1,17 @@
+import logging
+import re
+import threading
+import time
+
+import requests
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from google.auth.transport import requests as google_requests
-from google.oauth2 import id_token
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from google.auth import jwt
 from rest_framework import response, status
-from rest_framework_simplejwt.tokens import RefreshToken
+
+from .tokens import ClaimsRefreshToken
 
 
 def register_social_user(email, first_name, last_name):
@@ -16,7 +24,7 @@ def register_social_user(email, first_name, last_name):
             first_name=first_name,
             last_name=last_name,
         )
-    refresh = RefreshToken.for_user(user)
+    refresh = ClaimsRefreshToken.for_user(user)
 
     access = refresh.access_token
 
@@ -31,16 +39,181 @@ def register_social_user(email, first_name, last_name):
     }
 
 
+logger = logging.getLogger(__name__)
+
+GOOGLE_CERTS_URL = "https://www.googleapis.com/oauth2/v1/certs"
+GOOGLE_ISSUERS = ["accounts.google.com", "https://accounts.google.com"]
+
+
+class GoogleCertificates:
+    """
+    In-memory cache of Google's ID token signing certificates.
+
+    Certificates are fetched over one shared HTTP session and kept for the
+    ``max-age`` Google sends in Cache-Control, at least ``min_max_age``.
+    Shortly before they expire a background thread fetches fresh ones, so
+    requests keep verifying tokens offline. Only a cold or fully expired
+    cache blocks a request on Google.
+
+    One fetch runs at a time, the threads that need its result wait for it.
+    No lock is held over the network. A token signed with an unknown key
+    refetches at most once per ``refetch_interval``, so forged key ids
+    cannot make us hammer Google.
+    """
+
+    max_age_re = re.compile(r"max-age=(\d+)")
+
+    def __init__(
+        self,
+        url=GOOGLE_CERTS_URL,
+        refresh_margin=300,
+        timeout=5,
+        refetch_interval=60,
+        min_max_age=60,
+    ):
+        self.url = url
+        self.refresh_margin = refresh_margin
+        self.timeout = timeout
+        self.refetch_interval = refetch_interval
+        self.min_max_age = min_max_age
+        self.session = requests.Session()
+
+        self._certs = None
+        self._expires_at = 0
+        self._refresh_at = 0
+        self._refetched_at = None
+        # Guards the fields, only ever held briefly
+        self._lock = threading.Lock()
+        # Set once the fetch in flight, if any, is done
+        self._fetching = None
+        self._refresher = None
+
+    def get(self):
+        now = time.monotonic()
+
+        if self._certs is None or now >= self._expires_at:
+            return self.fetch()
+        if now >= self._refresh_at:
+            self.refresh_in_background()
+        return self._certs
+
+    def fetch(self, force=False):
+        """Fetch the certificates, or wait for the fetch already running."""
+        with self._lock:
+            if not force and self._certs and time.monotonic() < self._expires_at:
+                return self._certs
+            fetching = self._fetching
+            if fetching is None:
+                self._fetching = threading.Event()
+
+        if fetching is not None:
+            # Bounded by the other thread's request timeout
+            fetching.wait()
+            if self._certs is None:
+                raise requests.ConnectionError("Could not fetch Google certificates")
+            return self._certs
+
+        try:
+            res = self.session.get(self.url, timeout=self.timeout)
+            res.raise_for_status()
+            certs = res.json()
+
+            max_age = self.get_max_age(res)
+            now = time.monotonic()
+            with self._lock:
+                self._certs = certs
+                self._expires_at = now + max_age
+                self._refresh_at = now + max(
+                    max_age - self.refresh_margin, max_age / 2
+                )
+            return certs
+        finally:
+            with self._lock:
+                fetching, self._fetching = self._fetching, None
+            fetching.set()
+
+    def refresh_in_background(self):
+        with self._lock:
+            if self._fetching is not None:
+                return
+            if self._refresher is not None and self._refresher.is_alive():
+                return
+            self._refresher = threading.Thread(target=self._refresh, daemon=True)
+            self._refresher.start()
+
+    def _refresh(self):
+        try:
+            self.fetch(force=True)
+        except requests.RequestException:
+            # Keep serving the current certificates until they expire
+            logger.warning("Could not refresh Google certificates", exc_info=True)
+
+    def get_max_age(self, res):
+        match = self.max_age_re.search(res.headers.get("Cache-Control", ""))
+        if match is None:
+            return self.min_max_age
+        max_age = int(match.group(1)) - int(res.headers.get("Age", 0))
+        return max(max_age, self.min_max_age)
+
+    def may_refetch(self):
+        """Whether an unknown key id may trigger a fetch now."""
+        now = time.monotonic()
+        with self._lock:
+            if (
+                self._refetched_at is not None
+                and now - self._refetched_at < self.refetch_interval
+            ):
+                return False
+            self._refetched_at = now
+            return True
+
+    def verify(self, token, audience=None):
+        """Verify a Google ID token, mirroring `id_token.verify_oauth2_token`."""
+        certs = self.get()
+
+        if jwt.decode_header(token).get("kid") not in certs and self.may_refetch():
+            # Google rotated its keys ahead of our cache expiry
+            certs = self.fetch(force=True)
+
+        idinfo = jwt.decode(token, certs=certs, audience=audience)
+
+        if idinfo["iss"] not in GOOGLE_ISSUERS:
+            raise ValueError(f"Wrong issuer. 'iss' should be one of {GOOGLE_ISSUERS}")
+
+        return idinfo
+
+
+_google_certificates = None
+
+
+def get_google_certificates():
+    global _google_certificates
+
+    if _google_certificates is None:
+        _google_certificates = GoogleCertificates(
+            url=getattr(settings, "GOOGLE_CERTS_URL", GOOGLE_CERTS_URL)
+        )
+    return _google_certificates
+
+
+@receiver(setting_changed)
+def reset_google_certificates(*, setting, **kwargs):
+    global _google_certificates
+
+    if setting == "GOOGLE_CERTS_URL":
+        _google_certificates = None
+
+
 class Google:
     """Google class to fetch the user info and return it"""
 
     @staticmethod
     def validate(auth_token):
         """
-        validate method Queries the Google oAUTH2 api to fetch the user info
+        validate method verifies the ID token against Google's cached certificates
         """
         try:
-            idinfo = id_token.verify_oauth2_token(auth_token, google_requests.Request())
+            idinfo = get_google_certificates().verify(auth_token)
 
             if "accounts.google.com" in idinfo["iss"]:
                 return idinfo
@@ -0,0 +1,84 @@
+import hashlib
+import logging
+import mmap
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.utils.translation import gettext as _
+
+logger = logging.getLogger(__name__)
+
+RECORD_SIZE = hashlib.sha1().digest_size
+
+
+class BreachedPasswordValidator:
+    """
+    Validate that the password is not in a breached-password corpus.
+
+    The corpus is a file of sorted, fixed-width SHA-1 digests built with
+    ``manage.py build_breached_passwords``. It is memory-mapped on first use
+    and searched by binary search, so every worker process shares the same
+    page-cache pages and nothing is loaded at startup. If the file does not
+    exist the check is skipped, with a warning. A file that is not a whole
+    number of digests is refused.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or settings.BASE_DIR / "breached_passwords.bin"
+        self._map = None
+        self._opened = False
+        self._lock = threading.Lock()
+
+    def _open(self):
+        with self._lock:
+            if self._opened:
+                return self._map
+            try:
+                with open(self.path, "rb") as f:
+                    # The mapping stays valid after the file is closed
+                    self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except FileNotFoundError:
+                logger.warning("Breached password file %s not found", self.path)
+            except ValueError:
+                # Empty files cannot be mapped, nothing to check against
+                pass
+            if self._map is not None and len(self._map) % RECORD_SIZE:
+                self._map.close()
+                self._map = None
+                raise ImproperlyConfigured(
+                    f"{self.path} is not a file of {RECORD_SIZE}-byte digests"
+                )
+            self._opened = True
+            return self._map
+
+    def __contains__(self, password):
+        corpus = self._map if self._opened else self._open()
+        if corpus is None:
+            return False
+
+        digest = hashlib.sha1(password.encode("utf-8")).digest()
+        low, high = 0, len(corpus) // RECORD_SIZE
+
+        while low < high:
+            middle = (low + high) // 2
+            offset = middle * RECORD_SIZE
+            record = corpus[offset : offset + RECORD_SIZE]
+
+            if record == digest:
+                return True
+            if record < digest:
+                low = middle + 1
+            else:
+                high = middle
+        return False
+
+    def validate(self, password, user=None):
+        if password in self:
+            raise ValidationError(
+                _("This password has appeared in a data breach."),
+                code="password_breached",
+            )
+
+    def get_help_text(self):
+        return _("Your password can’t be one that has appeared in a data breach.")
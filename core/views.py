@@ -2,6 +2,7 @@ from decouple import config
 from django.contrib.auth import authenticate, get_user_model, password_validation
 from django.contrib.auth.signals import user_logged_in
 from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.core.mail import send_mail
 from django.shortcuts import get_object_or_404
@@ -12,15 +13,27 @@ from rest_framework.generics import GenericAPIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework_simplejwt.exceptions import TokenError
-from rest_framework_simplejwt.serializers import TokenRefreshSerializer
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenRefreshView
 
+from . import hashing
+from .caches import is_shared
+from .etags import (
+    VERSION_TIMEOUT,
+    PreconditionFailed,
+    etag_matches,
+    make_etag,
+    not_modified,
+    profile_version_key,
+    remember_profile_version,
+    set_etag,
+)
+from .idempotency import IdempotencyMixin
 from .models import Assistant, BaseUser
 from .otp import OTPGenerator
 from .serializers import (
     AssistantSerializer,
     BaseUserSerializer,
+    ClaimsTokenRefreshSerializer,
     ForgotPasswordSerializer,
     GoogleSocialAuthSerializer,
     LoginSerializer,
@@ -29,9 +42,16 @@ from .serializers import (
     PasswordUpdateSerializer,
     RegisterSerializer,
 )
+from .throttling import (
+    EmailRateThrottle,
+    IPRateThrottle,
+    RateLimitHeadersMixin,
+    UserRateThrottle,
+)
+from .tokens import ClaimsJWTAuthentication, ClaimsRefreshToken, ClaimsUser
 
 
-class RegisterView(GenericAPIView):
+class RegisterView(IdempotencyMixin, GenericAPIView):
     """
     Create an account
 
@@ -60,6 +80,8 @@ class RegisterView(GenericAPIView):
 
 
 class ProfileView(GenericAPIView):
+    # Only needs the user id and `is_assistant`, both available as token claims
+    authentication_classes = [ClaimsJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get_serializer_class(self):
@@ -67,29 +89,81 @@ class ProfileView(GenericAPIView):
             return AssistantSerializer
         return BaseUserSerializer
 
-    def get_instance(self):
+    def get_queryset(self):
         Model = Assistant if self.request.user.is_assistant else BaseUser
 
-        instance = get_object_or_404(Model, user=self.request.user)
+        # The profile and its user in one query
+        return Model.objects.select_related("user")
 
-        return instance
+    def get_instance(self):
+        instance = get_object_or_404(self.get_queryset(), user_id=self.request.user.pk)
+
+        if isinstance(self.request.user, ClaimsUser):
+            # Saves a query if anything reads the user, and checks the claims
+            self.request.user.preload(instance.user)
 
-    def get(self, *args, **kwargs):
-        serializer = self.get_serializer(self.get_instance())
+        return instance
 
-        return Response(serializer.data, status=status.HTTP_200_OK)
+    def get_version(self):
+        """The profile's version, from the cache if it is shared."""
+        versions = self.get_queryset().values_list("version", flat=True)
+        if not is_shared():
+            return get_object_or_404(versions, user_id=self.request.user.pk)
+
+        key = profile_version_key(self.request.user.pk)
+        version = cache.get(key)
+        if version is None:
+            version = get_object_or_404(versions, user_id=self.request.user.pk)
+            cache.add(key, version, VERSION_TIMEOUT)
+        return version
+
+    def get(self, request, *args, **kwargs):
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match:
+            etag = make_etag(self.get_version().hex)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+
+        instance = self.get_instance()
+        remember_profile_version(instance, overwrite=False)
+        serializer = self.get_serializer(instance)
+
+        response = Response(serializer.data, status=status.HTTP_200_OK)
+        return set_etag(response, make_etag(instance.version.hex))
 
     def put(self, request):
-        serializer = self.get_serializer(self.get_instance(), data=request.data)
+        return self.update(request)
+
+    def patch(self, request):
+        return self.update(request, partial=True)
+
+    def update(self, request, partial=False):
+        instance = self.get_instance()
+        context = self.get_serializer_context()
+
+        if_match = request.headers.get("If-Match")
+        if if_match:
+            if not etag_matches(if_match, make_etag(instance.version.hex)):
+                raise PreconditionFailed()
+            # Checked again by the UPDATE, the row may change in between
+            context["expected_version"] = instance.version
+
+        serializer = self.get_serializer(
+            instance, data=request.data, partial=partial, context=context
+        )
         serializer.is_valid(raise_exception=True)
 
         serializer.save()
+        remember_profile_version(instance)
 
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        response = Response(serializer.data, status=status.HTTP_200_OK)
+        return set_etag(response, make_etag(instance.version.hex))
 
 
-class ForgotPasswordView(GenericAPIView):
+class ForgotPasswordView(IdempotencyMixin, RateLimitHeadersMixin, GenericAPIView):
     serializer_class = ForgotPasswordSerializer
+    throttle_classes = [IPRateThrottle, EmailRateThrottle]
+    throttle_scope = "password_reset"
 
     def post(self, request):
         serializer = self.serializer_class(data=request.data)
@@ -125,7 +199,7 @@ class ForgotPasswordView(GenericAPIView):
             )
 
 
-class PasswordResetConfirm(GenericAPIView):
+class PasswordResetConfirm(IdempotencyMixin, GenericAPIView):
     serializer_class = PasswordResetSerializer
 
     def post(self, request, uidb64, token):
@@ -156,8 +230,8 @@ class PasswordResetConfirm(GenericAPIView):
                     {"message": e, "status": False}, status=status.HTTP_403_FORBIDDEN
                 )
 
-        user.set_password(password)
-        user.save()
+        hashing.set_password(user, password)
+        user.save(update_fields=["password"])
 
         return Response(
             {"message": "success", "detail": "password changed successfully"},
@@ -204,7 +278,7 @@ class GoogleSocialAuthView(GenericAPIView):
         return Response(data, status=status.HTTP_200_OK)
 
 
-class PasswordUpdateView(GenericAPIView):
+class PasswordUpdateView(IdempotencyMixin, RateLimitHeadersMixin, GenericAPIView):
     """
     Change password
 
@@ -212,6 +286,8 @@ class PasswordUpdateView(GenericAPIView):
 
     permission_classes = [IsAuthenticated]
     serializer_class = PasswordUpdateSerializer
+    throttle_classes = [UserRateThrottle]
+    throttle_scope = "password_update"
 
     def post(self, request, **kwargs):
         serializer = self.serializer_class(
@@ -228,15 +304,16 @@ class PasswordUpdateView(GenericAPIView):
                 {"message": e, "status": False}, status=status.HTTP_403_FORBIDDEN
             )
 
-        request.user.set_password(password)
-        request.user.save()
+        hashing.set_password(request.user, password)
+        # request.user may be another process's cached copy, write nothing else
+        request.user.save(update_fields=["password"])
         return Response(
             {"message": "Password updated successfully", "status": True},
             status=status.HTTP_200_OK,
         )
 
 
-class LoginView(GenericAPIView):
+class LoginView(RateLimitHeadersMixin, GenericAPIView):
     """
     Login with Email & Password to get Authentication tokens
 
@@ -254,6 +331,8 @@ class LoginView(GenericAPIView):
     """
 
     serializer_class = LoginSerializer
+    throttle_classes = [IPRateThrottle, EmailRateThrottle]
+    throttle_scope = "login"
 
     def post(self, request, **kwargs):
         serializer = self.serializer_class(data=request.data)
@@ -274,7 +353,7 @@ class LoginView(GenericAPIView):
         #             status=status.HTTP_401_UNAUTHORIZED,
         #     )
 
-        refresh = RefreshToken.for_user(user)
+        refresh = ClaimsRefreshToken.for_user(user)
 
         user_logged_in.send_robust(get_user_model(), user=user)
 
@@ -306,15 +385,16 @@ class RefreshView(TokenRefreshView):
         access_token
     """
 
-    serializer_class = TokenRefreshSerializer
+    serializer_class = ClaimsTokenRefreshSerializer
 
     def post(self, request, *args, **kwargs):
         try:
             serializer = self.serializer_class(data=request.data)
             serializer.is_valid(raise_exception=True)
-            access_token = serializer.validated_data["access"]
+            # A new refresh token too when ROTATE_REFRESH_TOKENS is on
             return Response(
-                {"access": access_token, "status": True}, status=status.HTTP_200_OK
+                {**serializer.validated_data, "status": True},
+                status=status.HTTP_200_OK,
             )
         except TokenError:
             return Response(
@@ -323,7 +403,7 @@ class RefreshView(TokenRefreshView):
             )
 
 
-class GetOTPView(GenericAPIView):
+class GetOTPView(RateLimitHeadersMixin, GenericAPIView):
     """
     Call this endpoint with a registered email to get OTP
 
@@ -335,6 +415,8 @@ class GetOTPView(GenericAPIView):
     """
 
     serializer_class = OTPSerializer
+    throttle_classes = [IPRateThrottle, EmailRateThrottle]
+    throttle_scope = "otp_send"
 
     def get(self, request, email):
         try:
@@ -353,7 +435,7 @@ class GetOTPView(GenericAPIView):
         )
 
 
-class VerifyOTPView(GenericAPIView):
+class VerifyOTPView(IdempotencyMixin, RateLimitHeadersMixin, GenericAPIView):
     """
     Verify OTP against the provided email
 
@@ -366,6 +448,8 @@ class VerifyOTPView(GenericAPIView):
     """
 
     serializer_class = OTPSerializer
+    throttle_classes = [IPRateThrottle, EmailRateThrottle]
+    throttle_scope = "otp_verify"
 
     def post(self, request):
         serializer = OTPSerializer(data=request.data)
@@ -381,7 +465,7 @@ class VerifyOTPView(GenericAPIView):
             # Mark user as verified
             if not user.is_verified:
                 user.is_verified = True
-                user.save()
+                user.save(update_fields=["is_verified"])
 
             return Response(
                 {"message": "2FA successfully completed", "status": True},
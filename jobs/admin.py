@@ -0,0 +1,16 @@
+from django.contrib import admin
+
+from .models import Job, TaskRun
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ["name", "status", "priority", "run_at", "attempts"]
+    list_filter = ["status", "name"]
+    readonly_fields = ["last_error", "locked_by", "locked_until"]
+
+
+@admin.register(TaskRun)
+class TaskRunAdmin(admin.ModelAdmin):
+    list_display = ["task", "scheduled_for", "lag", "duration", "succeeded"]
+    list_filter = ["task", "succeeded"]
@@ -0,0 +1,91 @@
+"""
+Cron expressions: ``minute hour day-of-month month day-of-week``.
+
+Fields take ``*``, numbers, ranges ``1-5``, lists ``1,15`` and steps
+``*/15`` or ``0-30/10``. Day of week runs from 0 (Sunday) to 6, 7 is
+Sunday too. As in cron, when both day fields are restricted a day matching
+either one matches. ``@hourly``, ``@daily``, ``@weekly``, ``@monthly`` and
+``@yearly`` are accepted as well.
+"""
+from datetime import timedelta
+
+ALIASES = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+    "@yearly": "0 0 1 1 *",
+}
+RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+
+class Cron:
+    def __init__(self, expression):
+        self.expression = expression
+        fields = ALIASES.get(expression, expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"{expression!r} does not have 5 fields")
+
+        minutes, hours, days, months, weekdays = (
+            parse_field(field, low, high) for field, (low, high) in zip(fields, RANGES)
+        )
+        self.minutes, self.hours, self.days, self.months = minutes, hours, days, months
+        self.weekdays = {weekday % 7 for weekday in weekdays}
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    def __repr__(self):
+        return f"Cron({self.expression!r})"
+
+    def matches_day(self, dt):
+        day = dt.day in self.days
+        # datetime counts from Monday = 0, cron from Sunday = 0
+        weekday = (dt.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def next_after(self, dt):
+        """The first matching minute strictly after ``dt``, in its timezone."""
+        dt = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        give_up = dt.year + 5
+
+        # Skip whole months, days and hours where possible
+        while dt.year <= give_up:
+            if dt.month not in self.months:
+                dt = (dt.replace(day=1) + timedelta(days=32)).replace(
+                    day=1, hour=0, minute=0
+                )
+            elif not self.matches_day(dt):
+                dt = dt.replace(hour=0, minute=0) + timedelta(days=1)
+            elif dt.hour not in self.hours:
+                dt = dt.replace(minute=0) + timedelta(hours=1)
+            elif dt.minute not in self.minutes:
+                dt += timedelta(minutes=1)
+            else:
+                return dt
+
+        raise ValueError(f"{self.expression!r} never matches")
+
+
+def parse_field(field, low, high):
+    values = set()
+
+    for part in field.split(","):
+        part, slash, step = part.partition("/")
+        step = int(step) if slash else 1
+
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start, end = map(int, part.split("-", 1))
+        else:
+            start = int(part)
+            # "5/15" means from 5 to the end, every 15
+            end = high if slash else start
+
+        if not low <= start <= end <= high or step < 1:
+            raise ValueError(f"{field!r} is out of range {low}-{high}")
+        values.update(range(start, end + 1, step))
+
+    return values
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from jobs.models import TaskRun
+from jobs.scheduler import Scheduler
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the periodic tasks in settings.SCHEDULE. Start it on every node, "
+        "only the one holding the scheduler lease runs tasks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--lease-ttl",
+            type=int,
+            default=60,
+            help="Seconds a dead leader keeps the lease before a node takes over",
+        )
+        parser.add_argument(
+            "--status",
+            action="store_true",
+            help="Print the last run of every task and exit",
+        )
+
+    def handle(self, *args, lease_ttl, status, **options):
+        scheduler = Scheduler(lease_ttl=lease_ttl)
+        if not status:
+            scheduler.run()
+            return
+
+        for name, (_, cron) in scheduler.tasks.items():
+            run = TaskRun.objects.filter(task=name).order_by("-scheduled_for").first()
+            if run is None:
+                self.stdout.write(f"{name:<24} {cron.expression:<16} never ran")
+                continue
+            outcome = "ok" if run.succeeded else "FAILED"
+            self.stdout.write(
+                f"{name:<24} {cron.expression:<16} {run.scheduled_for:%Y-%m-%d %H:%M} "
+                f"{outcome:<6} took {run.duration:.2f}s, {run.lag:.1f}s late"
+            )
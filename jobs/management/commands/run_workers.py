@@ -0,0 +1,69 @@
+import multiprocessing
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs.queue import Worker
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued jobs. Each process claims jobs for its own thread pool, "
+        "so any number of processes, on any number of hosts, can share the "
+        "queue."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=1)
+        parser.add_argument(
+            "--threads", type=int, default=4, help="Jobs run at once per process"
+        )
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Exit once no job is due instead of polling",
+        )
+
+    def handle(self, *args, processes, threads, burst, **options):
+        worker_options = {"threads": threads, "burst": burst}
+        if options["verbosity"] >= 1:
+            worker_options["log"] = self.stdout.write
+
+        if processes == 1:
+            Worker(**worker_options).run()
+            return
+
+        # Children must open their own database connections
+        connections.close_all()
+        results = multiprocessing.Queue()
+        children = [
+            multiprocessing.Process(
+                target=run_worker, args=(worker_options, results), daemon=True
+            )
+            for _ in range(processes)
+        ]
+        start = time.perf_counter()
+        for child in children:
+            child.start()
+
+        try:
+            totals = [results.get() for _ in children]
+        except KeyboardInterrupt:
+            # The children got the same SIGINT and are finishing their jobs
+            totals = []
+        for child in children:
+            child.join()
+
+        done = sum(done for done, _ in totals)
+        failed = sum(failed for _, failed in totals)
+        elapsed = time.perf_counter() - start
+        if options["verbosity"] >= 1:
+            self.stdout.write(
+                f"{processes} processes: {done} done, {failed} failed in "
+                f"{elapsed:.1f}s, {(done + failed) / elapsed:.1f} jobs/s"
+            )
+
+
+def run_worker(worker_options, results):
+    results.put(Worker(**worker_options).run())
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.3 on 2026-10-18 06:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Lease',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('holder', models.CharField(blank=True, max_length=100)),
+                ('expires_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TaskRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task', models.CharField(max_length=100)),
+                ('scheduled_for', models.DateTimeField()),
+                ('started_at', models.DateTimeField()),
+                ('duration', models.FloatField()),
+                ('lag', models.FloatField()),
+                ('succeeded', models.BooleanField()),
+                ('result', models.TextField(blank=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['task', '-scheduled_for'], name='jobs_taskru_task_c5a9ba_idx')],
+            },
+        ),
+    ]
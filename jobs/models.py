@@ -0,0 +1,63 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """A call to ``name(*args, **kwargs)``, run by ``manage.py run_workers``."""
+
+    class Status(models.TextChoices):
+        QUEUED = "queued"
+        RUNNING = "running"
+        DONE = "done"
+        # Out of attempts, left for someone to look at
+        DEAD = "dead"
+
+    name = models.CharField(max_length=200, help_text="dotted path of the function")
+    args = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+    kwargs = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    priority = models.SmallIntegerField(default=0, help_text="higher runs first")
+    run_at = models.DateTimeField(default=timezone.now)
+    status = models.CharField(
+        max_length=10, choices=Status.choices, default=Status.QUEUED
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_until = models.DateTimeField(null=True)
+    last_error = models.TextField(blank=True)
+    date_created = models.DateTimeField(auto_now_add=True)
+    date_finished = models.DateTimeField(null=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "-priority", "run_at"])]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+
+class Lease(models.Model):
+    """Held by one process at a time until ``expires_at``, e.g. the scheduler."""
+
+    name = models.CharField(max_length=100, primary_key=True)
+    holder = models.CharField(max_length=100, blank=True)
+    expires_at = models.DateTimeField()
+
+
+class TaskRun(models.Model):
+    """One run of a periodic task from settings.SCHEDULE."""
+
+    task = models.CharField(max_length=100)
+    scheduled_for = models.DateTimeField()
+    started_at = models.DateTimeField()
+    # Seconds spent running, and seconds between scheduled_for and started_at
+    duration = models.FloatField()
+    lag = models.FloatField()
+    succeeded = models.BooleanField()
+    result = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["task", "-scheduled_for"])]
+
+    def __str__(self):
+        return f"{self.task} at {self.scheduled_for}"
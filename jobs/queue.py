@@ -0,0 +1,212 @@
+"""
+A job queue in the database.
+
+    from jobs.queue import job
+
+    @job(priority=5)
+    def send_receipt(user_id):
+        ...
+
+    send_receipt.delay(user.pk)                   # runs on a worker
+    send_receipt.delay(user.pk, run_at=tomorrow)  # not before tomorrow
+
+Jobs are rows, so enqueueing inside a transaction that rolls back enqueues
+nothing. Arguments are stored as JSON. ``manage.py run_workers`` claims
+due jobs, highest priority first, and runs them in a thread pool. A job
+that raises is retried with exponential backoff and marked dead once out of
+attempts. A claim is a lease: a job whose worker died is picked up again
+once ``LEASE`` seconds have passed, so jobs should finish well within it and
+be safe to run twice.
+"""
+import functools
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "MAX_ATTEMPTS": 5,
+    # Seconds before the first retry, doubled after every failed attempt
+    "RETRY_DELAY": 10,
+    "MAX_RETRY_DELAY": 3600,
+    "LEASE": 300,
+    "POLL_INTERVAL": 1,
+}
+
+
+def get_option(name):
+    return {**DEFAULTS, **getattr(settings, "JOBS", {})}[name]
+
+
+def enqueue(name, *args, priority=0, run_at=None, max_attempts=None, **kwargs):
+    """Queue ``name(*args, **kwargs)``, ``name`` being a dotted path."""
+    return Job.objects.create(
+        name=name,
+        args=list(args),
+        kwargs=kwargs,
+        priority=priority,
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts or get_option("MAX_ATTEMPTS"),
+    )
+
+
+def job(func=None, *, priority=0, max_attempts=None):
+    """Give a module level function a ``delay()`` method that queues a call."""
+
+    def decorate(func):
+        name = f"{func.__module__}.{func.__qualname__}"
+        if "<locals>" in name:
+            raise ValueError(f"{name} cannot be imported by a worker")
+
+        @functools.wraps(func)
+        def delay(*args, **kwargs):
+            kwargs.setdefault("priority", priority)
+            kwargs.setdefault("max_attempts", max_attempts)
+            return enqueue(name, *args, **kwargs)
+
+        func.delay = delay
+        return func
+
+    return decorate(func) if func else decorate
+
+
+def claim(worker, limit):
+    """Lease up to ``limit`` due jobs to ``worker`` and return them."""
+    now = timezone.now()
+    until = now + timedelta(seconds=get_option("LEASE"))
+    claimable = Q(status=Job.Status.QUEUED, run_at__lte=now) | Q(
+        status=Job.Status.RUNNING, locked_until__lt=now
+    )
+    due = Job.objects.filter(claimable).order_by("-priority", "run_at")
+    lease = {
+        "status": Job.Status.RUNNING,
+        "locked_by": worker,
+        "locked_until": until,
+        "attempts": F("attempts") + 1,
+    }
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            locked = due.select_for_update(skip_locked=True)
+            ids = list(locked.values_list("pk", flat=True)[:limit])
+            Job.objects.filter(pk__in=ids).update(**lease)
+    else:
+        # No row locks (SQLite). The UPDATE checks the rows are still
+        # claimable, so a job another worker took in between is skipped.
+        ids = list(due.values_list("pk", flat=True)[:limit])
+        Job.objects.filter(claimable, pk__in=ids).update(**lease)
+
+    return list(
+        Job.objects.filter(
+            pk__in=ids, locked_by=worker, locked_until=until
+        ).order_by("-priority", "run_at")
+    )
+
+
+def finish(job, worker):
+    # A worker that outlived its lease must not overwrite the new owner's job
+    Job.objects.filter(pk=job.pk, locked_by=worker).update(
+        status=Job.Status.DONE, locked_until=None, date_finished=timezone.now()
+    )
+
+
+def fail(job, worker, error):
+    if job.attempts >= job.max_attempts:
+        changes = {"status": Job.Status.DEAD, "date_finished": timezone.now()}
+    else:
+        delay = min(
+            get_option("RETRY_DELAY") * 2 ** (job.attempts - 1),
+            get_option("MAX_RETRY_DELAY"),
+        )
+        changes = {
+            "status": Job.Status.QUEUED,
+            "run_at": timezone.now() + timedelta(seconds=delay),
+        }
+
+    Job.objects.filter(pk=job.pk, locked_by=worker).update(
+        locked_until=None, last_error=error, **changes
+    )
+
+
+class Worker:
+    """Claims jobs while it has free threads, until stopped."""
+
+    def __init__(self, threads=4, burst=False, poll_interval=None, log=None):
+        self.threads = threads
+        self.burst = burst
+        self.poll_interval = poll_interval or get_option("POLL_INTERVAL")
+        self.log = log or logger.info
+        self.name = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.done = self.failed = 0
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def stop(self, *args):
+        self._stopping.set()
+
+    def run(self):
+        """Run until stopped, or until the queue is empty with ``burst``."""
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+
+        start = time.perf_counter()
+        running = set()
+
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            while not self._stopping.is_set():
+                running = {future for future in running if not future.done()}
+                free = self.threads - len(running)
+                jobs = claim(self.name, free) if free else []
+                running.update(executor.submit(self.execute, job) for job in jobs)
+
+                if jobs and len(running) < self.threads:
+                    continue
+                if running:
+                    wait(running, self.poll_interval, return_when=FIRST_COMPLETED)
+                elif self.burst:
+                    break
+                else:
+                    self._stopping.wait(self.poll_interval)
+
+        elapsed = time.perf_counter() - start
+        self.log(
+            f"{self.name}: {self.done} done, {self.failed} failed in "
+            f"{elapsed:.1f}s, {(self.done + self.failed) / elapsed:.1f} jobs/s"
+        )
+        close_old_connections()
+        return self.done, self.failed
+
+    def execute(self, job):
+        # As around a request, the pool thread's connection is dropped if
+        # broken, and closed after the job unless CONN_MAX_AGE keeps it
+        close_old_connections()
+        try:
+            import_string(job.name)(*job.args, **job.kwargs)
+        except Exception:
+            logger.warning("Job %s (%s) failed", job.pk, job.name, exc_info=True)
+            fail(job, self.name, traceback.format_exc())
+            with self._lock:
+                self.failed += 1
+        else:
+            finish(job, self.name)
+            with self._lock:
+                self.done += 1
+        finally:
+            close_old_connections()
@@ -0,0 +1,192 @@
+"""
+Periodic tasks, run on exactly one node.
+
+Every node may run ``manage.py run_scheduler``. They compete for a lease
+row, renewed by the holder well before it expires; only the holder runs
+tasks. When it dies the lease lapses and another node takes over, carrying
+on from the last run recorded in TaskRun. Runs missed while nobody held
+the lease are caught up as a single run.
+
+Tasks are configured in ``settings.SCHEDULE``:
+
+    SCHEDULE = {
+        "flush_expired_tokens": {
+            "task": "core.tasks.flush_expired_tokens",
+            "cron": "0 3 * * *",
+        },
+    }
+
+A task is called without arguments, in the scheduler process, one at a
+time. Whatever it returns is stored in TaskRun.result, with how long it
+ran and how late it started. A heartbeat thread keeps renewing the lease
+while a task runs, however long it takes. If a renewal fails, no further
+task is started once the current one returns.
+"""
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .cron import Cron
+from .models import Lease, TaskRun
+
+logger = logging.getLogger(__name__)
+
+LEASE_NAME = "scheduler"
+
+
+def acquire_lease(name, holder, ttl):
+    """Take or renew the lease ``name`` for ``ttl`` seconds, if it is free."""
+    now = timezone.now()
+    Lease.objects.get_or_create(name=name, defaults={"expires_at": now})
+
+    # One conditional UPDATE, so two nodes can never both get the lease
+    return bool(
+        Lease.objects.filter(Q(holder=holder) | Q(expires_at__lte=now), name=name)
+        .update(holder=holder, expires_at=now + timedelta(seconds=ttl))
+    )
+
+
+def release_lease(name, holder):
+    Lease.objects.filter(name=name, holder=holder).update(expires_at=timezone.now())
+
+
+class Scheduler:
+    def __init__(self, schedule=None, lease_ttl=60):
+        schedule = settings.SCHEDULE if schedule is None else schedule
+        self.tasks = {
+            name: (import_string(options["task"]), Cron(options["cron"]))
+            for name, options in schedule.items()
+        }
+        self.lease_ttl = lease_ttl
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.next_runs = {}
+        self._stopping = threading.Event()
+        self._lease_lost = threading.Event()
+
+    def stop(self, *args):
+        self._stopping.set()
+
+    def run(self):
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+
+        try:
+            while not self._stopping.is_set():
+                self.run_pending()
+                self._stopping.wait(self.sleep_time())
+        finally:
+            release_lease(LEASE_NAME, self.holder)
+
+    def sleep_time(self):
+        # Wake up in time to renew the lease, or to take it over
+        renew_in = self.lease_ttl / 3
+        if not self.next_runs:
+            return renew_in
+        due_in = (min(self.next_runs.values()) - timezone.now()).total_seconds()
+        return max(min(due_in, renew_in), 0)
+
+    def run_pending(self):
+        """Run the due tasks if this node leads, and return their TaskRuns."""
+        if not acquire_lease(LEASE_NAME, self.holder, self.lease_ttl):
+            # Whoever leads now moves the schedule on, re-read it on takeover
+            self.next_runs.clear()
+            return []
+
+        runs = []
+        for name, (task, cron) in self.tasks.items():
+            scheduled_for = self.next_run(name, cron)
+            now = timezone.now()
+            if scheduled_for > now:
+                continue
+
+            # Catch up on missed runs once, recorded as the latest of them
+            following = cron.next_after(scheduled_for)
+            while following <= now:
+                scheduled_for, following = following, cron.next_after(following)
+
+            with self.keeping_lease():
+                runs.append(self.run_task(name, task, scheduled_for))
+            self.next_runs[name] = following
+            if self._lease_lost.is_set() or not acquire_lease(
+                LEASE_NAME, self.holder, self.lease_ttl
+            ):
+                self.next_runs.clear()
+                break
+
+        return runs
+
+    @contextmanager
+    def keeping_lease(self):
+        """Renew the lease from another thread until the block exits."""
+        self._lease_lost.clear()
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self.heartbeat, args=(done,), daemon=True)
+        heartbeat.start()
+        try:
+            yield
+        finally:
+            done.set()
+            heartbeat.join()
+
+    def heartbeat(self, done):
+        try:
+            while not done.wait(self.lease_ttl / 3):
+                if not acquire_lease(LEASE_NAME, self.holder, self.lease_ttl):
+                    logger.error("Lost the scheduler lease during a task")
+                    self._lease_lost.set()
+                    return
+        except Exception:
+            # Cannot tell whether we still lead, assume not
+            logger.exception("Could not renew the scheduler lease")
+            self._lease_lost.set()
+        finally:
+            connection.close()
+
+    def next_run(self, name, cron):
+        if name not in self.next_runs:
+            last = (
+                TaskRun.objects.filter(task=name)
+                .order_by("-scheduled_for")
+                .values_list("scheduled_for", flat=True)
+                .first()
+            )
+            since = last or timezone.now()
+            self.next_runs[name] = cron.next_after(timezone.localtime(since))
+        return self.next_runs[name]
+
+    def run_task(self, name, task, scheduled_for):
+        started_at = timezone.now()
+        start = time.perf_counter()
+        try:
+            result = task()
+        except Exception:
+            logger.exception("Periodic task %s failed", name)
+            succeeded, result = False, traceback.format_exc()
+        else:
+            succeeded, result = True, "" if result is None else str(result)
+
+        run = TaskRun.objects.create(
+            task=name,
+            scheduled_for=scheduled_for,
+            started_at=started_at,
+            duration=time.perf_counter() - start,
+            lag=(started_at - scheduled_for).total_seconds(),
+            succeeded=succeeded,
+            result=result,
+        )
+        logger.info("Ran %s in %.2fs, %.1fs late", name, run.duration, run.lag)
+        return run
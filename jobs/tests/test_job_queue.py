@@ -0,0 +1,159 @@
+import threading
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.db import connections
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.queue import Worker, claim, enqueue, finish, job
+
+calls = []
+calls_lock = threading.Lock()
+
+
+@job(priority=3)
+def record(value, tag=None):
+    with calls_lock:
+        calls.append((value, tag))
+
+
+@job(max_attempts=3)
+def explode():
+    1 / 0
+
+
+@job
+def use_connection():
+    Job.objects.exists()
+    with calls_lock:
+        # The worker thread's own connection
+        calls.append(connections["default"])
+
+
+@pytest.fixture(autouse=True)
+def clear_calls():
+    calls.clear()
+
+
+def make_jobs(count, **kwargs):
+    return [enqueue(record.__module__ + ".record", n, **kwargs) for n in range(count)]
+
+
+@pytest.mark.django_db
+class TestEnqueue:
+    def test_delay(self):
+        queued = record.delay(1, tag="a", run_at=timezone.now() + timedelta(hours=1))
+
+        assert queued.name == f"{__name__}.record"
+        assert queued.args == [1]
+        assert queued.kwargs == {"tag": "a"}
+        assert queued.priority == 3
+
+    def test_nested_functions_cannot_be_jobs(self):
+        def nested():
+            pass
+
+        with pytest.raises(ValueError):
+            job(nested)
+
+
+@pytest.mark.django_db
+class TestClaim:
+    def test_priority_then_run_at(self):
+        later = enqueue("a", run_at=timezone.now() - timedelta(minutes=1))
+        earlier = enqueue("b", run_at=timezone.now() - timedelta(minutes=2))
+        urgent = enqueue("c", priority=10)
+        enqueue("d", run_at=timezone.now() + timedelta(minutes=1))
+
+        claimed = claim("worker", 10)
+
+        assert claimed == [urgent, earlier, later]
+        assert {job.attempts for job in claimed} == {1}
+
+    def test_claims_are_disjoint(self):
+        make_jobs(8)
+
+        first, second = claim("one", 5), claim("two", 5)
+
+        assert len(first) == 5
+        assert len(second) == 3
+        assert not {job.pk for job in first} & {job.pk for job in second}
+
+    def test_expired_lease_is_reclaimed(self, settings):
+        settings.JOBS = {"LEASE": -1}
+        make_jobs(1)
+        (lost,) = claim("crashed", 1)
+
+        (reclaimed,) = claim("other", 1)
+        # The crashed worker comes back, too late to overwrite anything
+        finish(lost, "crashed")
+        reclaimed.refresh_from_db()
+
+        assert reclaimed.pk == lost.pk
+        assert reclaimed.attempts == 2
+        assert reclaimed.status == Job.Status.RUNNING
+
+
+@pytest.mark.django_db(transaction=True)
+class TestWorker:
+    def test_runs_due_jobs(self):
+        make_jobs(10)
+
+        Worker(threads=3, burst=True).run()
+
+        assert sorted(calls) == [(number, None) for number in range(10)]
+        assert Job.objects.filter(status=Job.Status.DONE).count() == 10
+
+    def test_failing_job_is_retried_then_dead(self, settings):
+        settings.JOBS = {"RETRY_DELAY": 0}
+        explode.delay()
+
+        done, failed = Worker(threads=1, burst=True).run()
+        dead = Job.objects.get()
+
+        assert (done, failed) == (0, 3)
+        assert dead.status == Job.Status.DEAD
+        assert dead.attempts == 3
+        assert "ZeroDivisionError" in dead.last_error
+
+    def test_backoff(self, settings):
+        settings.JOBS = {"RETRY_DELAY": 60}
+        explode.delay()
+
+        Worker(threads=1, burst=True).run()
+        retry = Job.objects.get()
+
+        assert retry.status == Job.Status.QUEUED
+        assert retry.run_at - timezone.now() > timedelta(seconds=55)
+
+    def test_closes_connections_after_jobs(self):
+        use_connection.delay()
+
+        Worker(threads=1, burst=True).run()
+
+        [used] = calls
+        assert used is not connections["default"]
+        assert used.connection is None
+
+    def test_concurrent_workers_run_each_job_once(self):
+        make_jobs(60)
+        workers = [Worker(threads=2, burst=True) for _ in range(3)]
+        threads = [threading.Thread(target=worker.run) for worker in workers]
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(calls) == [(number, None) for number in range(60)]
+
+    def test_command_reports_throughput(self, capsys):
+        make_jobs(5)
+
+        call_command("run_workers", "--burst", "--threads=2")
+
+        output = capsys.readouterr().out
+        assert "5 done, 0 failed" in output
+        assert "jobs/s" in output
@@ -0,0 +1,227 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.utils import timezone
+from model_bakery import baker
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+from core.models import OTP
+from core.tasks import flush_expired_tokens, sweep_otps
+from jobs.cron import Cron
+from jobs.models import Lease, TaskRun
+from jobs.scheduler import LEASE_NAME, Scheduler, acquire_lease, release_lease
+from payments.models import Wallet
+from payments.tasks import reconcile_wallets
+
+calls = []
+
+
+def tick():
+    calls.append(timezone.now())
+    return "ticked"
+
+
+def broken():
+    raise RuntimeError("boom")
+
+
+def slow():
+    calls.append(timezone.now())
+    time.sleep(0.5)
+
+
+def stolen():
+    calls.append(timezone.now())
+    # Taken by another node for a moment, free again when the task returns
+    Lease.objects.filter(name=LEASE_NAME).update(
+        holder="other", expires_at=timezone.now() + timedelta(seconds=0.2)
+    )
+    time.sleep(0.4)
+
+
+@pytest.fixture(autouse=True)
+def clear_calls():
+    calls.clear()
+
+
+def hourly(task="tick"):
+    return {task: {"task": f"{__name__}.{task}", "cron": "0 * * * *"}}
+
+
+def ran(task, ago):
+    scheduled_for = timezone.now() - ago
+    return TaskRun.objects.create(
+        task=task,
+        scheduled_for=scheduled_for,
+        started_at=scheduled_for,
+        duration=0,
+        lag=0,
+        succeeded=True,
+    )
+
+
+class TestCron:
+    @pytest.mark.parametrize(
+        "expression, after, expected",
+        [
+            ("*/15 * * * *", datetime(2024, 1, 1, 10, 7), datetime(2024, 1, 1, 10, 15)),
+            ("0 3 * * *", datetime(2024, 1, 1, 3, 0), datetime(2024, 1, 2, 3, 0)),
+            ("30 9 * * 1-5", datetime(2024, 1, 5, 10, 0), datetime(2024, 1, 8, 9, 30)),
+            ("0 0 29 2 *", datetime(2024, 3, 1), datetime(2028, 2, 29)),
+            ("@monthly", datetime(2024, 1, 31, 23, 59), datetime(2024, 2, 1)),
+            # Either day field matches when both are restricted
+            ("0 0 13 * 5", datetime(2024, 1, 1), datetime(2024, 1, 5)),
+        ],
+    )
+    def test_next_after(self, expression, after, expected):
+        assert Cron(expression).next_after(after) == expected
+
+    @pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "*/0 * * * *"])
+    def test_invalid(self, expression):
+        with pytest.raises(ValueError):
+            Cron(expression)
+
+
+@pytest.mark.django_db
+class TestLease:
+    def test_only_one_holder(self):
+        assert acquire_lease("lease", "a", ttl=60)
+        assert not acquire_lease("lease", "b", ttl=60)
+        # Renewing works for the holder
+        assert acquire_lease("lease", "a", ttl=60)
+
+    def test_expired_lease_is_taken_over(self):
+        acquire_lease("lease", "a", ttl=-1)
+
+        assert acquire_lease("lease", "b", ttl=60)
+        assert not acquire_lease("lease", "a", ttl=60)
+
+    def test_release(self):
+        acquire_lease("lease", "a", ttl=60)
+        release_lease("lease", "a")
+
+        assert acquire_lease("lease", "b", ttl=60)
+
+
+@pytest.mark.django_db
+class TestScheduler:
+    def test_runs_due_task_and_records_lag(self):
+        ran("tick", ago=timedelta(minutes=90))
+
+        (run,) = Scheduler(hourly()).run_pending()
+
+        assert len(calls) == 1
+        assert run.succeeded and run.result == "ticked"
+        assert run.lag == (run.started_at - run.scheduled_for).total_seconds()
+        assert 0 <= run.lag < 3600
+
+    def test_missed_runs_are_coalesced(self):
+        ran("tick", ago=timedelta(hours=5))
+        scheduler = Scheduler(hourly())
+
+        (run,) = scheduler.run_pending()
+        scheduler.run_pending()
+
+        assert len(calls) == 1
+        # Recorded as the latest missed run, so a new leader won't repeat it
+        assert run.lag < 3600
+        assert scheduler.next_runs["tick"] > timezone.now()
+
+    def test_nothing_due_on_first_start(self):
+        assert Scheduler(hourly()).run_pending() == []
+
+    def test_followers_do_not_run_tasks(self):
+        ran("tick", ago=timedelta(minutes=90))
+        leader, follower = Scheduler(hourly()), Scheduler(hourly())
+
+        leader.run_pending()
+        assert follower.run_pending() == []
+        assert len(calls) == 1
+
+    def test_new_leader_carries_on_from_the_last_run(self):
+        ran("tick", ago=timedelta(minutes=90))
+        leader, follower = Scheduler(hourly()), Scheduler(hourly())
+        leader.run_pending()
+
+        release_lease(LEASE_NAME, leader.holder)
+
+        assert follower.run_pending() == []
+        assert follower.next_runs["tick"] == leader.next_runs["tick"]
+
+    def test_failing_task_is_recorded(self):
+        ran("broken", ago=timedelta(minutes=90))
+
+        (run,) = Scheduler(hourly("broken")).run_pending()
+
+        assert not run.succeeded
+        assert "RuntimeError: boom" in run.result
+
+
+@pytest.mark.django_db(transaction=True)
+class TestLeaseHeartbeat:
+    def test_lease_is_renewed_during_a_long_task(self):
+        ran("slow", ago=timedelta(minutes=90))
+        scheduler = Scheduler(hourly("slow"), lease_ttl=0.3)
+        renewed = []
+
+        def watch():
+            time.sleep(0.4)
+            renewed.append(not acquire_lease(LEASE_NAME, "other", ttl=60))
+            connection.close()
+
+        watcher = threading.Thread(target=watch)
+        watcher.start()
+        scheduler.run_pending()
+        watcher.join()
+
+        # Past the first TTL, the lease was still held
+        assert renewed == [True]
+
+    def test_stops_dispatching_once_the_lease_is_lost(self):
+        schedule = {**hourly("stolen"), **hourly("tick")}
+        ran("stolen", ago=timedelta(minutes=90))
+        ran("tick", ago=timedelta(minutes=90))
+        scheduler = Scheduler(schedule, lease_ttl=0.3)
+
+        runs = scheduler.run_pending()
+
+        assert [run.task for run in runs] == ["stolen"]
+        assert len(calls) == 1
+        assert scheduler.next_runs == {}
+
+
+@pytest.mark.django_db
+class TestMaintenanceTasks:
+    def test_flush_expired_tokens(self):
+        user = baker.make(get_user_model())
+        for expires_at in [timezone.now() - timedelta(days=1), timezone.now()]:
+            baker.make(OutstandingToken, user=user, expires_at=expires_at)
+        baker.make(
+            OutstandingToken, user=user, expires_at=timezone.now() + timedelta(days=1)
+        )
+
+        flush_expired_tokens()
+
+        assert OutstandingToken.objects.count() == 1
+
+    def test_sweep_otps(self, settings):
+        settings.OTP_STORE = {"TTL": 300}
+        old, fresh = baker.make(OTP, _quantity=2)
+        OTP.objects.filter(pk=old.pk).update(
+            date_updated=timezone.now() - timedelta(minutes=10)
+        )
+
+        sweep_otps()
+
+        assert list(OTP.objects.all()) == [fresh]
+
+    def test_reconcile_wallets(self):
+        users = baker.make(get_user_model(), _quantity=3)
+        Wallet.objects.filter(user=users[0]).delete()
+
+        assert reconcile_wallets() == "Created 1 missing wallets"
+        assert Wallet.objects.filter(user=users[0]).exists()
@@ -0,0 +1,79 @@
+import csv
+import json
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+
+from payments.utils import post_chunk
+
+
+class Command(BaseCommand):
+    help = (
+        "Credit wallets in bulk, payouts for instance, from a CSV or JSONL "
+        "file of user, amount and reference. Entries are posted a chunk per "
+        "transaction, and failed ones are written to a rejects file without "
+        "stopping the others. References are posted once, so a file can be "
+        "posted again after an interruption."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV (with a header row) or JSONL file")
+        parser.add_argument("--format", choices=["csv", "jsonl"])
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument("--description", default="", help="For every entry")
+        parser.add_argument("--rejects", help="Defaults to <path>.rejects.jsonl")
+
+    def handle(self, *args, path, chunk_size, description, **options):
+        file_format = options["format"] or (
+            "jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv"
+        )
+        rejects_path = options["rejects"] or f"{path}.rejects.jsonl"
+        posted = rejected = 0
+        start = time.perf_counter()
+
+        with open(path, newline="") as source, open(rejects_path, "w") as rejects:
+            rows = self.read_rows(source, file_format)
+            while chunk := list(islice(rows, chunk_size)):
+                entries = [
+                    (row.get("user"), row.get("amount"), row.get("reference"))
+                    for _, row in chunk
+                ]
+                chunk_posted, failures = post_chunk(entries, description)
+
+                for index, reason in failures:
+                    line, row = chunk[index]
+                    rejects.write(
+                        json.dumps({"line": line, "reasons": [reason], "row": row})
+                        + "\n"
+                    )
+                rejects.flush()
+
+                posted += chunk_posted
+                rejected += len(failures)
+                rate = (posted + rejected) / (time.perf_counter() - start)
+                self.stdout.write(
+                    f"{posted + rejected} entries read, {posted} posted, "
+                    f"{rejected} rejected, {rate:.0f} entries/s"
+                )
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Posted {posted} entries, rejected {rejected}")
+        )
+
+    def read_rows(self, source, file_format):
+        """Yield ``(line_number, row)``, with ``row`` empty for unparsable lines"""
+        if file_format == "csv":
+            reader = csv.DictReader(source)
+            for row in reader:
+                yield reader.line_num, row
+            return
+
+        for line_number, line in enumerate(source, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield line_number, row if isinstance(row, dict) else {}
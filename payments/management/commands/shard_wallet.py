@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from payments.models import Wallet
+from payments.shards import shard_wallet
+
+
+class Command(BaseCommand):
+    help = (
+        "Split a busy wallet's balance over sub-balances written to at random, "
+        "so concurrent credits do not queue on its row. A count of 0 goes "
+        "back to a plain wallet."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("email", help="The wallet owner's email")
+        parser.add_argument("count", type=int, help="How many shards")
+
+    def handle(self, *args, email, count, **options):
+        if count < 0:
+            raise CommandError("The count cannot be negative")
+        try:
+            wallet = Wallet.objects.get(user__email=email)
+        except Wallet.DoesNotExist:
+            raise CommandError(f"No wallet for {email}")
+
+        shard_wallet(wallet, count)
+        self.stdout.write(
+            self.style.SUCCESS(f"{email}'s wallet now has {count} shards")
+        )
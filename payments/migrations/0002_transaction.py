@@ -0,0 +1,45 @@
+# Generated by Django 4.2.3 on 2026-10-18 06:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def open_ledgers(apps, schema_editor):
+    # Balances so far have no entries, each wallet's ledger starts with one
+    Wallet = apps.get_model("payments", "Wallet")
+    Transaction = apps.get_model("payments", "Transaction")
+    Transaction.objects.bulk_create(
+        Transaction(
+            wallet=wallet,
+            amount=wallet.balance,
+            balance=wallet.balance,
+            description="Opening balance",
+        )
+        for wallet in Wallet.objects.exclude(balance=0).iterator()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Transaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('reference', models.CharField(max_length=255, null=True, unique=True)),
+                ('description', models.CharField(blank=True, max_length=255)),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='transactions', to='payments.wallet')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['wallet', '-id'], name='transaction_history')],
+            },
+        ),
+        migrations.RunPython(open_ledgers, migrations.RunPython.noop),
+    ]
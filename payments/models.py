@@ -2,14 +2,111 @@ from django.db import models
 from django.contrib.auth import get_user_model
 
 
-
-
 class Wallet(models.Model):
     user = models.OneToOneField(get_user_model(), on_delete=models.DO_NOTHING)
     balance = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     date_created = models.DateTimeField(auto_now_add=True)
     date_updated = models.DateTimeField(auto_now=True)
+    # How many WalletShard rows share the balance, 0 for a plain wallet, see
+    # payments/shards.py
+    shards = models.PositiveSmallIntegerField(default=0)
+
+
+class WalletShard(models.Model):
+    """A sub-balance of a sharded wallet, its balance is never negative."""
+
+    wallet = models.ForeignKey(
+        Wallet, on_delete=models.CASCADE, related_name="sub_balances"
+    )
+    number = models.PositiveSmallIntegerField()
+    balance = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    date_updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["wallet", "number"], name="unique_wallet_shard"
+            )
+        ]
+
+
+class LedgerQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        raise TypeError("Transactions cannot be changed")
+
+    def delete(self):
+        raise TypeError("Transactions cannot be deleted")
+
+
+class Transaction(models.Model):
+    """
+    An entry of a wallet's ledger, credits positive and debits negative.
+    Entries are never changed or deleted, a mistake is undone by another
+    entry, so a wallet's entries add up to its balance.
+    """
+
+    wallet = models.ForeignKey(
+        Wallet, on_delete=models.PROTECT, related_name="transactions"
+    )
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    # The wallet's balance right after this entry, unknown for sharded wallets
+    balance = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    # What the entry is for outside the ledger, a payment's id for instance,
+    # recorded once at most
+    reference = models.CharField(max_length=255, unique=True, null=True)
+    description = models.CharField(max_length=255, blank=True)
+    date_created = models.DateTimeField(auto_now_add=True)
+
+    objects = LedgerQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # A wallet's history, newest first
+            models.Index(fields=["wallet", "-id"], name="transaction_history")
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise TypeError("Transactions cannot be changed")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise TypeError("Transactions cannot be deleted")
+
+
+class StripeEvent(models.Model):
+    """
+    A Stripe webhook event as received, applied later by
+    ``payments.webhooks.process_events``.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending"
+        PROCESSED = "processed"
+        # Nothing to do for this type of event
+        IGNORED = "ignored"
+        # Out of attempts or not applicable, left for someone to look at
+        FAILED = "failed"
+
+    event_id = models.CharField(max_length=255, unique=True)
+    type = models.CharField(max_length=100)
+    # Events of one customer are applied in order, oldest first
+    customer = models.CharField(max_length=255, null=True)
+    created = models.DateTimeField(help_text="when Stripe created the event")
+    payload = models.TextField(help_text="the request body, as signed")
+    status = models.CharField(
+        max_length=10, choices=Status.choices, default=Status.PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    date_received = models.DateTimeField(auto_now_add=True)
+    date_processed = models.DateTimeField(null=True)
 
+    class Meta:
+        indexes = [
+            # The processor's queue
+            models.Index(fields=["status", "created", "id"], name="stripe_event_queue")
+        ]
 
-class Transaction():
-    ...
\ No newline at end of file
+    def __str__(self):
+        return f"{self.event_id} {self.type} ({self.status})"
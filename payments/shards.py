@@ -0,0 +1,119 @@
+"""
+Sharded wallets, for the few that nearly every payment credits, escrow for
+instance.
+
+A sharded wallet's balance is split between its own row and its WalletShard
+rows. Credits go to a shard picked at random, so concurrent credits seldom
+wait on the same row. No row ever goes below zero, which keeps debits from
+overdrawing: a debit is taken from the wallet's row or from a shard that
+holds enough, and otherwise the shards are folded into the wallet's row
+first. ``compact_wallet_shards`` folds them periodically.
+
+Reads add the rows up, and cache the total for ``BALANCE_TIMEOUT`` seconds.
+"""
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Max, Sum
+from django.utils import timezone
+
+from .models import Wallet, WalletShard
+
+DEFAULTS = {
+    "BALANCE_TIMEOUT": 5,
+}
+
+
+def get_option(name):
+    return {**DEFAULTS, **getattr(settings, "WALLET_SHARDS", {})}[name]
+
+
+def balance_key(wallet_id):
+    return f"wallet-balance:{wallet_id}"
+
+
+def shard_wallet(wallet, count):
+    """
+    Split ``wallet``'s balance writes over ``count`` shards, 0 to go back to
+    the wallet's row alone.
+    """
+    WalletShard.objects.bulk_create(
+        [WalletShard(wallet=wallet, number=number) for number in range(count)],
+        ignore_conflicts=True,
+    )
+    Wallet.objects.filter(pk=wallet.pk).update(shards=count)
+    wallet.shards = count
+    # Shards beyond the count are not written to anymore
+    fold(wallet.pk)
+
+
+def credit(wallet_id, shards, amount):
+    return WalletShard.objects.filter(
+        wallet_id=wallet_id, number=random.randrange(shards)
+    ).update(balance=F("balance") + amount, date_updated=timezone.now())
+
+
+def debit(wallet_id, shards, amount):
+    """Take ``amount`` from one of the wallet's rows, False if none has it."""
+    now = timezone.now()
+    if Wallet.objects.filter(pk=wallet_id, balance__gte=amount).update(
+        balance=F("balance") - amount, date_updated=now
+    ):
+        return True
+
+    for number in random.sample(range(shards), shards):
+        if WalletShard.objects.filter(
+            wallet_id=wallet_id, number=number, balance__gte=amount
+        ).update(balance=F("balance") - amount, date_updated=now):
+            return True
+
+    # Spread over several rows, put it all in one
+    return bool(fold(wallet_id)) and bool(
+        Wallet.objects.filter(pk=wallet_id, balance__gte=amount).update(
+            balance=F("balance") - amount, date_updated=now
+        )
+    )
+
+
+def fold(wallet_id):
+    """Move the shards' balances to the wallet's row, return how much."""
+    shards = list(
+        WalletShard.objects.filter(wallet_id=wallet_id)
+        .exclude(balance=0)
+        .values_list("pk", "balance")
+    )
+    folded = 0
+    now = timezone.now()
+
+    with transaction.atomic():
+        for pk, balance in shards:
+            # Takes what was read, credits made since stay in the shard
+            if WalletShard.objects.filter(pk=pk, balance__gte=balance).update(
+                balance=F("balance") - balance, date_updated=now
+            ):
+                folded += balance
+        if folded:
+            Wallet.objects.filter(pk=wallet_id).update(
+                balance=F("balance") + folded, date_updated=now
+            )
+    return folded
+
+
+def wallet_balance(wallet):
+    """``wallet``'s balance and when it last changed."""
+    if not wallet.shards:
+        return wallet.balance, wallet.date_updated
+
+    total = cache.get(balance_key(wallet.pk))
+    if total is None:
+        shards = WalletShard.objects.filter(wallet_id=wallet.pk).aggregate(
+            balance=Sum("balance"), date_updated=Max("date_updated")
+        )
+        total = (
+            wallet.balance + (shards["balance"] or 0),
+            max(wallet.date_updated, shards["date_updated"] or wallet.date_updated),
+        )
+        cache.set(balance_key(wallet.pk), total, get_option("BALANCE_TIMEOUT"))
+    return total
@@ -0,0 +1,63 @@
+"""Periodic maintenance, scheduled in settings.SCHEDULE."""
+import logging
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Abs, Coalesce
+
+from .models import Transaction, Wallet, WalletShard
+from .shards import fold
+from .webhooks import process_events
+
+logger = logging.getLogger(__name__)
+
+
+def reconcile_wallets():
+    """
+    Create the wallets missing for users saved without the post_save signal,
+    and report the wallets whose balance is not the sum of their ledger.
+    """
+    missing = get_user_model().objects.filter(wallet__isnull=True)
+    created = Wallet.objects.bulk_create(Wallet(user=user) for user in missing)
+    result = f"Created {len(created)} missing wallets"
+
+    def total(queryset, field):
+        # Subqueries, joins would count every entry once per shard
+        rows = queryset.filter(wallet=OuterRef("pk")).values("wallet")
+        return Coalesce(
+            Subquery(rows.annotate(total=Sum(field)).values("total")),
+            Value(Decimal(0)),
+        )
+
+    # Amounts are whole cents, but SQLite adds decimals up as floats
+    drifted = list(
+        Wallet.objects.annotate(
+            ledger=total(Transaction.objects, "amount"),
+            sharded=total(WalletShard.objects, "balance"),
+        )
+        .annotate(drift=Abs(F("balance") + F("sharded") - F("ledger")))
+        .filter(drift__gte=Decimal("0.005"))
+        .values_list("pk", flat=True)
+    )
+    if drifted:
+        logger.error("Wallets disagreeing with their ledger: %s", drifted)
+        result += f", {len(drifted)} wallets disagree with their ledger"
+    return result
+
+
+def compact_wallet_shards():
+    """Fold the shards of sharded wallets back into the wallets' rows."""
+    wallets = list(
+        WalletShard.objects.exclude(balance=0)
+        .values_list("wallet_id", flat=True)
+        .distinct()
+    )
+    for wallet_id in wallets:
+        fold(wallet_id)
+    return f"Compacted {len(wallets)} sharded wallets"
+
+
+def process_stripe_events():
+    """Apply the Stripe events received since the last run."""
+    return f"Processed {process_events()} Stripe events"
@@ -0,0 +1,8 @@
+import pytest
+from django.core.cache import cache
+
+
+@pytest.fixture(autouse=True)
+def clear_wallet_balances():
+    # Sharded balances are cached by wallet, and wallets are new in every test
+    cache.clear()
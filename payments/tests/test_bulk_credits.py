@@ -0,0 +1,119 @@
+import json
+import uuid
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from model_bakery import baker
+
+from payments.models import Transaction, Wallet
+from payments.utils import credit_wallet, post_credits
+
+
+@pytest.fixture
+def users():
+    return baker.make(get_user_model(), _quantity=3)
+
+
+def balances(users):
+    return [Wallet.objects.get(user=user).balance for user in users]
+
+
+@pytest.mark.django_db
+class TestPostCredits:
+    def test_posts_entries(self, users, django_assert_max_num_queries):
+        credit_wallet(users[0], 5)
+        entries = [
+            (users[0].pk, Decimal("10"), "payout-1"),
+            (users[1].pk, "2.50", "payout-2"),
+            (str(users[0].pk), 1, "payout-3"),
+        ]
+
+        # Wallets, references, then the update, balances and insert in a
+        # savepoint, however many entries
+        with django_assert_max_num_queries(7):
+            assert post_credits(entries, description="October") == (3, [])
+
+        assert balances(users) == [16, Decimal("2.50"), 0]
+        ledger = Transaction.objects.filter(reference__startswith="payout")
+        assert list(ledger.order_by("pk").values_list("amount", "balance")) == [
+            (10, 15),
+            (Decimal("2.50"), Decimal("2.50")),
+            (1, 16),
+        ]
+        assert set(ledger.values_list("description", flat=True)) == {"October"}
+
+    def test_reports_failures_and_posts_the_rest(self, users):
+        credit_wallet(users[2], 1, reference="posted")
+        entries = [
+            ("not-a-uuid", 1, "a"),
+            (uuid.uuid4(), 1, "b"),
+            (users[0].pk, 0, "c"),
+            (users[0].pk, "ten", "d"),
+            (users[0].pk, 1, ""),
+            (users[0].pk, 1, "e"),
+            (users[1].pk, 1, "e"),
+            (users[2].pk, 1, "posted"),
+            (users[1].pk, 3, "f"),
+            (users[1].pk, "0.005", "g"),
+            (users[1].pk, "1.250", "h"),
+        ]
+
+        posted, failures = post_credits(entries, chunk_size=4)
+
+        assert posted == 3
+        assert failures == [
+            (0, "Invalid user id"),
+            (1, "No wallet for this user"),
+            (2, "The amount must be positive"),
+            (3, "Invalid amount"),
+            (4, "A reference is required"),
+            (6, "Duplicate reference"),
+            (7, "Already posted"),
+            (9, "At most 2 decimal places"),
+        ]
+        assert balances(users) == [1, Decimal("4.25"), 1]
+
+    def test_failed_chunk_is_posted_entry_by_entry(self, users, monkeypatch):
+        credit_wallet(users[0], 1, reference="posted")
+        # As if posted by someone else after the chunk was checked
+        monkeypatch.setattr(
+            Transaction.objects, "filter", lambda **kwargs: Transaction.objects.none()
+        )
+
+        posted, failures = post_credits(
+            [(users[0].pk, 1, "posted"), (users[1].pk, 2, "new")]
+        )
+
+        assert posted == 1
+        assert [index for index, _ in failures] == [0]
+        assert balances(users) == [1, 2, 0]
+
+
+@pytest.mark.django_db
+class TestPostCreditsCommand:
+    def test_posts_and_rejects(self, users, tmp_path):
+        path = tmp_path / "payouts.csv"
+        path.write_text(
+            "user,amount,reference\n"
+            f"{users[0].pk},10.00,p1\n"
+            f"{users[1].pk},-1,p2\n"
+            f"{users[1].pk},4,p3\n"
+            f"{users[2].pk},0.125,p4\n"
+        )
+
+        call_command("post_credits", str(path), chunk_size=2)
+        # Posting again changes nothing
+        call_command("post_credits", str(path), rejects=str(tmp_path / "again"))
+
+        assert balances(users) == [10, 4, 0]
+        rejects = [
+            json.loads(line)
+            for line in (tmp_path / "payouts.csv.rejects.jsonl").open()
+        ]
+        assert [(reject["line"], reject["reasons"]) for reject in rejects] == [
+            (3, ["The amount must be positive"]),
+            (5, ["At most 2 decimal places"]),
+        ]
+        assert (tmp_path / "again").read_text().count("Already posted") == 2
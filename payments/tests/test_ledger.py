@@ -0,0 +1,140 @@
+import threading
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection
+from model_bakery import baker
+
+from payments.models import Transaction, Wallet
+from payments.tasks import reconcile_wallets
+from payments.utils import InsufficientFunds, credit_wallet, debit_wallet
+
+
+@pytest.fixture
+def user():
+    return baker.make(get_user_model())
+
+
+@pytest.mark.django_db
+class TestBalanceChanges:
+    def test_credit(self, user):
+        before = Wallet.objects.get(user=user).date_updated
+
+        entry = credit_wallet(user, Decimal("12.50"), description="Top up")
+
+        wallet = Wallet.objects.get(user=user)
+        assert wallet.balance == Decimal("12.50")
+        assert wallet.date_updated > before
+        assert (entry.wallet_id, entry.amount, entry.balance) == (
+            wallet.pk,
+            Decimal("12.50"),
+            Decimal("12.50"),
+        )
+
+    def test_debit(self, user):
+        credit_wallet(user, 30)
+
+        entry = debit_wallet(user, 10)
+
+        assert Wallet.objects.get(user=user).balance == 20
+        assert (entry.amount, entry.balance) == (-10, 20)
+
+    def test_insufficient_funds(self, user):
+        credit_wallet(user, 5)
+
+        with pytest.raises(InsufficientFunds):
+            debit_wallet(user, 10)
+
+        assert Wallet.objects.get(user=user).balance == 5
+        assert Transaction.objects.count() == 1
+
+    @pytest.mark.parametrize("amount", [0, -5])
+    def test_amount_must_be_positive(self, user, amount):
+        with pytest.raises(ValueError):
+            credit_wallet(user, amount)
+        with pytest.raises(ValueError):
+            debit_wallet(user, amount)
+
+    def test_no_wallet(self, user):
+        Wallet.objects.filter(user=user).delete()
+
+        with pytest.raises(Wallet.DoesNotExist):
+            credit_wallet(user, 5)
+
+    def test_reference_is_recorded_once(self, user):
+        credit_wallet(user, 5, reference="pi_123")
+
+        with pytest.raises(IntegrityError):
+            credit_wallet(user, 5, reference="pi_123")
+
+        assert Wallet.objects.get(user=user).balance == 5
+
+
+@pytest.mark.django_db
+class TestLedger:
+    def test_entries_cannot_change(self, user):
+        entry = credit_wallet(user, 5)
+
+        entry.amount = 500
+        with pytest.raises(TypeError):
+            entry.save()
+        with pytest.raises(TypeError):
+            entry.delete()
+        with pytest.raises(TypeError):
+            Transaction.objects.update(amount=500)
+        with pytest.raises(TypeError):
+            Transaction.objects.all().delete()
+
+    def test_reconcile_reports_drift(self, user):
+        credit_wallet(user, 5)
+        drifted = baker.make(get_user_model())
+        Wallet.objects.filter(user=drifted).update(balance=7)
+
+        assert reconcile_wallets() == (
+            "Created 0 missing wallets, 1 wallets disagree with their ledger"
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+class TestConcurrency:
+    def run(self, threads, work):
+        errors = []
+
+        def target(n):
+            try:
+                work(n)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=target, args=(n,)) for n in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return errors
+
+    def test_no_lost_updates(self, user):
+        def work(n):
+            for _ in range(25):
+                credit_wallet(user, 3)
+                debit_wallet(user, 1)
+
+        assert self.run(16, work) == []
+
+        assert Wallet.objects.get(user=user).balance == 16 * 25 * 2
+        assert Transaction.objects.count() == 16 * 25 * 2
+        assert reconcile_wallets() == "Created 0 missing wallets"
+
+    def test_no_overdraft(self, user):
+        credit_wallet(user, 100)
+
+        errors = self.run(30, lambda n: debit_wallet(user, 10))
+
+        assert len(errors) == 20
+        assert all(isinstance(error, InsufficientFunds) for error in errors)
+        assert Wallet.objects.get(user=user).balance == 0
+        balances = Transaction.objects.order_by("pk").values_list("balance", flat=True)
+        assert list(balances) == [100, 90, 80, 70, 60, 50, 40, 30, 20, 10, 0]
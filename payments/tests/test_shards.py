@@ -0,0 +1,158 @@
+import threading
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+from model_bakery import baker
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from payments.models import Transaction, Wallet, WalletShard
+from payments.shards import wallet_balance
+from payments.tasks import compact_wallet_shards, reconcile_wallets
+from payments.utils import (
+    InsufficientFunds,
+    credit_wallet,
+    debit_wallet,
+    post_credits,
+)
+
+
+@pytest.fixture
+def escrow():
+    user = baker.make(get_user_model())
+    call_command("shard_wallet", user.email, 4)
+    return user
+
+
+def total(user):
+    return wallet_balance(Wallet.objects.get(user=user))[0]
+
+
+def rows(user):
+    wallet = Wallet.objects.get(user=user)
+    shards = WalletShard.objects.filter(wallet=wallet).order_by("number")
+    return wallet.balance, [shard.balance for shard in shards]
+
+
+@pytest.mark.django_db
+class TestShardedWallet:
+    def test_credits_go_to_shards(self, escrow):
+        for _ in range(20):
+            entry = credit_wallet(escrow, 5)
+
+        base, shards = rows(escrow)
+        assert base == 0
+        assert sum(shards) == 100
+        assert total(escrow) == 100
+        assert entry.balance is None
+
+    def test_debit_from_the_wallets_row(self, escrow):
+        Wallet.objects.filter(user=escrow).update(balance=10)
+
+        debit_wallet(escrow, 4)
+
+        assert rows(escrow) == (6, [0, 0, 0, 0])
+
+    def test_debit_from_a_shard(self, escrow):
+        WalletShard.objects.filter(number=2).update(balance=10)
+
+        debit_wallet(escrow, 4)
+
+        assert rows(escrow) == (0, [0, 0, 6, 0])
+
+    def test_debit_spread_over_shards_folds_them(self, escrow):
+        WalletShard.objects.update(balance=3)
+
+        debit_wallet(escrow, 10)
+
+        assert rows(escrow) == (2, [0, 0, 0, 0])
+
+    def test_no_overdraft(self, escrow):
+        WalletShard.objects.update(balance=3)
+
+        with pytest.raises(InsufficientFunds):
+            debit_wallet(escrow, 13)
+
+        assert rows(escrow) == (0, [3, 3, 3, 3])
+        assert not Transaction.objects.exists()
+
+    def test_balance_is_cached(self, escrow, django_assert_num_queries):
+        credit_wallet(escrow, 5)
+        wallet = Wallet.objects.get(user=escrow)
+        wallet_balance(wallet)
+
+        credit_wallet(escrow, 5)
+        with django_assert_num_queries(0):
+            assert wallet_balance(wallet)[0] == 5
+
+    def test_bulk_credits(self, escrow):
+        credit_wallet(escrow, 5)
+
+        assert post_credits([(escrow.pk, 7, "bulk")]) == (1, [])
+
+        assert total(escrow) == 12
+        assert Transaction.objects.get(reference="bulk").balance is None
+
+    def test_compaction(self, escrow):
+        for _ in range(8):
+            credit_wallet(escrow, 5)
+
+        assert compact_wallet_shards() == "Compacted 1 sharded wallets"
+
+        assert rows(escrow) == (40, [0, 0, 0, 0])
+        assert reconcile_wallets() == "Created 0 missing wallets"
+
+    def test_back_to_a_plain_wallet(self, escrow):
+        credit_wallet(escrow, 5)
+
+        call_command("shard_wallet", escrow.email, 0)
+
+        assert rows(escrow)[0] == 5
+        assert credit_wallet(escrow, 1).balance == 6
+
+    def test_etag_follows_the_shards(self, escrow, settings):
+        settings.WALLET_SHARDS = {"BALANCE_TIMEOUT": 0}
+        client = APIClient()
+        client.force_authenticate(escrow)
+        etag = client.get(reverse("wallet"))["ETag"]
+
+        credit_wallet(escrow, 5)
+        response = client.get(reverse("wallet"), HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["balance"] == Decimal("5")
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_credits_and_debits(escrow):
+    errors = []
+
+    def work():
+        try:
+            for _ in range(20):
+                credit_wallet(escrow, 3)
+                try:
+                    debit_wallet(escrow, 5)
+                except InsufficientFunds:
+                    pass
+        except Exception as error:
+            errors.append(error)
+        finally:
+            connection.close()
+
+    workers = [threading.Thread(target=work) for _ in range(12)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert errors == []
+    base, shards = rows(escrow)
+    assert base >= 0 and min(shards) >= 0
+    ledger = sum(Transaction.objects.values_list("amount", flat=True))
+    assert base + sum(shards) == ledger
+    assert reconcile_wallets() == "Created 0 missing wallets"
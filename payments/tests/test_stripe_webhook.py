@@ -0,0 +1,268 @@
+import itertools
+import json
+import time
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from model_bakery import baker
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from payments import webhooks
+from payments.models import StripeEvent, Transaction, Wallet
+from payments.tasks import process_stripe_events
+from payments.webhooks import process_events, signature_header
+
+SECRET = "whsec_test"
+
+
+class StripeStandIn:
+    """Builds events, and signs and delivers them like Stripe does."""
+
+    def __init__(self, secret=SECRET):
+        self.secret = secret
+        self.client = APIClient()
+        self.ids = itertools.count(1)
+        self.clock = int(time.time()) - 1000
+
+    def event(self, type, obj, created=None):
+        self.clock += 1
+        return {
+            "id": f"evt_{next(self.ids)}",
+            "object": "event",
+            "type": type,
+            "created": self.clock if created is None else created,
+            "data": {"object": obj},
+        }
+
+    def payment(self, customer, amount, id, currency="ngn"):
+        return self.event(
+            "payment_intent.succeeded",
+            {
+                "id": id,
+                "object": "payment_intent",
+                "customer": customer,
+                "amount_received": amount,
+                "currency": currency,
+            },
+        )
+
+    def refund(self, customer, charge, amount_refunded, currency="ngn"):
+        return self.event(
+            "charge.refunded",
+            {
+                "id": charge,
+                "object": "charge",
+                "customer": customer,
+                "amount_refunded": amount_refunded,
+                "currency": currency,
+            },
+        )
+
+    def deliver(self, event, secret=None, timestamp=None):
+        payload = json.dumps(event).encode()
+        header = signature_header(payload, secret or self.secret, timestamp)
+        return self.client.post(
+            reverse("stripe-webhook"),
+            payload,
+            content_type="application/json",
+            HTTP_STRIPE_SIGNATURE=header,
+        )
+
+
+@pytest.fixture
+def stripe(settings):
+    settings.STRIPE_WEBHOOK_SECRET = SECRET
+    return StripeStandIn()
+
+
+@pytest.fixture
+def customers():
+    return [
+        baker.make(get_user_model(), cus_id=f"cus_{number}") for number in range(2)
+    ]
+
+
+def balance(user):
+    return Wallet.objects.get(user=user).balance
+
+
+@pytest.mark.django_db
+class TestWebhook:
+    def test_stores_the_event(self, stripe, django_assert_num_queries):
+        event = stripe.payment("cus_1", 1000, "pi_1")
+
+        # Nothing but the INSERT
+        with django_assert_num_queries(1):
+            response = stripe.deliver(event)
+
+        assert response.status_code == status.HTTP_200_OK
+        stored = StripeEvent.objects.get()
+        assert (stored.event_id, stored.type, stored.customer) == (
+            event["id"],
+            "payment_intent.succeeded",
+            "cus_1",
+        )
+        assert json.loads(stored.payload) == event
+        assert stored.status == StripeEvent.Status.PENDING
+
+    def test_redelivery_is_dropped(self, stripe):
+        event = stripe.payment("cus_1", 1000, "pi_1")
+
+        for _ in range(3):
+            assert stripe.deliver(event).status_code == status.HTTP_200_OK
+
+        assert StripeEvent.objects.count() == 1
+
+    def test_refuses_bad_signatures(self, stripe):
+        event = stripe.payment("cus_1", 1000, "pi_1")
+
+        wrong_secret = stripe.deliver(event, secret="whsec_other")
+        too_old = stripe.deliver(event, timestamp=int(time.time()) - 600)
+        unsigned = stripe.client.post(
+            reverse("stripe-webhook"), event, format="json"
+        )
+
+        for response in (wrong_secret, too_old, unsigned):
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not StripeEvent.objects.exists()
+
+    def test_refuses_everything_without_a_secret(self, stripe, settings):
+        settings.STRIPE_WEBHOOK_SECRET = ""
+
+        response = stripe.deliver(stripe.payment("cus_1", 1000, "pi_1"))
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_accepts_any_of_several_signatures(self, stripe):
+        payload = json.dumps(stripe.payment("cus_1", 1000, "pi_1")).encode()
+        header = signature_header(payload, SECRET)
+        timestamp = header.split(",")[0]
+        # During a secret roll Stripe signs with both secrets
+        header = f"{timestamp},v1={'0' * 64},{header.split(',')[1]}"
+
+        response = stripe.client.post(
+            reverse("stripe-webhook"),
+            payload,
+            content_type="application/json",
+            HTTP_STRIPE_SIGNATURE=header,
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+class TestProcessEvents:
+    def test_applies_payments_and_refunds(self, stripe, customers):
+        stripe.deliver(stripe.payment("cus_0", 5000, "pi_1"))
+        stripe.deliver(stripe.refund("cus_0", "ch_1", 1000))
+        # Refunded amounts are running totals on the charge
+        stripe.deliver(stripe.refund("cus_0", "ch_1", 1500))
+
+        assert process_stripe_events() == "Processed 3 Stripe events"
+
+        assert balance(customers[0]) == 35
+        assert Transaction.objects.filter(reference="stripe:pi_1").exists()
+        assert set(StripeEvent.objects.values_list("status", flat=True)) == {
+            StripeEvent.Status.PROCESSED
+        }
+
+    def test_applying_twice_changes_nothing(self, stripe, customers):
+        stripe.deliver(stripe.payment("cus_0", 5000, "pi_1"))
+        stripe.deliver(stripe.refund("cus_0", "ch_1", 1000))
+        process_events()
+
+        # As if the batch was applied but not marked processed
+        StripeEvent.objects.update(status=StripeEvent.Status.PENDING)
+        assert process_events() == 2
+
+        assert balance(customers[0]) == 40
+        assert Transaction.objects.count() == 2
+
+    def test_customers_events_in_order(self, stripe, customers):
+        payment = stripe.payment("cus_0", 5000, "pi_1")
+        refund = stripe.refund("cus_0", "ch_1", 4000)
+        # Delivered out of order, applied in the order they were created
+        stripe.deliver(refund)
+        stripe.deliver(payment)
+
+        process_events(batch_size=1)
+
+        assert balance(customers[0]) == 10
+
+    def test_failure_holds_back_the_customer(self, stripe, customers, monkeypatch):
+        stripe.deliver(stripe.payment("cus_0", 1000, "pi_1"))
+        stripe.deliver(stripe.payment("cus_1", 1000, "pi_2"))
+        stripe.deliver(stripe.payment("cus_0", 2000, "pi_3"))
+        credit_payment = webhooks.credit_payment
+
+        def flaky(event, user):
+            if event["data"]["object"]["id"] == "pi_1":
+                raise ConnectionError
+            credit_payment(event, user)
+
+        monkeypatch.setitem(webhooks.HANDLERS, "payment_intent.succeeded", flaky)
+
+        assert process_events(batch_size=2) == 1
+
+        assert [balance(user) for user in customers] == [0, 10]
+        first = StripeEvent.objects.get(event_id="evt_1")
+        assert (first.status, first.attempts) == (StripeEvent.Status.PENDING, 1)
+        assert "ConnectionError" in first.last_error
+
+        monkeypatch.setitem(
+            webhooks.HANDLERS, "payment_intent.succeeded", credit_payment
+        )
+        assert process_events() == 2
+        assert balance(customers[0]) == 30
+
+    def test_gives_up_after_max_attempts(self, stripe, customers, monkeypatch):
+        stripe.deliver(stripe.payment("cus_0", 1000, "pi_1"))
+        monkeypatch.setitem(
+            webhooks.HANDLERS,
+            "payment_intent.succeeded",
+            lambda event, user: 1 / 0,
+        )
+
+        for _ in range(webhooks.get_option("MAX_ATTEMPTS")):
+            process_events()
+
+        assert StripeEvent.objects.get().status == StripeEvent.Status.FAILED
+
+    def test_events_that_cannot_apply(self, stripe, customers):
+        stripe.deliver(stripe.refund("cus_0", "ch_1", 1000))
+        stripe.deliver(stripe.event("customer.updated", {"id": "cus_0"}))
+        stripe.deliver(stripe.payment("cus_1", 1000, "pi_1", currency="jpy"))
+        stripe.deliver(stripe.payment("cus_1", 1000, "pi_2", currency="USD"))
+
+        assert process_events() == 4
+
+        statuses = dict(StripeEvent.objects.values_list("event_id", "status"))
+        assert statuses == {
+            # Nothing in the wallet to refund
+            "evt_1": StripeEvent.Status.FAILED,
+            "evt_2": StripeEvent.Status.IGNORED,
+            # Not in the wallets' currency
+            "evt_3": StripeEvent.Status.FAILED,
+            "evt_4": StripeEvent.Status.FAILED,
+        }
+        assert [balance(user) for user in customers] == [0, 0]
+
+    def test_unknown_customer_is_retried(self, stripe, customers):
+        stripe.deliver(stripe.payment("cus_new", 1000, "pi_1"))
+        stripe.deliver(stripe.payment("cus_new", 2000, "pi_2"))
+
+        assert process_events() == 0
+
+        first, second = StripeEvent.objects.order_by("created")
+        assert (first.status, first.attempts) == (StripeEvent.Status.PENDING, 1)
+        assert "cus_new" in first.last_error
+        # Held back behind the first
+        assert second.attempts == 0
+
+        # Their cus_id is saved after Stripe sent the payments
+        customers[0].cus_id = "cus_new"
+        customers[0].save(update_fields=["cus_id"])
+        assert process_events() == 2
+        assert balance(customers[0]) == 30
@@ -0,0 +1,44 @@
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from model_bakery import baker
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from payments.models import Wallet
+
+
+@pytest.mark.django_db
+class TestWalletETag:
+    url = reverse("wallet")
+
+    @pytest.fixture
+    def client(self):
+        self.user = baker.make(get_user_model())
+        client = APIClient()
+        client.force_authenticate(self.user)
+        return client
+
+    def test_unchanged_is_304(self, client, django_assert_num_queries):
+        response = client.get(self.url)
+        etag = response["ETag"]
+
+        with django_assert_num_queries(1):
+            response = client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response["ETag"] == etag
+
+    def test_balance_change_is_200(self, client):
+        etag = client.get(self.url)["ETag"]
+        wallet = Wallet.objects.get(user=self.user)
+        wallet.balance = 50
+        wallet.save()
+
+        response = client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["balance"] == Decimal("50")
+        assert response["ETag"] != etag
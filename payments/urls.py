@@ -3,4 +3,5 @@ from .import views
 
 urlpatterns = [
     path("wallet", views.WalletView.as_view(), name="wallet"),
+    path("stripe/webhook", views.StripeWebhookView.as_view(), name="stripe-webhook"),
 ]
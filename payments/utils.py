@@ -1,17 +1,199 @@
-from django.db import transaction
+"""
+Balance changes. Each one is a single conditional UPDATE of the wallet, so
+concurrent changes neither lose one another nor wait on a lock taken
+before the write, plus the ledger entry recording it, in one transaction.
 
-from .models import Wallet
+Sharded wallets are changed on one of their sub-balances instead, see
+payments/shards.py.
 
+Credits in bulk, payouts for instance, take a transaction per chunk of
+entries: one UPDATE adds up every wallet's credits and one INSERT writes
+the entries.
+"""
+import uuid
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import DataError, IntegrityError, connection, transaction
+from django.db.models import DecimalField, F
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from . import shards
+from .models import Transaction, Wallet
+
+
+class InsufficientFunds(Exception):
+    pass
 
-def credit_wallet(user, amount):
-    wallet = Wallet.objects.select_for_update().get(user=user)
-    with transaction.atomic():
-        wallet.balance += amount
-        wallet.save()
 
+def credit_wallet(user, amount, reference=None, description=""):
+    """Add ``amount`` to ``user``'s wallet, return the ledger entry."""
+    if amount <= 0:
+        raise ValueError("The amount must be positive")
+    return record(user, amount, reference, description)
 
-def debit_wallet(user, amount):
-    wallet = Wallet.objects.select_for_update().get(user=user)
+
+def debit_wallet(user, amount, reference=None, description=""):
+    """
+    Take ``amount`` from ``user``'s wallet, return the ledger entry. Raise
+    InsufficientFunds, and change nothing, if the balance is short of it.
+    """
+    if amount <= 0:
+        raise ValueError("The amount must be positive")
+    return record(user, -amount, reference, description)
+
+
+def record(user, amount, reference, description):
+    wallets = Wallet.objects.filter(user=user)
     with transaction.atomic():
-        wallet.balance -= amount
-        wallet.save()
+        changed = wallets.filter(shards=0)
+        if amount < 0:
+            changed = changed.filter(balance__gte=-amount)
+        # date_updated is the wallet's ETag, update() skips auto_now
+        if changed.update(balance=F("balance") + amount, date_updated=timezone.now()):
+            # The row stays locked by the update until the commit
+            pk, balance = wallets.values_list("pk", "balance").get()
+        else:
+            pk, count = wallets.values_list("pk", "shards").get()
+            if not count:
+                raise InsufficientFunds
+            change = shards.credit if amount > 0 else shards.debit
+            if not change(pk, count, abs(amount)):
+                raise InsufficientFunds
+            # Reading a sharded wallet's total would wait on every shard
+            balance = None
+
+        return Transaction.objects.create(
+            wallet_id=pk,
+            amount=amount,
+            balance=balance,
+            reference=reference,
+            description=description,
+        )
+
+
+def post_credits(entries, chunk_size=1000, description=""):
+    """
+    Credit wallets from ``(user_id, amount, reference)`` entries. Return
+    how many were posted, and the ``(position, reason)`` of the others.
+    """
+    posted, failures = 0, []
+    entries = iter(entries)
+    position = 0
+    while chunk := list(islice(entries, chunk_size)):
+        chunk_posted, chunk_failures = post_chunk(chunk, description)
+        posted += chunk_posted
+        failures += [(position + index, reason) for index, reason in chunk_failures]
+        position += len(chunk)
+    return posted, failures
+
+
+def post_chunk(chunk, description=""):
+    """
+    Post a chunk of ``(user_id, amount, reference)`` credits in one
+    transaction. Return how many were posted, and the ``(index, reason)``
+    of the others.
+    """
+    failures, valid, references = [], [], set()
+    for index, (user_id, amount, reference) in enumerate(chunk):
+        try:
+            user_id = str(uuid.UUID(str(user_id)))
+        except ValueError:
+            failures.append((index, "Invalid user id"))
+            continue
+        try:
+            amount = Decimal(amount)
+        except (InvalidOperation, TypeError):
+            failures.append((index, "Invalid amount"))
+            continue
+        if not amount.is_finite() or amount <= 0:
+            failures.append((index, "The amount must be positive"))
+        elif amount.normalize().as_tuple().exponent < -2:
+            # The ledger would round it, the balance update would not
+            failures.append((index, "At most 2 decimal places"))
+        elif not reference:
+            failures.append((index, "A reference is required"))
+        elif reference in references:
+            failures.append((index, "Duplicate reference"))
+        else:
+            references.add(reference)
+            valid.append((index, user_id, amount, str(reference)))
+
+    wallets = {
+        str(user_id): pk
+        for user_id, pk in Wallet.objects.filter(
+            user_id__in={user_id for _, user_id, _, _ in valid}
+        ).values_list("user_id", "pk")
+    }
+    posted = set(
+        Transaction.objects.filter(reference__in=references).values_list(
+            "reference", flat=True
+        )
+    )
+    entries = []
+    for index, user_id, amount, reference in valid:
+        if user_id not in wallets:
+            failures.append((index, "No wallet for this user"))
+        elif reference in posted:
+            failures.append((index, "Already posted"))
+        else:
+            entries.append((index, user_id, amount, reference))
+
+    try:
+        insert_credits(
+            [
+                Transaction(
+                    wallet_id=wallets[user_id],
+                    amount=amount,
+                    reference=reference,
+                    description=description,
+                )
+                for _, user_id, amount, reference in entries
+            ]
+        )
+    except (IntegrityError, DataError):
+        # A reference posted meanwhile, or a balance out of range, fails the
+        # whole chunk: post it one entry at a time to find out which
+        for index, user_id, amount, reference in entries:
+            try:
+                credit_wallet(user_id, amount, reference, description)
+            except Wallet.DoesNotExist:
+                failures.append((index, "No wallet for this user"))
+            except (IntegrityError, DataError) as error:
+                failures.append((index, str(error)))
+
+    return len(chunk) - len(failures), sorted(failures)
+
+
+@transaction.atomic
+def insert_credits(entries):
+    deltas = {}
+    for entry in entries:
+        deltas[entry.wallet_id] = deltas.get(entry.wallet_id, 0) + entry.amount
+    if not deltas:
+        return
+
+    # A CASE of the deltas by wallet, written out: Case(When()) costs more to
+    # compile than the query takes to run
+    column = connection.ops.quote_name(Wallet._meta.pk.column)
+    delta = RawSQL(
+        f"CASE {column} {' '.join(['WHEN %s THEN %s'] * len(deltas))} END",
+        [value for pk, delta in deltas.items() for value in (pk, delta)],
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    )
+    wallets = Wallet.objects.filter(pk__in=deltas)
+    wallets.update(balance=F("balance") + delta, date_updated=timezone.now())
+
+    # The rows stay locked by the update until the commit. Each entry's
+    # balance is the one after it, counting back from the wallet's. Sharded
+    # wallets are credited on their own row, their total is unknown
+    balances = {
+        pk: None if count else balance
+        for pk, balance, count in wallets.values_list("pk", "balance", "shards")
+    }
+    for entry in reversed(entries):
+        entry.balance = balances[entry.wallet_id]
+        if entry.balance is not None:
+            balances[entry.wallet_id] -= entry.amount
+    Transaction.objects.bulk_create(entries)
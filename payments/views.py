@@ -1,9 +1,14 @@
 from rest_framework import status
+from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from core.etags import etag_matches, make_etag, not_modified, set_etag
+
 from .models import Wallet
 from .serializers import WalletSerializer
+from .shards import wallet_balance
+from .webhooks import InvalidEvent, receive
 
 
 class WalletView(APIView):
@@ -18,8 +23,35 @@ class WalletView(APIView):
 
         Returns:
             Response: The serialized wallet balance in the HTTP response with a status code of 200 (OK).
+            A 304 without a body if If-None-Match has the current ETag.
         """
         wallet = Wallet.objects.get(user=request.user)
+        # Every balance change moves date_updated, a shard's for sharded wallets
+        wallet.balance, date_updated = wallet_balance(wallet)
+        etag = make_etag(wallet.pk, date_updated.timestamp())
+
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match and etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
         serializer = WalletSerializer(wallet)
 
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return set_etag(Response(serializer.data, status=status.HTTP_200_OK), etag)
+
+
+class StripeWebhookView(APIView):
+    """
+    Stripe's webhook. Only checks the signature and stores the event, it is
+    applied by the process_stripe_events task.
+    """
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request, *args, **kwargs):
+        try:
+            receive(request.body, request.headers.get("Stripe-Signature", ""))
+        except InvalidEvent as error:
+            return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({"received": True}, status=status.HTTP_200_OK)
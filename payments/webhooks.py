@@ -0,0 +1,254 @@
+"""
+Stripe webhook events.
+
+Stripe retries a delivery that is not acknowledged quickly, so receiving an
+event only checks its signature and inserts it, duplicates ignored by event
+id. ``process_events``, scheduled every minute, applies the stored events to
+wallets later, in batches, each customer's events in the order Stripe
+created them. A customer whose event fails is skipped until the next run,
+so their later events never go first.
+
+Every balance change is recorded under a ledger reference made from Stripe
+ids, so an event applied twice, after a crash between applying a batch and
+marking it processed for instance, changes nothing the second time.
+
+Signatures are checked as Stripe documents it: ``Stripe-Signature`` holds a
+timestamp ``t`` and one or more ``v1`` HMAC-SHA256 signatures of
+``"<t>.<body>"`` keyed with the endpoint's signing secret.
+"""
+import hashlib
+import hmac
+import json
+import logging
+import time
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from .models import StripeEvent, Transaction
+from .utils import InsufficientFunds, credit_wallet, debit_wallet
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    # Seconds a signature stays valid, against replayed deliveries
+    "TOLERANCE": 300,
+    "BATCH_SIZE": 500,
+    "MAX_ATTEMPTS": 5,
+    # Wallets hold this currency only, Stripe's lowercase ISO code
+    "CURRENCY": "ngn",
+}
+
+
+def get_option(name):
+    return {**DEFAULTS, **getattr(settings, "STRIPE_WEBHOOK", {})}[name]
+
+
+class InvalidEvent(Exception):
+    pass
+
+
+class EventFailed(Exception):
+    """The event cannot be applied, trying again will not help."""
+
+
+class UnknownCustomer(Exception):
+    """No user has the event's customer yet, their cus_id may not be saved."""
+
+
+def sign(payload, secret, timestamp):
+    return hmac.new(
+        secret.encode(), f"{timestamp}.".encode() + payload, hashlib.sha256
+    ).hexdigest()
+
+
+def signature_header(payload, secret, timestamp=None):
+    """A ``Stripe-Signature`` header for ``payload``, as Stripe would send it."""
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    return f"t={timestamp},v1={sign(payload, secret, timestamp)}"
+
+
+def verify_signature(payload, header, secret, tolerance=None):
+    """Raise InvalidEvent unless ``header`` signs ``payload`` with ``secret``."""
+    if not secret:
+        raise InvalidEvent("No signing secret configured")
+
+    items = [item.split("=", 1) for item in header.split(",") if "=" in item]
+    timestamps = [value for name, value in items if name.strip() == "t"]
+    signatures = [value for name, value in items if name.strip() == "v1"]
+    if not timestamps or not signatures:
+        raise InvalidEvent("No timestamp or signature")
+    try:
+        timestamp = int(timestamps[0])
+    except ValueError:
+        raise InvalidEvent("Invalid timestamp") from None
+
+    expected = sign(payload, secret, timestamp)
+    if not any(hmac.compare_digest(expected, value) for value in signatures):
+        raise InvalidEvent("Invalid signature")
+
+    tolerance = get_option("TOLERANCE") if tolerance is None else tolerance
+    if tolerance and timestamp < time.time() - tolerance:
+        raise InvalidEvent("Timestamp outside the tolerance")
+
+
+def event_customer(event):
+    obj = event["data"]["object"]
+    if obj.get("object") == "customer":
+        return obj["id"]
+    customer = obj.get("customer")
+    # Expanded to the customer object in some API versions
+    return customer["id"] if isinstance(customer, dict) else customer
+
+
+def receive(payload, header):
+    """Check and store a webhook request's body, return the stored event."""
+    verify_signature(payload, header, settings.STRIPE_WEBHOOK_SECRET)
+    try:
+        event = json.loads(payload)
+        stored = StripeEvent(
+            event_id=event["id"],
+            type=event["type"],
+            customer=event_customer(event),
+            created=datetime.fromtimestamp(event["created"], tz=dt_timezone.utc),
+            payload=payload.decode(),
+        )
+    except (ValueError, TypeError, KeyError, AttributeError):
+        raise InvalidEvent("Malformed event") from None
+
+    # A single INSERT, a redelivered event is dropped by the unique event id
+    StripeEvent.objects.bulk_create([stored], ignore_conflicts=True)
+    return stored
+
+
+def to_amount(minor_units, currency):
+    """
+    Stripe amounts are in the currency's minor unit, the wallets' currency
+    has two decimals. Another currency, zero-decimal or not, is refused.
+    """
+    if currency.lower() != get_option("CURRENCY"):
+        raise EventFailed(f"Wallets are in {get_option('CURRENCY')}, not {currency}")
+    return Decimal(minor_units).scaleb(-2)
+
+
+def credit_payment(event, user):
+    """payment_intent.succeeded: the user topped up their wallet."""
+    payment = event["data"]["object"]
+    credit_wallet(
+        user,
+        to_amount(payment["amount_received"], payment["currency"]),
+        reference=f"stripe:{payment['id']}",
+        description="Stripe payment",
+    )
+
+
+def debit_refund(event, user):
+    """
+    charge.refunded: take back the part of the refunded amount, a running
+    total on the charge, not debited yet.
+    """
+    charge = event["data"]["object"]
+    prefix = f"stripe-refund:{charge['id']}:"
+    debited = -(
+        Transaction.objects.filter(reference__startswith=prefix).aggregate(
+            total=Sum("amount")
+        )["total"]
+        or 0
+    )
+    amount = to_amount(charge["amount_refunded"], charge["currency"]) - debited
+    if amount <= 0:
+        return
+    try:
+        debit_wallet(
+            user, amount, reference=prefix + event["id"], description="Stripe refund"
+        )
+    except InsufficientFunds:
+        raise EventFailed("The wallet does not cover the refund") from None
+
+
+HANDLERS = {
+    "payment_intent.succeeded": credit_payment,
+    "charge.refunded": debit_refund,
+}
+
+
+def apply(event, users):
+    """Apply ``event``, and set the status it ends up in."""
+    handler = HANDLERS.get(event.type)
+    if handler is None:
+        event.status = StripeEvent.Status.IGNORED
+        return
+
+    event.attempts += 1
+    if event.customer not in users:
+        # Retried like any other error, the payment may beat the cus_id
+        raise UnknownCustomer(f"No user for customer {event.customer}")
+    try:
+        handler(json.loads(event.payload), users[event.customer])
+    except IntegrityError:
+        # Its ledger reference is taken, applied already
+        pass
+    event.status = StripeEvent.Status.PROCESSED
+
+
+def process_batch(events, blocked):
+    """
+    Apply ``events``, oldest first, skipping the customers in ``blocked``
+    and adding those whose event fails. Return how many are done with.
+    """
+    customers = {event.customer for event in events if event.customer}
+    users = {
+        user.cus_id: user
+        for user in get_user_model().objects.filter(cus_id__in=customers)
+    }
+    now = timezone.now()
+
+    for event in events:
+        if event.customer in blocked:
+            continue
+        try:
+            apply(event, users)
+        except EventFailed as error:
+            event.status = StripeEvent.Status.FAILED
+            event.last_error = str(error)
+        except Exception as error:
+            if not isinstance(error, UnknownCustomer):
+                logger.exception("Stripe event %s failed", event.event_id)
+            event.last_error = repr(error)
+            if event.attempts >= get_option("MAX_ATTEMPTS"):
+                event.status = StripeEvent.Status.FAILED
+            elif event.customer:
+                # Until the next run, their later events would go first
+                blocked.add(event.customer)
+        if event.status != StripeEvent.Status.PENDING:
+            event.date_processed = now
+
+    StripeEvent.objects.bulk_update(
+        events, ["status", "attempts", "last_error", "date_processed"]
+    )
+    return sum(event.status != StripeEvent.Status.PENDING for event in events)
+
+
+def process_events(batch_size=None):
+    """Apply the pending events, a batch at a time. Return how many are done."""
+    batch_size = batch_size or get_option("BATCH_SIZE")
+    pending = StripeEvent.objects.filter(
+        status=StripeEvent.Status.PENDING
+    ).order_by("created", "id")
+    blocked = set()
+    count = 0
+
+    after = Q()
+    while True:
+        events = list(pending.filter(after)[:batch_size])
+        if not events:
+            return count
+        count += process_batch(events, blocked)
+
+        last = events[-1]
+        after = Q(created__gt=last.created) | Q(created=last.created, id__gt=last.id)
@@ -0,0 +1,310 @@
+"""
+An inverted index over assistant profiles.
+
+Every assistant has a Posting per distinct term of its services,
+qualifications, bio and headline, rewritten after each save that touches
+them. A keyword search only reads the postings of the query's terms and
+ranks assistants with BM25. A service filter keeps the assistants with a
+``service:<name>`` posting. Neither scans the assistant table.
+
+A posting stores its term's BM25 weight before the inverse document
+frequency, its impact, computed against the average length at indexing
+time. The postings of a term are indexed by impact, so a single word is
+answered from the top of the index, and several words add up impacts
+without reading the table. ``manage.py rebuild_search_index`` recomputes
+impacts, should the average length drift.
+
+Pages are keyset paginated: the cursor holds where the last page stopped,
+so any page is read from the index like the first one. It also holds the
+inverse document frequencies of the first page, and scores are rounded to
+SCORE_DIGITS, so reindexing between pages neither skips nor repeats anyone.
+"""
+import base64
+import binascii
+import json
+import math
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Case, Count, F, FloatField, Q, Sum, Value, When
+from django.db.models.functions import Round
+
+from core.models import Assistant
+
+from .models import IndexedAssistant, Posting
+
+DEFAULTS = {
+    # BM25 term frequency saturation and length normalisation
+    "K1": 1.2,
+    "B": 0.75,
+    "PAGE_SIZE": 20,
+    "MAX_PAGE_SIZE": 100,
+    # Kilometres, for nearby assistants
+    "NEARBY_RADIUS": 10,
+    "MAX_NEARBY_RADIUS": 100,
+    # Seconds the assistant count, average length and term counts are cached
+    "STATS_TIMEOUT": 60,
+    # How much each feature adds to a ranked assistant's score, at most
+    "RANKING_WEIGHTS": {
+        "services": 0.5,
+        "experience": 0.2,
+        "verified": 0.1,
+        "distance": 0.2,
+    },
+    # Years of experience worth the full weight
+    "EXPERIENCE_CAP": 10,
+    # Kilometres at which distance is worth half its weight
+    "DISTANCE_SCALE": 5,
+    # Seconds between full reloads of the ranking features, and changes an
+    # engine catches up with before it reloads them all instead
+    "RANKING_MAX_AGE": 3600,
+    "RANKING_MAX_CHANGES": 10_000,
+    # Seconds between full reloads when the cache, and so the change feed,
+    # is the process's own
+    "RANKING_LOCAL_MAX_AGE": 30,
+}
+
+TEXT_FIELDS = ["qualifications", "bio", "professional_headline"]
+INDEXED_FIELDS = {"services", *TEXT_FIELDS}
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from has have i in is it my of on or our "
+    "that the to was we were will with you".split()
+)
+WORD = re.compile(r"\w+")
+MAX_TERM_LENGTH = Posting._meta.get_field("term").max_length
+STATS_KEY = "search-stats"
+# Decimal digits summed scores are ranked on, equal sums compare equal
+SCORE_DIGITS = 6
+
+
+def get_option(name):
+    return {**DEFAULTS, **getattr(settings, "SEARCH", {})}[name]
+
+
+def tokenize(text):
+    return [
+        word[:MAX_TERM_LENGTH]
+        for word in WORD.findall(text.lower())
+        if word not in STOP_WORDS
+    ]
+
+
+def service_term(service):
+    return f"service:{' '.join(str(service).lower().split())}"[:MAX_TERM_LENGTH]
+
+
+def terms_of(assistant):
+    """Return the word frequencies of ``assistant`` and its services."""
+    services = assistant.services if isinstance(assistant.services, list) else []
+    words = [word for service in services for word in tokenize(str(service))]
+    for field in TEXT_FIELDS:
+        words += tokenize(getattr(assistant, field) or "")
+    return Counter(words), services
+
+
+def postings_of(assistant, average_length):
+    frequencies, services = terms_of(assistant)
+    length = sum(frequencies.values())
+    k1, b = get_option("K1"), get_option("B")
+    norm = k1 * (1 - b + b * length / average_length)
+
+    postings = [
+        Posting(
+            term=term,
+            assistant_id=assistant.pk,
+            impact=frequency * (k1 + 1) / (frequency + norm),
+        )
+        for term, frequency in frequencies.items()
+    ]
+    postings += [
+        Posting(term=term, assistant_id=assistant.pk, impact=0)
+        for term in set(map(service_term, services))
+    ]
+    return postings, IndexedAssistant(assistant_id=assistant.pk, length=length)
+
+
+def index_assistant(assistant):
+    postings, indexed = postings_of(assistant, get_stats()[1])
+    with transaction.atomic():
+        Posting.objects.filter(assistant_id=assistant.pk).delete()
+        Posting.objects.bulk_create(postings)
+        IndexedAssistant.objects.update_or_create(
+            assistant_id=assistant.pk, defaults={"length": indexed.length}
+        )
+
+
+def rebuild_index(batch_size=1000):
+    """Index every assistant from scratch, return how many there are."""
+    assistants = Assistant.objects.only("pk", *INDEXED_FIELDS).order_by("pk")
+
+    # A first pass for the average length the impacts are relative to
+    count = length = 0
+    for assistant in assistants.iterator(chunk_size=batch_size):
+        count += 1
+        length += sum(terms_of(assistant)[0].values())
+    average_length = length / count if length else 1
+
+    total, last_pk = 0, 0
+    while batch := list(assistants.filter(pk__gt=last_pk)[:batch_size]):
+        index_batch(batch, average_length)
+        total += len(batch)
+        last_pk = batch[-1].pk
+
+    cache.delete(STATS_KEY)
+    return total
+
+
+def index_assistants(assistants):
+    """Index a batch of ``assistants`` at once, a bulk import's for instance."""
+    index_batch(assistants, get_stats()[1])
+    cache.delete(STATS_KEY)
+
+
+def index_batch(assistants, average_length):
+    postings, indexed = [], []
+    for assistant in assistants:
+        assistant_postings, assistant_indexed = postings_of(assistant, average_length)
+        postings += assistant_postings
+        indexed.append(assistant_indexed)
+
+    ids = [assistant.pk for assistant in assistants]
+    with transaction.atomic():
+        Posting.objects.filter(assistant_id__in=ids).delete()
+        IndexedAssistant.objects.filter(assistant_id__in=ids).delete()
+        Posting.objects.bulk_create(postings)
+        IndexedAssistant.objects.bulk_create(indexed)
+
+
+def get_stats():
+    """The number of indexed assistants and their average length."""
+    stats = cache.get(STATS_KEY)
+    if stats is None:
+        stats = IndexedAssistant.objects.aggregate(
+            count=Count("pk"), average_length=Avg("length")
+        )
+        cache.set(STATS_KEY, stats, get_option("STATS_TIMEOUT"))
+    return stats["count"], stats["average_length"] or 1
+
+
+def get_weights(terms):
+    """The inverse document frequency of those of ``terms`` that are indexed."""
+    keys = {f"search-term:{term}": term for term in terms}
+    counts = {keys[key]: count for key, count in cache.get_many(keys).items()}
+
+    missing = [term for term in terms if term not in counts]
+    if missing:
+        found = dict(
+            Posting.objects.filter(term__in=missing)
+            .values("term")
+            .annotate(count=Count("pk"))
+            .values_list("term", "count")
+        )
+        found = {term: found.get(term, 0) for term in missing}
+        cache.set_many(
+            {f"search-term:{term}": count for term, count in found.items()},
+            get_option("STATS_TIMEOUT"),
+        )
+        counts.update(found)
+
+    # The cached total may be behind the counts, the weights must stay positive
+    total = max([get_stats()[0], *counts.values()])
+    return {
+        term: math.log(1 + (total - count + 0.5) / (count + 0.5))
+        for term, count in counts.items()
+        if count
+    }
+
+
+def encode_cursor(key, pk, weights=None):
+    cursor = json.dumps([key, pk, weights])
+    return base64.urlsafe_b64encode(cursor.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return the ``(key, pk, weights)`` a page stopped at."""
+    try:
+        key, pk, weights = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(pk, int) or not isinstance(key, (int, float, type(None))):
+        raise ValueError("Invalid cursor")
+    if weights is not None and not (
+        isinstance(weights, dict)
+        and all(isinstance(weight, (int, float)) for weight in weights.values())
+    ):
+        raise ValueError("Invalid cursor")
+    return key, pk, weights
+
+
+def search(query="", services=(), cursor=None, limit=None):
+    """
+    Return a page of ``(assistant_id, score)`` and the cursor of the next
+    page, None on the last one.
+
+    Assistants must offer all of ``services``. With a ``query`` they must
+    match one of its words and come best first, otherwise newest first
+    with a score of None.
+    """
+    limit = limit or get_option("PAGE_SIZE")
+    terms = list(dict.fromkeys(tokenize(query)))
+    after = decode_cursor(cursor) if cursor else None
+    if after and (after[0] is None) == bool(terms):
+        raise ValueError("Invalid cursor")
+
+    postings = Posting.objects.all()
+    for service in dict.fromkeys(map(service_term, services)):
+        offering = Posting.objects.filter(term=service).values("assistant_id")
+        postings = postings.filter(assistant_id__in=offering)
+
+    weights = None
+    if terms:
+        weights = after[2] if after else get_weights(terms)
+        if weights is None or not set(weights) <= set(terms):
+            raise ValueError("Invalid cursor")
+        rows = ranked(postings, weights, after, limit + 1)
+    elif services:
+        rows = postings.filter(term=service_term(services[0]))
+        if after:
+            rows = rows.filter(assistant_id__lt=after[1])
+        ids = rows.order_by("-assistant_id").values_list("assistant_id", flat=True)
+        rows = [(pk, None, None) for pk in ids[: limit + 1]]
+    else:
+        raise ValueError("Give a query or a service")
+
+    page = [(pk, score) for pk, score, _ in rows[:limit]]
+    if len(rows) > limit:
+        pk, _, key = rows[limit - 1]
+        return page, encode_cursor(key, pk, weights)
+    return page, None
+
+
+def ranked(postings, weights, after, limit):
+    """Rows of ``(assistant_id, score, sort key)``, best first."""
+    if not weights:
+        return []
+
+    if len(weights) == 1:
+        # Read in impact order from the index, the score is proportional
+        [(term, scale)] = weights.items()
+        rows = postings.filter(term=term).annotate(key=F("impact"))
+    else:
+        idf = Case(
+            *(When(term=term, then=Value(weight)) for term, weight in weights.items()),
+            output_field=FloatField(),
+        )
+        rows = (
+            postings.filter(term__in=weights)
+            .values("assistant_id")
+            .annotate(key=Round(Sum(idf * F("impact")), SCORE_DIGITS))
+        )
+        scale = 1
+
+    if after:
+        key, pk, _ = after
+        rows = rows.filter(Q(key__lt=key) | Q(key=key, assistant_id__lt=pk))
+
+    rows = rows.order_by("-key", "-assistant_id").values_list("assistant_id", "key")
+    return [(pk, key * scale, key) for pk, key in rows[:limit]]
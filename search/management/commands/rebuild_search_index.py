@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from search.index import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the assistant search index from the profiles."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, batch_size, **options):
+        count = rebuild_index(batch_size=batch_size)
+        self.stdout.write(f"Indexed {count} assistants")
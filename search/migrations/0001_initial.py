@@ -0,0 +1,39 @@
+# Generated by Django 4.2.3 on 2026-10-18 06:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('core', '0009_profile_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndexedAssistant',
+            fields=[
+                ('assistant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='core.assistant')),
+                ('length', models.PositiveIntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Posting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=100)),
+                ('impact', models.FloatField()),
+                ('assistant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='core.assistant')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'impact', 'assistant'], name='posting_by_impact')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='posting',
+            constraint=models.UniqueConstraint(fields=('term', 'assistant'), name='unique_term_per_assistant'),
+        ),
+    ]
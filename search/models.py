@@ -0,0 +1,40 @@
+from django.db import models
+
+from core.models import Assistant
+
+
+class IndexedAssistant(models.Model):
+    """An assistant in the search index, with its length in terms."""
+
+    assistant = models.OneToOneField(
+        Assistant, on_delete=models.CASCADE, primary_key=True
+    )
+    length = models.PositiveIntegerField()
+
+
+class Posting(models.Model):
+    """
+    One term of one assistant. Services are also indexed whole, as
+    ``service:<name>``, for exact filters.
+    """
+
+    term = models.CharField(max_length=100)
+    assistant = models.ForeignKey(
+        Assistant, on_delete=models.CASCADE, related_name="postings"
+    )
+    # The term's BM25 weight in this assistant, before the inverse document
+    # frequency, so the postings of a term can be read best first
+    impact = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["term", "assistant"], name="unique_term_per_assistant"
+            )
+        ]
+        indexes = [
+            # Covers ranking, which then never reads the table
+            models.Index(
+                fields=["term", "impact", "assistant"], name="posting_by_impact"
+            )
+        ]
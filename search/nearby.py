@@ -0,0 +1,90 @@
+"""
+The nearest verified assistants to a point.
+
+Candidates are read from the geohash index, a range per cell, for the
+point's cell and the eight around it, then kept or dropped on their exact
+distance. The search starts with small cells, and widens them one
+precision at a time until they hold enough assistants. The farthest of
+those bounds how far the answer can be: the search then moves to the
+smallest cells reaching that far, and only reads the rows within the
+bound. Cells whose neighbourhood covers the whole radius come last.
+"""
+import heapq
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+
+from core.geohash import (
+    MAX_PRECISION,
+    bounding_box,
+    covered_radius,
+    distance,
+    neighbourhood,
+)
+from core.models import Assistant
+
+# Cells are about 32 times smaller in area at every precision, start this
+# many precisions below the one covering the radius
+REFINEMENTS = 3
+
+
+def nearby(latitude, longitude, radius, limit, exclude_user=None):
+    """
+    Return up to ``limit`` ``(assistant_id, distance)`` of the verified
+    assistants within ``radius`` km, nearest first.
+    """
+    covering = reaching(latitude, radius)
+    precision = min(covering + REFINEMENTS, MAX_PRECISION)
+    bound = radius
+
+    while True:
+        cells = neighbourhood(latitude, longitude, precision)
+        rows = candidates(cells, latitude, longitude, bound, exclude_user)
+        nearest = heapq.nsmallest(limit, within(rows, latitude, longitude, bound))
+        if len(nearest) == limit:
+            bound = nearest[-1][0]
+
+        # Anything within the bound is in the neighbourhood, so was found
+        if precision <= covering or covered_radius(latitude, precision) >= bound:
+            return [(pk, km) for km, pk in nearest]
+        if len(nearest) < limit:
+            precision -= 1
+        else:
+            precision = max(reaching(latitude, bound), covering)
+
+
+def reaching(latitude, km):
+    """The finest precision whose neighbourhoods reach ``km`` around a point."""
+    return max(
+        (
+            precision
+            for precision in range(1, MAX_PRECISION + 1)
+            if covered_radius(latitude, precision) >= km
+        ),
+        default=1,
+    )
+
+
+def candidates(cells, latitude, longitude, km, exclude_user=None):
+    # "~" sorts after every geohash character
+    ranges = reduce(or_, (Q(geohash__range=(cell, f"{cell}~")) for cell in cells))
+    latitudes, longitudes = bounding_box(latitude, longitude, km)
+
+    # The box is checked by the database on the index's rows, saving fetching
+    # the ones that cannot be near enough
+    assistants = Assistant.objects.filter(
+        ranges, latitude__range=latitudes, user__is_verified=True
+    )
+    if longitudes:
+        assistants = assistants.filter(longitude__range=longitudes)
+    if exclude_user is not None:
+        assistants = assistants.exclude(user_id=exclude_user)
+    return assistants.values_list("pk", "latitude", "longitude")
+
+
+def within(rows, latitude, longitude, radius):
+    for pk, row_latitude, row_longitude in rows:
+        km = distance(latitude, longitude, row_latitude, row_longitude)
+        if km <= radius:
+            yield km, pk
@@ -0,0 +1,404 @@
+"""
+Ranking every assistant against a request at once.
+
+An engine keeps the features of every assistant in memory, a row each: the
+services it offers, its experience, whether its user is verified and where
+it is. A request is scored against all the rows in a few array operations,
+and the best ones are picked with a partial sort, without reading the
+database.
+
+The signals record saves and deletes in a change feed in the cache: a
+counter, and a key per change holding the user whose assistant changed.
+Before ranking, an engine reloads the rows of the users changed since it
+last looked, so every process sees the writes of the others. It loads
+everything again when it is too far behind, and every ``RANKING_MAX_AGE``
+seconds in any case. On a cache of its own, LocMem, a process never sees the
+changes made by the others, so it reloads every ``RANKING_LOCAL_MAX_AGE``
+seconds instead.
+
+The rows are NumPy arrays when NumPy is installed, Python lists otherwise.
+"""
+import heapq
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from core.caches import is_shared
+from core.geohash import EARTH_RADIUS
+from core.models import Assistant
+
+from .index import get_option, service_term
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SEQUENCE_KEY = "ranking-sequence"
+RANKED_FIELDS = {"services", "experience", "latitude", "longitude"}
+FIELDS = [
+    "pk",
+    "user_id",
+    "services",
+    "experience",
+    "user__is_verified",
+    "latitude",
+    "longitude",
+]
+
+
+def unit_vector(latitude, longitude):
+    """
+    A point as a vector from the centre of a unit sphere. Distances between
+    vectors are chords, which take no trigonometry to measure.
+    """
+    latitude, longitude = math.radians(latitude), math.radians(longitude)
+    return (
+        math.cos(latitude) * math.cos(longitude),
+        math.cos(latitude) * math.sin(longitude),
+        math.sin(latitude),
+    )
+
+
+def chord_distance(chord):
+    """The great circle distance in km of a chord of the unit sphere."""
+    return 2 * EARTH_RADIUS * math.asin(min(1, chord / 2))
+
+
+def change_key(sequence):
+    return f"ranking-change:{sequence}"
+
+
+def max_age():
+    """Seconds between full reloads, short when the change feed is not shared."""
+    if is_shared():
+        return get_option("RANKING_MAX_AGE")
+    return min(get_option("RANKING_MAX_AGE"), get_option("RANKING_LOCAL_MAX_AGE"))
+
+
+def record_change(user_id):
+    """Have every engine reload the features of ``user_id``'s assistant."""
+    try:
+        sequence = cache.incr(SEQUENCE_KEY)
+    except ValueError:
+        # Of concurrent add()s only the first one counts, incr() goes on from it
+        cache.add(SEQUENCE_KEY, 0, None)
+        sequence = cache.incr(SEQUENCE_KEY)
+    cache.set(change_key(sequence), str(user_id), max_age())
+
+
+class Features(ABC):
+    """
+    Rows of assistant features, one per user, reused once deleted.
+
+    Services are columns, numbered as they are first seen.
+    """
+
+    def __init__(self):
+        self.rows = {}
+        self.free = []
+        self.size = 0
+        self.columns = {}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def put(self, pk, user_id, services, experience, verified, latitude, longitude):
+        user_id = str(user_id)
+        row = self.rows.get(user_id)
+        if row is None:
+            row = self.free.pop() if self.free else self.append()
+            self.rows[user_id] = row
+
+        services = services if isinstance(services, list) else []
+        columns = {self.column(service_term(service)) for service in services}
+        if latitude is None or longitude is None:
+            point = None
+        else:
+            point = unit_vector(latitude, longitude)
+        self.write(row, pk, columns, experience or 0, bool(verified), point)
+
+    def remove(self, user_id):
+        row = self.rows.pop(str(user_id), None)
+        if row is not None:
+            self.erase(row)
+            self.free.append(row)
+
+    def column(self, term):
+        if term not in self.columns:
+            self.columns[term] = len(self.columns)
+        return self.columns[term]
+
+    def append(self):
+        self.size += 1
+        return self.size - 1
+
+    def wanted(self, services):
+        """The columns of ``services`` someone offers, and how many were asked."""
+        terms = set(map(service_term, services))
+        columns = [self.columns[term] for term in terms if term in self.columns]
+        return columns, len(terms)
+
+    @abstractmethod
+    def write(self, row, pk, columns, experience, verified, point):
+        pass
+
+    @abstractmethod
+    def erase(self, row):
+        pass
+
+    @abstractmethod
+    def rank(self, services, point, limit, weights, exclude):
+        """
+        Return up to ``limit`` ``(assistant_id, score)``, best first, ties by
+        assistant, leaving out the row of the user ``exclude``. ``point`` is
+        a unit vector, or None.
+        """
+
+
+class ArrayFeatures(Features):
+    """Features in NumPy arrays, services as bits."""
+
+    def __init__(self, capacity=1024):
+        super().__init__()
+        self.pks = np.zeros(capacity, dtype=np.int64)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.services = np.zeros((capacity, 1), dtype=np.uint8)
+        self.experience = np.zeros(capacity, dtype=np.float32)
+        self.verified = np.zeros(capacity, dtype=bool)
+        # A row per coordinate of the unit vectors, zeros without a location
+        self.points = np.zeros((3, capacity))
+        self.located = np.zeros(capacity, dtype=bool)
+
+    def append(self):
+        row = super().append()
+        if row == len(self.pks):
+            extra = len(self.pks)
+            self.pks = np.concatenate([self.pks, np.zeros(extra, dtype=np.int64)])
+            self.alive = np.concatenate([self.alive, np.zeros(extra, dtype=bool)])
+            self.services = np.concatenate(
+                [self.services, np.zeros((extra, self.services.shape[1]), np.uint8)]
+            )
+            self.experience = np.concatenate(
+                [self.experience, np.zeros(extra, dtype=np.float32)]
+            )
+            self.verified = np.concatenate([self.verified, np.zeros(extra, bool)])
+            self.points = np.concatenate([self.points, np.zeros((3, extra))], axis=1)
+            self.located = np.concatenate([self.located, np.zeros(extra, bool)])
+        return row
+
+    def column(self, term):
+        column = super().column(term)
+        if column // 8 == self.services.shape[1]:
+            self.services = np.hstack(
+                [self.services, np.zeros_like(self.services)]
+            )
+        return column
+
+    def write(self, row, pk, columns, experience, verified, point):
+        self.pks[row] = pk
+        self.alive[row] = True
+        self.services[row] = 0
+        for column in columns:
+            self.services[row, column // 8] |= 1 << column % 8
+        self.experience[row] = experience
+        self.verified[row] = verified
+        self.points[:, row] = point or 0
+        self.located[row] = point is not None
+
+    def erase(self, row):
+        self.alive[row] = False
+
+    def rank(self, services, point, limit, weights, exclude):
+        size = self.size
+        candidates = self.alive[:size].copy()
+        if exclude in self.rows:
+            candidates[self.rows[exclude]] = False
+
+        if services:
+            columns, asked = self.wanted(services)
+            overlap = np.zeros(size, dtype=np.int32)
+            for column in columns:
+                overlap += self.services[:size, column // 8] >> column % 8 & 1
+            candidates &= overlap > 0
+
+        # Only the candidates are scored
+        rows = np.flatnonzero(candidates)
+        scores = np.zeros(len(rows))
+        if services:
+            scores += weights["services"] * overlap[rows] / asked
+
+        cap = get_option("EXPERIENCE_CAP")
+        experience = self.experience[rows].astype(np.float64)
+        scores += weights["experience"] * np.minimum(experience, cap) / cap
+        scores += weights["verified"] * self.verified[rows]
+
+        if point is not None:
+            points = self.points[:, rows]
+            squares = np.square(points[0] - point[0])
+            squares += np.square(points[1] - point[1])
+            squares += np.square(points[2] - point[2])
+            km = 2 * EARTH_RADIUS * np.arcsin(np.minimum(np.sqrt(squares) / 2, 1))
+            scale = get_option("DISTANCE_SCALE")
+            # No location, no points for it
+            scores += weights["distance"] * self.located[rows] * scale / (scale + km)
+
+        if limit < len(rows):
+            # Everything at least as good as the limit-th best, ties included
+            kth = np.partition(scores, len(rows) - limit)[len(rows) - limit]
+            best = np.flatnonzero(scores >= kth)
+            rows, scores = rows[best], scores[best]
+
+        pks = self.pks[rows]
+        order = np.lexsort((pks, -scores))[:limit]
+        return list(zip(pks[order].tolist(), scores[order].tolist()))
+
+
+class ListFeatures(Features):
+    """Features in Python lists, services as an integer's bits."""
+
+    def __init__(self):
+        super().__init__()
+        self.features = []
+
+    def append(self):
+        self.features.append(None)
+        return super().append()
+
+    def write(self, row, pk, columns, experience, verified, point):
+        services = sum(1 << column for column in columns)
+        self.features[row] = (pk, services, experience, verified, point)
+
+    def erase(self, row):
+        self.features[row] = None
+
+    def rank(self, services, point, limit, weights, exclude):
+        excluded = self.rows.get(exclude)
+        wanted = 0
+        if services:
+            columns, asked = self.wanted(services)
+            if not columns:
+                return []
+            wanted = sum(1 << column for column in columns)
+        cap = get_option("EXPERIENCE_CAP")
+        scale = get_option("DISTANCE_SCALE")
+
+        def scored():
+            for row, features in enumerate(self.features):
+                if features is None or row == excluded:
+                    continue
+                pk, offered, experience, verified, row_point = features
+                score = 0.0
+                if wanted:
+                    overlap = (offered & wanted).bit_count()
+                    if not overlap:
+                        continue
+                    score += weights["services"] * overlap / asked
+                score += weights["experience"] * min(experience, cap) / cap
+                score += weights["verified"] * verified
+                if point is not None and row_point is not None:
+                    km = chord_distance(math.dist(point, row_point))
+                    score += weights["distance"] * scale / (scale + km)
+                yield -score, pk
+
+        return [(pk, -score) for score, pk in heapq.nsmallest(limit, scored())]
+
+
+class RankingEngine:
+    def __init__(self, use_numpy=None):
+        if use_numpy is None:
+            use_numpy = np is not None
+        self.features_class = ArrayFeatures if use_numpy else ListFeatures
+        self.features = self.features_class()
+        self.lock = threading.Lock()
+        self.sequence = None
+        self.loaded_at = None
+
+    def load(self, batch_size=10_000):
+        """Read the features of every assistant."""
+        # Read before the rows, changes made meanwhile are applied again
+        sequence = cache.get(SEQUENCE_KEY, 0)
+        features = self.features_class()
+        assistants = Assistant.objects.order_by("pk").values_list(*FIELDS)
+        for row in assistants.iterator(chunk_size=batch_size):
+            features.put(*row)
+        self.features, self.sequence = features, sequence
+        self.loaded_at = time.monotonic()
+
+    def refresh(self):
+        """Catch up with the change feed."""
+        sequence = cache.get(SEQUENCE_KEY, 0)
+        if (
+            self.loaded_at is None
+            or time.monotonic() - self.loaded_at > max_age()
+            # The cache lost the counter
+            or sequence < self.sequence
+            or sequence - self.sequence > get_option("RANKING_MAX_CHANGES")
+        ):
+            self.load()
+            return
+        if sequence == self.sequence:
+            return
+
+        numbers = range(self.sequence + 1, sequence + 1)
+        changes = cache.get_many([change_key(number) for number in numbers])
+        users = set()
+        for number in numbers:
+            # Counted but not written yet, the next refresh picks it up
+            if change_key(number) not in changes:
+                break
+            users.add(changes[change_key(number)])
+            self.sequence = number
+        self.reload(users)
+
+    def reload(self, users):
+        found = set()
+        for row in Assistant.objects.filter(user_id__in=users).values_list(*FIELDS):
+            self.features.put(*row)
+            found.add(str(row[1]))
+        for user_id in users - found:
+            self.features.remove(user_id)
+
+    def rank(
+        self, services=(), latitude=None, longitude=None, limit=20, exclude_user=None
+    ):
+        """
+        Return up to ``limit`` ``(assistant_id, score)``, best first.
+
+        With ``services``, assistants must offer one of them, and score more
+        the more they offer. Assistants are near when ``latitude`` and
+        ``longitude`` are given.
+        """
+        weights = get_option("RANKING_WEIGHTS")
+        exclude = str(exclude_user) if exclude_user is not None else None
+        point = None if latitude is None else unit_vector(latitude, longitude)
+        with self.lock:
+            self.refresh()
+            return self.features.rank(services, point, limit, weights, exclude)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    global _engine
+
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = RankingEngine()
+    return _engine
+
+
+@receiver(setting_changed)
+def reset_engine_on_setting_change(*, setting, **kwargs):
+    global _engine
+
+    if setting in ("SEARCH", "CACHES"):
+        _engine = None
@@ -0,0 +1,99 @@
+from rest_framework import serializers
+
+from core.models import Assistant
+from core.serializers import CachedFieldsMixin
+
+from .index import get_option
+
+
+class SearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(required=False, allow_blank=True, default="")
+    service = serializers.ListField(
+        child=serializers.CharField(), required=False, default=list
+    )
+    cursor = serializers.CharField(required=False)
+    limit = serializers.IntegerField(required=False, min_value=1)
+
+    def validate_limit(self, value):
+        return min(value, get_option("MAX_PAGE_SIZE"))
+
+    def validate(self, attrs):
+        if not attrs["q"].strip() and not attrs["service"]:
+            raise serializers.ValidationError("Give a query or a service")
+        return attrs
+
+
+class PublicAssistantSerializer(CachedFieldsMixin, serializers.ModelSerializer):
+    """
+    What any user may see of an assistant they found. Identity documents,
+    age and location stay on the assistant's own profile.
+    """
+
+    user_id = serializers.UUIDField(read_only=True)
+
+    class Meta:
+        model = Assistant
+        fields = ["user_id", "bio", "services", "experience", "qualifications"]
+        read_only_fields = fields
+
+
+class AssistantResultSerializer(PublicAssistantSerializer):
+    score = serializers.FloatField(read_only=True, allow_null=True)
+
+    class Meta(PublicAssistantSerializer.Meta):
+        fields = [*PublicAssistantSerializer.Meta.fields, "score"]
+
+
+class NearbyQuerySerializer(serializers.Serializer):
+    """Around the given point, or the caller's own without one."""
+
+    latitude = serializers.FloatField(required=False, min_value=-90, max_value=90)
+    longitude = serializers.FloatField(
+        required=False, min_value=-180, max_value=180
+    )
+    radius = serializers.FloatField(required=False, min_value=0)
+    limit = serializers.IntegerField(required=False, min_value=1)
+
+    def validate_radius(self, value):
+        return min(value, get_option("MAX_NEARBY_RADIUS"))
+
+    def validate_limit(self, value):
+        return min(value, get_option("MAX_PAGE_SIZE"))
+
+    def validate(self, attrs):
+        if ("latitude" in attrs) != ("longitude" in attrs):
+            raise serializers.ValidationError(
+                "Give both the latitude and the longitude, or neither"
+            )
+        attrs.setdefault("radius", get_option("NEARBY_RADIUS"))
+        attrs.setdefault("limit", get_option("PAGE_SIZE"))
+        return attrs
+
+
+class MatchQuerySerializer(serializers.Serializer):
+    service = serializers.ListField(child=serializers.CharField(), min_length=1)
+    latitude = serializers.FloatField(required=False, min_value=-90, max_value=90)
+    longitude = serializers.FloatField(
+        required=False, min_value=-180, max_value=180
+    )
+    limit = serializers.IntegerField(required=False, min_value=1)
+
+    def validate_limit(self, value):
+        return min(value, get_option("MAX_PAGE_SIZE"))
+
+    def validate(self, attrs):
+        if ("latitude" in attrs) != ("longitude" in attrs):
+            raise serializers.ValidationError(
+                "Give both the latitude and the longitude, or neither"
+            )
+        attrs.setdefault("limit", get_option("PAGE_SIZE"))
+        return attrs
+
+
+class NearbyAssistantSerializer(PublicAssistantSerializer):
+    """Distance only, exact coordinates would tell where an assistant lives."""
+
+    distance = serializers.FloatField(read_only=True)
+
+    class Meta(PublicAssistantSerializer.Meta):
+        fields = [*PublicAssistantSerializer.Meta.fields, "distance"]
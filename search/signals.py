@@ -0,0 +1,40 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import Assistant
+
+from .index import INDEXED_FIELDS, index_assistant
+from .ranking import RANKED_FIELDS, record_change
+
+
+@receiver(post_save, sender=Assistant)
+def reindex_assistant(*, instance, update_fields, raw, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and not INDEXED_FIELDS & set(update_fields):
+        return
+    # After the commit, the profile write's transaction stays short
+    transaction.on_commit(lambda: index_assistant(instance))
+
+
+@receiver(post_save, sender=Assistant)
+@receiver(post_delete, sender=Assistant)
+def rerank_assistant(*, instance, update_fields=None, raw=False, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and not RANKED_FIELDS & set(update_fields):
+        return
+    # Engines must not read the row before it is committed
+    transaction.on_commit(lambda: record_change(instance.user_id))
+
+
+@receiver(post_save, sender=get_user_model())
+def rerank_verified_assistant(*, instance, created, update_fields, raw, **kwargs):
+    # A new user's assistant is recorded when it is created
+    if raw or created or not instance.is_assistant:
+        return
+    if update_fields is not None and "is_verified" not in update_fields:
+        return
+    transaction.on_commit(lambda: record_change(instance.pk))
@@ -0,0 +1,26 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from model_bakery import baker
+
+from core.models import Assistant
+
+
+@pytest.fixture(autouse=True)
+def clear_search_stats():
+    # Index statistics are cached, and the database is new in every test
+    cache.clear()
+
+
+@pytest.fixture
+def make_assistant(django_capture_on_commit_callbacks):
+    def make(verified=True, **fields):
+        user = baker.make(get_user_model(), is_assistant=True, is_verified=verified)
+        assistant = Assistant.objects.get(user=user)
+        for name, value in fields.items():
+            setattr(assistant, name, value)
+        with django_capture_on_commit_callbacks(execute=True):
+            assistant.save()
+        return assistant
+
+    return make
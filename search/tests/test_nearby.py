@@ -0,0 +1,126 @@
+import random
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from model_bakery import baker
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.geohash import distance
+from core.models import Assistant, BaseUser
+from core.tokens import ClaimsRefreshToken
+from search.nearby import nearby
+
+LAGOS = (6.5244, 3.3792)
+
+
+def place(latitude, longitude, verified=True, is_assistant=True):
+    user = baker.make(get_user_model(), is_assistant=is_assistant, is_verified=verified)
+    Model = Assistant if is_assistant else BaseUser
+    profile = Model.objects.get(user=user)
+    profile.latitude, profile.longitude = latitude, longitude
+    profile.save()
+    return profile
+
+
+@pytest.mark.django_db
+class TestNearby:
+    def test_matches_brute_force(self):
+        rng = random.Random(1)
+        assistants = [
+            place(LAGOS[0] + rng.gauss(0, 0.05), LAGOS[1] + rng.gauss(0, 0.05))
+            for _ in range(150)
+        ]
+        expected = sorted(
+            (distance(*LAGOS, assistant.latitude, assistant.longitude), assistant.pk)
+            for assistant in assistants
+        )
+
+        for radius, limit in [(2, 5), (10, 20), (25, 200)]:
+            found = nearby(*LAGOS, radius, limit)
+            within = [(km, pk) for km, pk in expected if km <= radius][:limit]
+            assert [pk for pk, _ in found] == [pk for _, pk in within]
+            assert [km for _, km in found] == pytest.approx([km for km, _ in within])
+
+    def test_radius(self):
+        near = place(LAGOS[0] + 0.01, LAGOS[1])
+        place(LAGOS[0] + 0.2, LAGOS[1])
+
+        assert [pk for pk, _ in nearby(*LAGOS, 5, 10)] == [near.pk]
+
+    def test_only_verified(self):
+        verified = place(*LAGOS)
+        place(*LAGOS, verified=False)
+
+        assert [pk for pk, _ in nearby(*LAGOS, 5, 10)] == [verified.pk]
+
+    def test_across_a_cell_edge(self):
+        # Cells split at the equator and the prime meridian
+        assistant = place(0.001, -0.001)
+
+        assert [pk for pk, _ in nearby(-0.001, 0.001, 1, 10)] == [assistant.pk]
+
+
+@pytest.mark.django_db
+class TestNearbyView:
+    url = reverse("nearby-assistants")
+
+    @pytest.fixture
+    def client(self, settings):
+        settings.CLAIMS_AUTH = {"ENABLED": True, "MAX_AGE": timedelta(minutes=15)}
+        self.profile = place(*LAGOS, is_assistant=False)
+        client = APIClient()
+        token = ClaimsRefreshToken.for_user(self.profile.user).access_token
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        return client
+
+    def test_around_a_point(self, client):
+        far = place(LAGOS[0] + 0.05, LAGOS[1])
+        near = place(LAGOS[0] + 0.01, LAGOS[1])
+
+        response = client.get(
+            self.url, {"latitude": LAGOS[0], "longitude": LAGOS[1], "radius": 10}
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        results = response.data["results"]
+        assert [result["user_id"] for result in results] == [
+            str(near.user_id),
+            str(far.user_id),
+        ]
+        assert results[0]["distance"] == 1.1
+        assert "latitude" not in results[0] and "passport" not in results[0]
+
+    def test_around_the_callers_profile(self, client):
+        near = place(LAGOS[0] + 0.01, LAGOS[1])
+
+        response = client.get(self.url, {"limit": 1})
+
+        assert [result["user_id"] for result in response.data["results"]] == [
+            str(near.user_id)
+        ]
+
+    def test_excludes_the_caller(self, settings):
+        settings.CLAIMS_AUTH = {"ENABLED": True, "MAX_AGE": timedelta(minutes=15)}
+        assistant = place(*LAGOS)
+        client = APIClient()
+        token = ClaimsRefreshToken.for_user(assistant.user).access_token
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        assert client.get(self.url).data["results"] == []
+
+    def test_without_a_location(self, client):
+        profile = BaseUser.objects.filter(pk=self.profile.pk)
+        profile.update(latitude=None, longitude=None)
+
+        response = client.get(self.url)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    @pytest.mark.parametrize(
+        "params", [{"latitude": 6}, {"latitude": 100, "longitude": 3}, {"radius": -1}]
+    )
+    def test_bad_requests(self, client, params):
+        assert client.get(self.url, params).status_code == status.HTTP_400_BAD_REQUEST
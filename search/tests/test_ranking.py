@@ -0,0 +1,330 @@
+import random
+from datetime import timedelta
+
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Assistant
+from core.tokens import ClaimsRefreshToken
+from search import ranking
+from search.ranking import (
+    SEQUENCE_KEY,
+    ArrayFeatures,
+    ListFeatures,
+    RankingEngine,
+    change_key,
+)
+
+LAGOS = (6.5244, 3.3792)
+SERVICES = ["Cleaning", "Cooking", "Laundry", "Driving", "Errands", "Tutoring"]
+WEIGHTS = {"services": 0.5, "experience": 0.2, "verified": 0.1, "distance": 0.2}
+
+
+@pytest.fixture(params=["numpy", "python"])
+def engine(request):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    return RankingEngine(use_numpy=request.param == "numpy")
+
+
+@pytest.mark.django_db
+class TestRank:
+    def test_services_offered(self, engine, make_assistant):
+        both = make_assistant(services=["Cleaning", "Cooking"])
+        one = make_assistant(services=["cooking"])
+        make_assistant(services=["Driving"])
+
+        found = engine.rank(["Cleaning", "Cooking"])
+
+        assert [pk for pk, _ in found] == [both.pk, one.pk]
+        assert found[0][1] - found[1][1] == pytest.approx(0.25)
+
+    def test_services_nobody_offers(self, engine, make_assistant):
+        make_assistant(services=["Cleaning"])
+
+        assert engine.rank(["Plumbing"]) == []
+
+    def test_experience_up_to_the_cap(self, engine, make_assistant):
+        make_assistant(services=["Cleaning"], experience=10)
+        make_assistant(services=["Cleaning"], experience=40)
+        make_assistant(services=["Cleaning"], experience=5)
+
+        scores = [score for _, score in engine.rank(["Cleaning"])]
+
+        # The first two tie on the capped experience
+        assert scores == pytest.approx([0.8, 0.8, 0.7])
+
+    def test_verified(self, engine, make_assistant):
+        unverified = make_assistant(services=["Cleaning"], verified=False)
+        verified = make_assistant(services=["Cleaning"])
+
+        found = engine.rank(["Cleaning"])
+
+        assert [pk for pk, _ in found] == [verified.pk, unverified.pk]
+
+    def test_distance(self, engine, make_assistant):
+        far = make_assistant(
+            services=["Cleaning"], latitude=LAGOS[0] + 0.5, longitude=LAGOS[1]
+        )
+        nowhere = make_assistant(services=["Cleaning"])
+        near = make_assistant(
+            services=["Cleaning"], latitude=LAGOS[0] + 0.01, longitude=LAGOS[1]
+        )
+
+        found = engine.rank(["Cleaning"], *LAGOS)
+
+        assert [pk for pk, _ in found] == [near.pk, far.pk, nowhere.pk]
+        # 1.1km away, with distance worth half its weight at 5km
+        assert found[0][1] == pytest.approx(0.6 + 0.2 * 5 / 6.112, abs=1e-3)
+
+    def test_limit_and_ties(self, engine, make_assistant):
+        assistants = [make_assistant(services=["Cleaning"]) for _ in range(5)]
+
+        found = engine.rank(["Cleaning"], limit=3)
+
+        assert [pk for pk, _ in found] == [assistant.pk for assistant in assistants[:3]]
+
+    def test_excludes_a_user(self, engine, make_assistant):
+        excluded = make_assistant(services=["Cleaning"])
+        other = make_assistant(services=["Cleaning"])
+
+        found = engine.rank(["Cleaning"], exclude_user=excluded.user_id)
+
+        assert [pk for pk, _ in found] == [other.pk]
+
+
+@pytest.mark.django_db
+def test_backends_agree(make_assistant):
+    pytest.importorskip("numpy")
+    rng = random.Random(0)
+    for _ in range(60):
+        located = rng.random() < 0.8
+        make_assistant(
+            services=rng.sample(SERVICES, rng.randint(1, 3)),
+            experience=rng.randint(0, 15),
+            verified=rng.random() < 0.7,
+            latitude=LAGOS[0] + rng.gauss(0, 0.1) if located else None,
+            longitude=LAGOS[1] + rng.gauss(0, 0.1) if located else None,
+        )
+
+    arrays, lists = RankingEngine(use_numpy=True), RankingEngine(use_numpy=False)
+    for services in (["Cleaning"], ["Cooking", "Driving"], ["Errands", "Plumbing"]):
+        for point in (LAGOS, (None, None)):
+            expected = lists.rank(services, *point, limit=10)
+            found = arrays.rank(services, *point, limit=10)
+            assert [pk for pk, _ in found] == [pk for pk, _ in expected]
+            assert [score for _, score in found] == pytest.approx(
+                [score for _, score in expected]
+            )
+
+
+@pytest.mark.django_db
+class TestChanges:
+    def test_save_is_picked_up(
+        self, engine, make_assistant, django_capture_on_commit_callbacks
+    ):
+        assistant = make_assistant(services=["Cleaning"])
+        engine.rank(["Cleaning"])
+
+        assistant.services = ["Cooking"]
+        with django_capture_on_commit_callbacks(execute=True):
+            assistant.save()
+
+        assert engine.rank(["Cleaning"]) == []
+        assert [pk for pk, _ in engine.rank(["Cooking"])] == [assistant.pk]
+
+    def test_only_ranked_fields(
+        self, engine, make_assistant, django_capture_on_commit_callbacks
+    ):
+        assistant = make_assistant(services=["Cleaning"])
+
+        with django_capture_on_commit_callbacks() as callbacks:
+            assistant.save(update_fields=["age"])
+
+        assert callbacks == []
+
+    def test_delete_is_picked_up(
+        self, engine, make_assistant, django_capture_on_commit_callbacks
+    ):
+        assistant = make_assistant(services=["Cleaning"])
+        other = make_assistant(services=["Cleaning"])
+        engine.rank(["Cleaning"])
+
+        with django_capture_on_commit_callbacks(execute=True):
+            assistant.delete()
+
+        assert [pk for pk, _ in engine.rank(["Cleaning"])] == [other.pk]
+        assert len(engine.features) == 1
+
+    def test_verification_is_picked_up(
+        self, engine, make_assistant, django_capture_on_commit_callbacks
+    ):
+        assistant = make_assistant(services=["Cleaning"], verified=False)
+        [(_, before)] = engine.rank(["Cleaning"])
+
+        assistant.user.is_verified = True
+        with django_capture_on_commit_callbacks(execute=True):
+            assistant.user.save()
+
+        [(_, after)] = engine.rank(["Cleaning"])
+        assert after - before == pytest.approx(0.1)
+
+    def test_changes_without_a_full_load(
+        self, engine, make_assistant, django_capture_on_commit_callbacks, monkeypatch
+    ):
+        make_assistant(services=["Cleaning"])
+        engine.rank(["Cleaning"])
+        monkeypatch.setattr(engine, "load", None)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            added = make_assistant(services=["Cleaning"])
+
+        assert added.pk in [pk for pk, _ in engine.rank(["Cleaning"])]
+
+    def test_waits_for_an_unwritten_change(self, engine, make_assistant):
+        make_assistant(services=["Cleaning"])
+        engine.rank(["Cleaning"])
+        sequence = engine.sequence
+
+        # A change counted, but not written yet
+        cache.incr(SEQUENCE_KEY)
+        added = make_assistant(services=["Cleaning"])
+        assert engine.sequence == sequence
+        assert len(engine.rank(["Cleaning"])) == 1
+        assert engine.sequence == sequence
+
+        cache.set(change_key(sequence + 1), str(added.user_id))
+        assert len(engine.rank(["Cleaning"])) == 2
+
+    def test_reloads_when_the_counter_is_lost(self, engine, make_assistant):
+        make_assistant(services=["Cleaning"])
+        engine.rank(["Cleaning"])
+
+        cache.clear()
+        Assistant.objects.filter(services=["Cleaning"]).update(services=["Cooking"])
+
+        assert engine.rank(["Cleaning"]) == []
+
+    def test_reloads_when_too_old(self, engine, make_assistant, settings):
+        settings.SEARCH = {"RANKING_MAX_AGE": 0}
+        make_assistant(services=["Cleaning"])
+        engine.rank(["Cleaning"])
+
+        Assistant.objects.update(services=["Cooking"])
+
+        assert engine.rank(["Cleaning"]) == []
+
+    def test_local_cache_reloads_sooner(self, engine, make_assistant, settings):
+        settings.SEARCH = {"RANKING_LOCAL_MAX_AGE": 0}
+        make_assistant(services=["Cleaning"])
+        engine.rank(["Cleaning"])
+
+        # As if another process saved it, its change never reaches this cache
+        Assistant.objects.update(services=["Cooking"])
+
+        assert engine.rank(["Cleaning"]) == []
+
+    def test_shared_cache_keeps_the_long_max_age(self, settings, tmp_path):
+        settings.CACHES = {
+            "default": {
+                "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                "LOCATION": str(tmp_path / "cache"),
+            }
+        }
+        settings.SEARCH = {"RANKING_LOCAL_MAX_AGE": 0}
+
+        assert ranking.max_age() == 3600
+
+
+class TestFeatures:
+    def test_rows_are_reused(self):
+        pytest.importorskip("numpy")
+        for features in (ArrayFeatures(capacity=2), ListFeatures()):
+            for n in range(3):
+                features.put(n + 1, f"user{n}", ["Cleaning"], 0, True, None, None)
+            features.remove("user1")
+            features.put(4, "user3", ["Cleaning"], 0, True, None, None)
+
+            assert features.size == 3
+            found = features.rank(["Cleaning"], None, 10, WEIGHTS, None)
+            assert [pk for pk, _ in found] == [1, 3, 4]
+
+    def test_many_services(self):
+        pytest.importorskip("numpy")
+        features = ArrayFeatures(capacity=1)
+        services = [f"service {n}" for n in range(20)]
+        features.put(1, "user", services, 0, True, None, None)
+        features.put(2, "other", services[-1:], 0, True, None, None)
+
+        found = features.rank(services[-2:], None, 10, WEIGHTS, None)
+
+        assert [pk for pk, _ in found] == [1, 2]
+        assert features.services.shape == (2, 4)
+
+    def test_backends_write_erase_and_rank(self):
+        with pytest.raises(TypeError):
+            ranking.Features()
+
+    def test_without_numpy(self, monkeypatch):
+        monkeypatch.setattr(ranking, "np", None)
+
+        assert isinstance(RankingEngine().features, ListFeatures)
+
+
+@pytest.mark.django_db
+class TestMatchView:
+    url = reverse("match-assistants")
+
+    @pytest.fixture
+    def client(self, settings, make_assistant):
+        settings.CLAIMS_AUTH = {"ENABLED": True, "MAX_AGE": timedelta(minutes=15)}
+        self.caller = make_assistant(
+            services=["Cleaning"], latitude=LAGOS[0], longitude=LAGOS[1]
+        )
+        client = APIClient()
+        token = ClaimsRefreshToken.for_user(self.caller.user).access_token
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        return client
+
+    def test_ranked(self, client, make_assistant):
+        far = make_assistant(
+            services=["Cleaning"], latitude=LAGOS[0] + 0.3, longitude=LAGOS[1]
+        )
+        near = make_assistant(
+            services=["Cleaning"], latitude=LAGOS[0] + 0.01, longitude=LAGOS[1]
+        )
+        make_assistant(services=["Driving"])
+
+        # Around the caller, who is left out
+        response = client.get(self.url, {"service": "Cleaning"})
+
+        assert response.status_code == status.HTTP_200_OK
+        results = response.data["results"]
+        assert [result["user_id"] for result in results] == [
+            str(near.user_id),
+            str(far.user_id),
+        ]
+        assert results[0]["score"] > results[1]["score"]
+
+    def test_around_a_point(self, client, make_assistant):
+        west = make_assistant(services=["Cleaning"], latitude=6.5, longitude=3.0)
+        east = make_assistant(services=["Cleaning"], latitude=6.5, longitude=4.0)
+
+        response = client.get(
+            self.url, {"service": "Cleaning", "latitude": 6.5, "longitude": 4.1}
+        )
+
+        assert [result["user_id"] for result in response.data["results"]] == [
+            str(east.user_id),
+            str(west.user_id),
+        ]
+
+    @pytest.mark.parametrize(
+        "params",
+        [{}, {"service": "Cleaning", "latitude": 6}, {"service": "a", "limit": 0}],
+    )
+    def test_bad_requests(self, client, params):
+        assert client.get(self.url, params).status_code == status.HTTP_400_BAD_REQUEST
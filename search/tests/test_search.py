@@ -0,0 +1,256 @@
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from model_bakery import baker
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Assistant
+from core.tokens import ClaimsRefreshToken
+from search.index import (
+    decode_cursor,
+    postings_of,
+    rebuild_index,
+    search,
+    terms_of,
+)
+from search.models import IndexedAssistant, Posting
+
+
+class TestTerms:
+    def test_words_and_services(self):
+        assistant = Assistant(
+            services=["House Cleaning", "cooking"],
+            bio="Cleaning and cooking, cleaning again",
+            qualifications=None,
+        )
+
+        frequencies, services = terms_of(assistant)
+
+        assert frequencies == {"house": 1, "cleaning": 3, "cooking": 2, "again": 1}
+        assert services == ["House Cleaning", "cooking"]
+
+    def test_postings(self):
+        assistant = Assistant(pk=1, services=["House Cleaning"], bio="Cooking")
+
+        postings, indexed = postings_of(assistant, average_length=6)
+
+        impacts = {posting.term: posting.impact for posting in postings}
+        assert set(impacts) == {
+            "house",
+            "cleaning",
+            "cooking",
+            "service:house cleaning",
+        }
+        assert impacts["cooking"] > 1
+        assert impacts["service:house cleaning"] == 0
+        assert indexed.length == 3
+
+
+@pytest.mark.django_db
+class TestIndex:
+    def test_save_reindexes(self, make_assistant, django_capture_on_commit_callbacks):
+        assistant = make_assistant(bio="Gardening")
+        assistant.bio = "Plumbing"
+
+        with django_capture_on_commit_callbacks(execute=True):
+            assistant.save(update_fields=["bio"])
+
+        postings = Posting.objects.filter(assistant=assistant)
+        assert set(postings.values_list("term", flat=True)) == {"plumbing"}
+        assert IndexedAssistant.objects.get(assistant=assistant).length == 1
+
+    def test_other_fields_do_not_reindex(
+        self, make_assistant, django_capture_on_commit_callbacks
+    ):
+        assistant = make_assistant(bio="Gardening")
+        assistant.age = 40
+
+        with django_capture_on_commit_callbacks() as callbacks:
+            assistant.save(update_fields=["age"])
+
+        assert not callbacks
+
+    def test_delete_removes_postings(self, make_assistant):
+        assistant = make_assistant(bio="Gardening")
+        assistant.delete()
+
+        assert not Posting.objects.exists()
+        assert not IndexedAssistant.objects.exists()
+
+    def test_rebuild(self, make_assistant):
+        first = make_assistant(bio="Gardening")
+        second = make_assistant(bio="Plumbing")
+        Posting.objects.all().delete()
+        IndexedAssistant.objects.all().delete()
+
+        assert rebuild_index(batch_size=1) == 2
+        assert Posting.objects.get(term="gardening").assistant_id == first.pk
+        assert Posting.objects.get(term="plumbing").assistant_id == second.pk
+
+
+@pytest.mark.django_db
+class TestSearch:
+    def test_service_filter_needs_every_service(self, make_assistant):
+        both = make_assistant(services=["Cleaning", "Cooking"])
+        make_assistant(services=["Cleaning"])
+        make_assistant(services=["Cooking"])
+
+        page, cursor = search(services=["cleaning", "COOKING"])
+
+        assert page == [(both.pk, None)]
+        assert cursor is None
+
+    def test_ranks_by_bm25(self, make_assistant):
+        make_assistant(bio="Babysitter")
+        once = make_assistant(bio="Cooking for families, meal prep and cleaning")
+        twice = make_assistant(bio="Cooking, cooking", services=["Cooking"])
+        short = make_assistant(bio="Cooking")
+
+        page, _ = search("cooking")
+
+        assert [pk for pk, _ in page] == [twice.pk, short.pk, once.pk]
+        assert page[0][1] > page[1][1] > page[2][1] > 0
+
+    def test_rare_terms_weigh_more(self, make_assistant):
+        common = make_assistant(bio="Cleaning")
+        rare = make_assistant(bio="Ironing")
+        make_assistant(bio="Cleaning")
+        make_assistant(bio="Cleaning")
+
+        page, _ = search("cleaning ironing")
+
+        assert page[0][0] == rare.pk
+        assert common.pk in [pk for pk, _ in page]
+
+    def test_keywords_with_service_filter(self, make_assistant):
+        make_assistant(bio="Cooking", services=["Catering"])
+        driver = make_assistant(bio="Cooking", services=["Driving"])
+
+        page, _ = search("cooking", ["driving"])
+
+        assert [pk for pk, _ in page] == [driver.pk]
+
+    def test_unknown_words(self, make_assistant):
+        make_assistant(bio="Cooking")
+
+        assert search("astronaut") == ([], None)
+
+    @pytest.mark.parametrize("query", ["cleaning", ""])
+    def test_keyset_pages(self, make_assistant, query):
+        expected = [
+            make_assistant(bio="Cleaning " * n, services=["Cleaning"]).pk
+            for n in range(1, 8)
+        ]
+
+        seen, cursor = [], None
+        while True:
+            page, cursor = search(query, ["cleaning"], cursor=cursor, limit=3)
+            seen += [pk for pk, _ in page]
+            if cursor is None:
+                break
+
+        assert sorted(seen) == sorted(expected)
+        assert len(seen) == len(set(seen))
+
+    def test_reindex_between_pages(self, make_assistant):
+        expected = [
+            make_assistant(bio=f"{'cleaning ' * n}{'cooking ' * (8 - n)}").pk
+            for n in range(1, 8)
+        ] + [make_assistant(bio="Cleaning").pk, make_assistant(bio="Cooking").pk]
+
+        page, cursor = search("cleaning cooking", limit=3)
+        seen = [pk for pk, _ in page]
+        # Cooking gets common, and its weight drops
+        for _ in range(20):
+            make_assistant(bio="Cooking dinner")
+        cache.clear()
+        while cursor:
+            page, cursor = search("cleaning cooking", cursor=cursor, limit=3)
+            seen += [pk for pk, _ in page]
+
+        seen = [pk for pk in seen if pk in expected]
+        assert sorted(seen) == sorted(expected)
+
+    def test_invalid_cursor(self):
+        with pytest.raises(ValueError):
+            decode_cursor("not a cursor")
+
+
+@pytest.mark.django_db
+class TestSearchView:
+    url = reverse("assistant-search")
+
+    @pytest.fixture
+    def client(self, settings):
+        settings.CLAIMS_AUTH = {"ENABLED": True, "MAX_AGE": timedelta(minutes=15)}
+        user = baker.make(get_user_model())
+        client = APIClient()
+        token = ClaimsRefreshToken.for_user(user).access_token
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        return client
+
+    def test_search(self, client, make_assistant, django_assert_max_num_queries):
+        assistant = make_assistant(bio="Cooking", services=["Catering"])
+        make_assistant(bio="Cooking", services=["Driving"])
+
+        with django_assert_max_num_queries(4):
+            response = client.get(self.url, {"q": "cooking", "service": "catering"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [result["user_id"] for result in response.data["results"]] == [
+            str(assistant.user_id)
+        ]
+        assert response.data["results"][0]["score"] > 0
+        assert response.data["next"] is None
+
+    def test_results_leave_out_identity(self, client, make_assistant):
+        make_assistant(
+            bio="Cooking",
+            age=30,
+            passport="https://example.com/passport.png",
+            id_card="NIN",
+            id_card_number="12345678901",
+            latitude=6.5,
+            longitude=3.4,
+        )
+
+        result = client.get(self.url, {"q": "cooking"}).data["results"][0]
+
+        assert set(result) == {
+            "user_id",
+            "bio",
+            "services",
+            "experience",
+            "qualifications",
+            "score",
+        }
+
+    def test_next_page(self, client, make_assistant):
+        for _ in range(3):
+            make_assistant(services=["Catering"])
+
+        first = client.get(self.url, {"service": "catering", "limit": 2}).data
+        second = client.get(
+            self.url, {"service": "catering", "limit": 2, "cursor": first["next"]}
+        ).data
+
+        assert len(first["results"]) == 2
+        assert len(second["results"]) == 1
+        assert second["next"] is None
+
+    @pytest.mark.parametrize(
+        "params", [{}, {"q": "  "}, {"q": "cooking", "cursor": "bad"}]
+    )
+    def test_bad_requests(self, client, params):
+        response = client.get(self.url, params)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_requires_authentication(self):
+        response = APIClient().get(self.url, {"q": "cooking"})
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
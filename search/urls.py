@@ -0,0 +1,17 @@
+from django.urls import path
+
+from . import views
+
+urlpatterns = [
+    path("assistants", views.AssistantSearchView.as_view(), name="assistant-search"),
+    path(
+        "assistants/nearby",
+        views.NearbyAssistantsView.as_view(),
+        name="nearby-assistants",
+    ),
+    path(
+        "assistants/match",
+        views.MatchAssistantsView.as_view(),
+        name="match-assistants",
+    ),
+]
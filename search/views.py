@@ -0,0 +1,160 @@
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import GenericAPIView
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from core.models import Assistant, BaseUser
+from core.tokens import ClaimsJWTAuthentication
+
+from .index import search
+from .nearby import nearby
+from .ranking import get_engine
+from .serializers import (
+    AssistantResultSerializer,
+    MatchQuerySerializer,
+    NearbyAssistantSerializer,
+    NearbyQuerySerializer,
+    SearchQuerySerializer,
+)
+
+
+def profile_location(user):
+    """The coordinates on ``user``'s profile, Nones if it has none."""
+    Model = Assistant if user.is_assistant else BaseUser
+    location = (
+        Model.objects.filter(user_id=user.pk)
+        .values_list("latitude", "longitude")
+        .first()
+    )
+    return location or (None, None)
+
+
+class AssistantSearchView(GenericAPIView):
+    """
+    Search assistants
+
+    Query parameters: `q` for keywords, `service` (repeatable) for services
+    every result must offer, `cursor` from the previous page's `next`, and
+    `limit`.
+    """
+
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+    serializer_class = AssistantResultSerializer
+
+    def get(self, request):
+        params = SearchQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+
+        try:
+            page, cursor = search(
+                params.validated_data["q"],
+                params.validated_data["service"],
+                cursor=params.validated_data.get("cursor"),
+                limit=params.validated_data.get("limit"),
+            )
+        except ValueError as error:
+            raise ValidationError({"cursor": str(error)})
+
+        assistants = Assistant.objects.in_bulk([pk for pk, _ in page])
+        results = []
+        for pk, score in page:
+            # Deleted since it was found, its postings go with it
+            if pk in assistants:
+                assistants[pk].score = score
+                results.append(assistants[pk])
+
+        serializer = self.get_serializer(results, many=True)
+        return Response(
+            {"results": serializer.data, "next": cursor}, status=status.HTTP_200_OK
+        )
+
+
+class NearbyAssistantsView(GenericAPIView):
+    """
+    Nearest verified assistants
+
+    Query parameters: `latitude` and `longitude`, the caller's profile
+    location without them, `radius` in km and `limit`.
+    """
+
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+    serializer_class = NearbyAssistantSerializer
+
+    def get(self, request):
+        params = NearbyQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        latitude = params.validated_data.get("latitude")
+        longitude = params.validated_data.get("longitude")
+
+        if latitude is None:
+            latitude, longitude = profile_location(request.user)
+            if latitude is None:
+                raise ValidationError(
+                    {"error": "Give a location, your profile does not have one"}
+                )
+
+        found = nearby(
+            latitude,
+            longitude,
+            params.validated_data["radius"],
+            params.validated_data["limit"],
+            exclude_user=request.user.pk,
+        )
+
+        assistants = Assistant.objects.in_bulk([pk for pk, _ in found])
+        results = []
+        for pk, distance in found:
+            if pk in assistants:
+                # To 100m, precise distances from a few points would
+                # locate the assistant
+                assistants[pk].distance = round(distance, 1)
+                results.append(assistants[pk])
+
+        serializer = self.get_serializer(results, many=True)
+        return Response({"results": serializer.data}, status=status.HTTP_200_OK)
+
+
+class MatchAssistantsView(GenericAPIView):
+    """
+    Assistants ranked for a request
+
+    Scores every assistant on the services it offers of the `service`s
+    asked (repeatable), its experience, whether it is verified, and how
+    near it is to `latitude` and `longitude`, or to the caller's profile
+    location without them. Query parameters also take a `limit`.
+    """
+
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+    serializer_class = AssistantResultSerializer
+
+    def get(self, request):
+        params = MatchQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        latitude = params.validated_data.get("latitude")
+        longitude = params.validated_data.get("longitude")
+        if latitude is None:
+            # Without a location, distance is left out of the scores
+            latitude, longitude = profile_location(request.user)
+
+        found = get_engine().rank(
+            params.validated_data["service"],
+            latitude,
+            longitude,
+            params.validated_data["limit"],
+            exclude_user=request.user.pk,
+        )
+
+        assistants = Assistant.objects.in_bulk([pk for pk, _ in found])
+        results = []
+        for pk, score in found:
+            # Deleted since the engine last caught up
+            if pk in assistants:
+                assistants[pk].score = round(score, 6)
+                results.append(assistants[pk])
+
+        serializer = self.get_serializer(results, many=True)
+        return Response({"results": serializer.data}, status=status.HTTP_200_OK)
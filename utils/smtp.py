@@ -0,0 +1,150 @@
+"""
+A local stand-in for an SMTP relay, for tests and benchmarks.
+
+    server = LocalSMTPServer(latency=0.01)
+    server.start()
+    ...  # EMAIL_HOST="127.0.0.1", EMAIL_PORT=server.port
+    server.stop()
+
+It speaks just enough SMTP for smtplib: no TLS, and AUTH PLAIN only when
+``credentials`` are given. Received messages are kept in
+``server.messages`` as ``(mail_from, recipients, data)``.
+"""
+import base64
+import socketserver
+import threading
+import time
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+
+        time.sleep(server.connect_latency)
+        self.reply("220 localhost stand-in SMTP")
+        self.reset()
+        self.authenticated = server.credentials is None
+
+        while line := self.rfile.readline():
+            command, _, argument = line.decode().rstrip("\r\n").partition(" ")
+            command = command.upper()
+
+            if command == "EHLO" and server.credentials:
+                self.reply("250-localhost")
+                self.reply("250 AUTH PLAIN")
+            elif command in ("HELO", "EHLO"):
+                self.reply("250 localhost")
+            elif command == "AUTH":
+                self.authenticate(argument)
+            elif command == "MAIL" and not self.authenticated:
+                self.reply("530 Authentication required")
+            elif command == "MAIL":
+                self.reset()
+                self.mail_from = argument.partition(":")[2].strip("<> ")
+                self.reply("250 OK")
+            elif command == "RCPT":
+                recipient = argument.partition(":")[2].strip("<> ")
+                if recipient in server.rejected:
+                    self.reply("550 No such user")
+                    continue
+                self.recipients.append(recipient)
+                self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                self.receive_data()
+            elif command == "RSET":
+                self.reset()
+                self.reply("250 OK")
+            elif command == "NOOP":
+                self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+    def authenticate(self, argument):
+        mechanism, _, response = argument.partition(" ")
+        try:
+            _, username, password = base64.b64decode(response).decode().split("\0")
+        except ValueError:
+            username = password = None
+
+        valid = (username, password) == self.server.credentials
+        if mechanism.upper() == "PLAIN" and valid:
+            self.authenticated = True
+            with self.server.lock:
+                self.server.logins += 1
+            self.reply("235 Authentication successful")
+        else:
+            self.reply("535 Authentication failed")
+
+    def receive_data(self):
+        lines = []
+        while (line := self.rfile.readline()) not in (b".\r\n", b""):
+            # Undo dot-stuffing
+            lines.append(line[1:] if line.startswith(b"..") else line)
+
+        time.sleep(self.server.latency)
+        with self.server.lock:
+            self.server.messages.append(
+                (self.mail_from, self.recipients, b"".join(lines))
+            )
+        self.reset()
+        self.reply("250 OK queued")
+
+    def reset(self):
+        self.mail_from = None
+        self.recipients = []
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    """
+    latency: seconds spent accepting each message.
+    connect_latency: seconds before the greeting, standing in for the TCP
+        and TLS handshakes of a real relay.
+    rejected: recipients refused with a 550.
+    credentials: ``(username, password)`` to require AUTH PLAIN.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        latency=0,
+        connect_latency=0,
+        credentials=None,
+    ):
+        super().__init__((host, port), SMTPHandler)
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.credentials = credentials
+        self.rejected = set()
+        self.messages = []
+        self.connections = 0
+        self.logins = 0
+        self.lock = threading.Lock()
+
+    @property
+    def host(self):
+        return self.server_address[0]
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()